@@ -1,6 +1,36 @@
+import functools
+from .results import parse_json
+import telemetry
+
 class BaseAgent:
+    # Identifies the agent to GeminiAPI (e.g. for rate-limit priority)
+    role = None
+
+    def __init_subclass__(cls, **kwargs):
+        # Every agent's run() is traced as an 'agent.run' span
+        super().__init_subclass__(**kwargs)
+        run = cls.__dict__.get('run')
+        if run is not None:
+            @functools.wraps(run)
+            def traced_run(self, *args, **kwargs):
+                with telemetry.span('agent.run', role=self.role or type(self).__name__, agent=self.name):
+                    return run(self, *args, **kwargs)
+            cls.run = traced_run
+
     def __init__(self, name):
         self.name = name
 
     def run(self, *args, **kwargs):
         raise NotImplementedError("Each agent must implement the run method.")
+
+    def _call_structured(self, prompt, result_type):
+        # Schema-constrained call parsed into result_type. Malformed JSON is repaired
+        # locally first; only if that fails is the model asked once more. None if both fail.
+        response = self.gemini.call(prompt, modality='text', role=self.role, response_schema=result_type.SCHEMA)
+        data = parse_json(response)
+        if data is None:
+            retry = f"{prompt}\n\nRespond with a single valid JSON object and nothing else."
+            response = self.gemini.call(retry, modality='text', use_cache=False, role=self.role,
+                                        response_schema=result_type.SCHEMA)
+            data = parse_json(response)
+        return result_type.from_dict(data) if data is not None else None
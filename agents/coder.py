@@ -3,6 +3,8 @@ from gemini_api import GeminiAPI
 import re
 
 class CoderAgent(BaseAgent):
+    role = 'coder'
+
     def __init__(self, name, gemini=None):
         super().__init__(name)
         self.gemini = gemini or GeminiAPI()
@@ -15,7 +17,7 @@ class CoderAgent(BaseAgent):
             "If the task is ambiguous, ask for clarification.\n"
             f"Task: {subtask}"
         )
-        response = self.gemini.call(prompt, modality='text')
+        response = self.gemini.call(prompt, modality='text', role=self.role)
         # Extract code block
         match = re.search(r'```(?:[a-zA-Z]+)?\n([\s\S]+?)```', response)
         if match:
@@ -1,8 +1,11 @@
 from .base import BaseAgent
+from .results import Review, ReviewWithDocs
 from gemini_api import GeminiAPI
-import json
+import telemetry
 
 class CriticAgent(BaseAgent):
+    role = 'critic'
+
     def __init__(self, name, gemini=None):
         super().__init__(name)
         self.gemini = gemini or GeminiAPI()
@@ -11,12 +14,23 @@ class CriticAgent(BaseAgent):
         prompt = (
             "You are a world-class code reviewer. "
             "Given the following code and its intended purpose, review it for correctness, style, and best practices. "
-            "Return a JSON object with 'issues', 'suggestions', and 'overall_rating'.\n"
+            "Return a JSON object with 'issues' (list of blocking problems, empty if none), "
+            "'suggestions' (list of optional improvements), and 'overall_rating'.\n"
+            f"Code:\n{code}\nPurpose: {purpose}"
+        )
+        # An unreadable review is not evidence of a problem, so it must not trigger a rewrite
+        return self._call_structured(prompt, Review) or Review()
+
+    def review_with_docs(self, code, purpose):
+        # Review and documentation in one structured call (REVIEW_MODE=fused); None if unreadable
+        prompt = (
+            "You are a world-class code reviewer and technical writer. "
+            "Given the following code and its intended purpose, review it for correctness, style, and best practices, "
+            "and write clear, professional documentation for it, including usage examples if appropriate. "
+            "Return a JSON object with 'issues' (list of blocking problems, empty if none), "
+            "'suggestions' (list of optional improvements), 'overall_rating', "
+            "and 'documentation' (the documentation as markdown text).\n"
             f"Code:\n{code}\nPurpose: {purpose}"
         )
-        response = self.gemini.call(prompt, modality='text')
-        try:
-            review = json.loads(response)
-        except Exception:
-            review = {'issues': response.strip(), 'suggestions': '', 'overall_rating': 'N/A'}
-        return review 
\ No newline at end of file
+        with telemetry.span('agent.run', role=self.role, agent=self.name, fused='documenter'):
+            return self._call_structured(prompt, ReviewWithDocs)
@@ -1,24 +1,83 @@
 from .base import BaseAgent
 from gemini_api import GeminiAPI
+from patching import PatchError, apply_unified_diff, code_window, extract_diff, failing_lines, validate_python
+from rate_limiter import estimate_tokens
 import re
+import threading
+import telemetry
 
 class DebuggerAgent(BaseAgent):
+    role = 'debugger'
+
     def __init__(self, name, gemini=None):
         super().__init__(name)
         self.gemini = gemini or GeminiAPI()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.stats = {'patched': 0, 'rewritten': 0, 'tokens_saved': 0}
+
+    def last_report(self):
+        # {'outcome', 'tokens_saved'} for this thread's latest run, returned once
+        report = getattr(self._local, 'report', None)
+        self._local.report = None
+        return report
 
     def run(self, code, test_results):
+        # Ask for a unified diff against the failing region only; fall back to a full
+        # rewrite when the patch does not apply or breaks compilation
+        excerpt = code_window(code, failing_lines(test_results.details))
         prompt = (
+            "You are a world-class debugging expert. "
+            "The excerpt below is from solution.py, shown with line numbers; '...' marks omitted lines. "
+            "Fix the error with the smallest change. Return ONLY a unified diff against solution.py "
+            "in a ```diff block, with @@ hunk headers using these line numbers and at least 2 unchanged "
+            "context lines per hunk. Do not include the line-number prefixes in the diff.\n"
+            f"Code:\n{excerpt}\n"
+            f"Error: {test_results.details}"
+        )
+        # Retries must see a fresh answer, never a cached one
+        response = self.gemini.call(prompt, modality='text', use_cache=False, role=self.role)
+        patch_tokens = estimate_tokens(prompt) + estimate_tokens(response)
+        # What the full-rewrite round trip would have cost: the whole file in, the whole file out
+        rewrite_tokens = estimate_tokens(self._rewrite_prompt(code, test_results)) + estimate_tokens(code)
+        try:
+            fix = apply_unified_diff(code, extract_diff(response))
+            validate_python(code, fix)
+            self._record('patched', rewrite_tokens - patch_tokens)
+            return fix
+        except PatchError as e:
+            span = telemetry.current_span()
+            if span is not None:
+                span.set(patch_error=str(e)[:200])
+        fix = self._rewrite(code, test_results)
+        self._record('rewritten', -patch_tokens)
+        return fix
+
+    def _rewrite_prompt(self, code, test_results):
+        return (
             "You are a world-class debugging expert. "
             "Given the following code and error message, suggest a corrected version of the code. "
             "Return ONLY the corrected code in a markdown code block.\n"
             f"Code:\n{code}\n"
-            f"Error: {test_results['details']}"
+            f"Error: {test_results.details}"
         )
-        response = self.gemini.call(prompt, modality='text')
+
+    def _rewrite(self, code, test_results):
+        response = self.gemini.call(self._rewrite_prompt(code, test_results), modality='text', use_cache=False, role=self.role)
         match = re.search(r'```(?:[a-zA-Z]+)?\n([\s\S]+?)```', response)
         if match:
             fix = match.group(1).strip()
         else:
             fix = response.strip()
         return fix
+
+    def _record(self, outcome, tokens_saved):
+        # Per attempt: on the agent.run span; in aggregate: stats and the Prometheus counter
+        span = telemetry.current_span()
+        if span is not None:
+            span.set(debug_outcome=outcome, tokens_saved=tokens_saved)
+        telemetry.count('agentic_debug_tokens_saved_total', tokens_saved)
+        self._local.report = {'outcome': outcome, 'tokens_saved': tokens_saved}
+        with self._lock:
+            self.stats[outcome] += 1
+            self.stats['tokens_saved'] += tokens_saved
@@ -1,11 +1,15 @@
 from .base import BaseAgent
+from snapshot_store import SnapshotStore
 import subprocess
 import shutil
 import os
 
 class DeploymentAgent(BaseAgent):
-    def __init__(self, name):
+    def __init__(self, name, keep_snapshots=10):
         super().__init__(name)
+        # Snapshots retained per target in each backup store
+        self.keep_snapshots = keep_snapshots
+        self.last_snapshot = None
 
     def run(self, recommendation):
         # Expect recommendation to include an install command (e.g., pip install ...)
@@ -25,24 +29,27 @@ class DeploymentAgent(BaseAgent):
             }
 
     def backup(self, target_path, backup_path):
+        # backup_path is a SnapshotStore: only content it has not seen before is copied in
         print(f"[DeploymentAgent] Backing up {target_path} to {backup_path}")
         try:
-            if os.path.isdir(target_path):
-                shutil.copytree(target_path, backup_path, dirs_exist_ok=True)
-            else:
-                shutil.copy2(target_path, backup_path)
+            self.last_snapshot = SnapshotStore(backup_path, keep=self.keep_snapshots).snapshot(target_path)
             return True
         except Exception as e:
             print(f"[DeploymentAgent] Backup failed: {e}")
             return False
 
-    def rollback(self, backup_path, target_path):
+    def rollback(self, backup_path, target_path, snapshot_id=None):
+        # Restores the latest (or the given) snapshot, rewriting only files that differ
         print(f"[DeploymentAgent] Rolling back {target_path} from {backup_path}")
         try:
-            if os.path.isdir(backup_path):
-                shutil.copytree(backup_path, target_path, dirs_exist_ok=True)
-            else:
-                shutil.copy2(backup_path, target_path)
+            if not os.path.isdir(os.path.join(backup_path, 'snapshots')):
+                # A plain copy made before backups were snapshots
+                if os.path.isdir(backup_path):
+                    shutil.copytree(backup_path, target_path, dirs_exist_ok=True)
+                else:
+                    shutil.copy2(backup_path, target_path)
+                return True
+            SnapshotStore(backup_path, keep=self.keep_snapshots).restore(target_path, snapshot_id)
             return True
         except Exception as e:
             print(f"[DeploymentAgent] Rollback failed: {e}")
@@ -2,6 +2,8 @@ from .base import BaseAgent
 from gemini_api import GeminiAPI
 
 class DocumenterAgent(BaseAgent):
+    role = 'documenter'
+
     def __init__(self, name, gemini=None):
         super().__init__(name)
         self.gemini = gemini or GeminiAPI()
@@ -13,5 +15,5 @@ class DocumenterAgent(BaseAgent):
             "Return the documentation as markdown text.\n"
             f"Code:\n{code}"
         )
-        docs = self.gemini.call(prompt, modality='text')
+        docs = self.gemini.call(prompt, modality='text', role=self.role)
         return docs
@@ -1,16 +1,46 @@
 from .base import BaseAgent
 from gemini_api import GeminiAPI
+from memory_store import normalize_subtask
+from modality_classifier import Modality, ModalityClassifier
+import threading
 
 class ModalSwitcherAgent(BaseAgent):
-    def __init__(self, name, gemini=None):
+    role = 'modal_switcher'
+
+    def __init__(self, name, gemini=None, classifier=None):
         super().__init__(name)
         self.gemini = gemini or GeminiAPI()
+        self.classifier = classifier or ModalityClassifier()
+        self._memo = {}
+        self._lock = threading.Lock()
+        self.stats = {'local': 0, 'memoized': 0, 'llm': 0}
 
     def run(self, subtask):
+        # Confident cases are decided locally; only ambiguous subtasks reach the LLM, once each
+        modality = self.classifier.classify(subtask)
+        if modality is not None:
+            self._count('local')
+            return modality
+        key = normalize_subtask(subtask)
+        with self._lock:
+            memoized = self._memo.get(key)
+        if memoized is not None:
+            self._count('memoized')
+            return memoized
         prompt = (
             "You are a world-class AI modality selector. "
-            "Given the following subtask, decide if it requires text, code, image, or another modality, and return the best modality as a string.\n"
+            "Given the following subtask, decide if it requires code, text, image, or diagram output. "
+            "Answer with exactly one word: code, text, image, or diagram.\n"
             f"Subtask: {subtask}"
         )
-        response = self.gemini.call(prompt, modality='text')
-        return response.strip().lower()
+        response = self.gemini.call(prompt, modality='text', role=self.role)
+        # Fall back to the local guess when the answer names no modality
+        modality = Modality.parse(response, default=self.classifier.predict(subtask)[0])
+        with self._lock:
+            self._memo[key] = modality
+        self._count('llm')
+        return modality
+
+    def _count(self, outcome):
+        with self._lock:
+            self.stats[outcome] += 1
@@ -1,19 +1,62 @@
 from .base import BaseAgent
-import time
+from .results import TestResult
+from monitor_scheduler import Monitor, MonitorScheduler, content_hash
+from subtask_scheduler import build_dag
+import asyncio
 
 class MonitoringAgent(BaseAgent):
-    def __init__(self, name, check_interval=3600):
+    def __init__(self, name, check_interval=3600, max_concurrency=100, jitter=0.1, check_timeout=60, coalesce_window=5.0):
         super().__init__(name)
         self.check_interval = check_interval  # seconds
+        # Shared by every monitor added through watch()
+        self.scheduler = MonitorScheduler(max_concurrency=max_concurrency, jitter=jitter, default_timeout=check_timeout,
+                                          coalesce_window=coalesce_window)
 
     def run(self, health_check_func, improvement_func, context):
+        # Blocking single-project form: one check per interval while the context stays complete
         print(f"[MonitoringAgent] Starting continuous monitoring every {self.check_interval} seconds...")
-        while context.status == "complete":
+
+        def check():
             print("[MonitoringAgent] Running health check...")
             healthy = health_check_func()
-            if not healthy:
-                print("[MonitoringAgent] Issue detected! Triggering improvement loop...")
-                improvement_func()
-            else:
-                print("[MonitoringAgent] System healthy.")
-            time.sleep(self.check_interval) 
\ No newline at end of file
+            print("[MonitoringAgent] System healthy." if healthy else "[MonitoringAgent] Issue detected! Triggering improvement loop...")
+            return healthy
+
+        scheduler = MonitorScheduler(max_concurrency=1, jitter=0, default_timeout=None, coalesce_window=0)
+        scheduler.add(Monitor(self.name, check, lambda names: improvement_func(), interval=self.check_interval))
+        asyncio.run(scheduler.run(until=lambda: context.status != "complete"))
+
+    async def watch(self, monitors, until=None):
+        # Many projects on one event loop; see monitor_scheduler
+        for monitor in monitors:
+            self.scheduler.add(monitor)
+        await self.scheduler.run(until=until)
+
+def subtask_monitors(context, test_runner, improve=None, interval=3600):
+    # One monitor per finished subtask that has tests: re-runs them in the sandbox, but only
+    # once the subtask's code, or the code of a subtask it depends on, has changed
+    results = {result['subtask']: result for result in context.subtask_results}
+    nodes = build_dag(context.plan)
+    deps = {node['subtask']: [nodes[index]['subtask'] for index in node['deps']] for node in nodes}
+    monitors = []
+    for subtask, result in results.items():
+        test_code = _test_code(result)
+        if not test_code:
+            continue
+        upstream = [results[name] for name in deps.get(subtask, []) if name in results]
+        monitors.append(Monitor(
+            subtask,
+            lambda result=result, test_code=test_code: test_runner.run(
+                {'solution.py': result['code'], 'test_solution.py': test_code}, 'test_solution.py')['status'] == 'success',
+            improve,
+            interval=interval,
+            fingerprint=lambda result=result, upstream=upstream: content_hash(result['code'], *(r['code'] for r in upstream))
+        ))
+    return monitors
+
+def _test_code(result):
+    # TestResult, or its dict form when restored from memory or a checkpoint
+    tests = result.get('test_results')
+    if isinstance(tests, TestResult):
+        return tests.test_code
+    return (tests or {}).get('test_code', '')
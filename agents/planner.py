@@ -2,17 +2,21 @@ from .base import BaseAgent
 from gemini_api import GeminiAPI
 
 class PlannerAgent(BaseAgent):
+    role = 'planner'
+
     def __init__(self, name, gemini=None):
         super().__init__(name)
         self.gemini = gemini or GeminiAPI()
 
-    def run(self, user_request):
+    def run(self, user_request, cached_prefix=None):
         prompt = (
             "You are a senior software architect. "
             "Break down the following user request into clear, actionable subtasks, one per line. "
+            "If a subtask needs the output of earlier ones, end its line with '(depends on: N, M)' "
+            "using their 1-based line numbers; leave independent subtasks unannotated. "
             "User request: " + user_request
         )
-        response = self.gemini.call(prompt, modality='text')
+        response = self.gemini.call(prompt, modality='text', role=self.role, cached_prefix=cached_prefix)
         # Split response into lines and clean up
         subtasks = [line.strip('- ').strip() for line in response.split('\n') if line.strip()]
         return subtasks
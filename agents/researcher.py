@@ -1,27 +1,62 @@
 from .base import BaseAgent
 from gemini_api import GeminiAPI
+import threading
+import telemetry
 
 class ResearchAgent(BaseAgent):
-    def __init__(self, name, web_search_func, gemini=None):
+    role = 'researcher'
+
+    def __init__(self, name, web_search_func, gemini=None, store=None):
         super().__init__(name)
         self.web_search_func = web_search_func
         self.gemini = gemini or GeminiAPI()
+        # Optional ResearchStore: a close fresh match is returned without searching,
+        # a stale one is refreshed with a shorter update prompt
+        self.store = store
+        self.stats = {'reused': 0, 'refreshed': 0, 'researched': 0}
+        self._lock = threading.Lock()
 
     def run(self, query):
+        match = self.store.lookup(query) if self.store is not None else None
+        if match is not None and match.fresh:
+            self._record('reused', match)
+            return match.summary
         # Use the web_search_func to get search results
         search_results = self.web_search_func(query)
-        # Summarize findings and recommend open-source solutions using Gemini
-        prompt = (
-            "You are a world-class technical researcher and solution finder. "
-            "Given the following web search results, do the following as markdown:\n"
-            "1. Summarize the most relevant findings, best practices, and actionable insights as bullet points.\n"
-            "2. In a 'Recommendations' section, list the top open-source libraries, tools, or repositories for the task, with install commands and links.\n"
-            f"Web search results:\n{search_results}\n"
-            f"Query: {query}"
-        )
-        summary = self.gemini.call(prompt, modality='text')
+        if match is not None:
+            prompt = (
+                "You are a world-class technical researcher and solution finder. "
+                "Below is your earlier research on a closely related query and new web search results. "
+                "Update the research for the query as markdown in the same format: keep what still holds, "
+                "correct or drop what the new results contradict, and add anything new. "
+                "Keep the 'Recommendations' section with install commands and links.\n"
+                f"Earlier research (for: {match.query}):\n{match.summary}\n"
+                f"Web search results:\n{search_results}\n"
+                f"Query: {query}"
+            )
+        else:
+            # Summarize findings and recommend open-source solutions using Gemini
+            prompt = (
+                "You are a world-class technical researcher and solution finder. "
+                "Given the following web search results, do the following as markdown:\n"
+                "1. Summarize the most relevant findings, best practices, and actionable insights as bullet points.\n"
+                "2. In a 'Recommendations' section, list the top open-source libraries, tools, or repositories for the task, with install commands and links.\n"
+                f"Web search results:\n{search_results}\n"
+                f"Query: {query}"
+            )
+        summary = self.gemini.call(prompt, modality='text', role=self.role)
+        self._record('refreshed' if match is not None else 'researched', match)
+        if self.store is not None and summary and summary.strip():
+            self.store.add(query, summary, replaces=match.id if match is not None else None)
         return summary
 
+    def _record(self, outcome, match):
+        span = telemetry.current_span()
+        if span is not None:
+            span.set(research=outcome, similarity=round(match.similarity, 3) if match is not None else None)
+        with self._lock:
+            self.stats[outcome] += 1
+
     def fetch_and_install(self, recommendation):
         # Stub: To be implemented by DeploymentAgent
-        pass 
\ No newline at end of file
+        pass
@@ -0,0 +1,105 @@
+import json
+import re
+from dataclasses import dataclass, field
+from typing import List
+
+# Typed results for agents that ask Gemini for structured JSON. SCHEMA is sent as
+# responseSchema; parse_json() is the cheap local repair applied before any re-prompt.
+
+FENCE_RE = re.compile(r'```(?:json)?\s*\n?([\s\S]*?)```', re.IGNORECASE)
+TRAILING_COMMA_RE = re.compile(r',\s*([}\]])')
+
+@dataclass
+class TestResult:
+    passed: bool
+    details: str = ''
+    test_code: str = ''
+
+    SCHEMA = {
+        'type': 'OBJECT',
+        'properties': {
+            'passed': {'type': 'BOOLEAN'},
+            'details': {'type': 'STRING'},
+            'test_code': {'type': 'STRING'},
+        },
+        'required': ['passed', 'details', 'test_code'],
+    }
+
+    @classmethod
+    def from_dict(cls, data):
+        passed = data.get('passed')
+        if isinstance(passed, str):
+            passed = passed.strip().lower() in ('true', 'yes', 'pass', 'passed')
+        return cls(passed=bool(passed), details=_text(data.get('details')), test_code=_text(data.get('test_code')))
+
+@dataclass
+class Review:
+    issues: List[str] = field(default_factory=list)
+    suggestions: List[str] = field(default_factory=list)
+    overall_rating: str = 'N/A'
+
+    SCHEMA = {
+        'type': 'OBJECT',
+        'properties': {
+            'issues': {'type': 'ARRAY', 'items': {'type': 'STRING'}},
+            'suggestions': {'type': 'ARRAY', 'items': {'type': 'STRING'}},
+            'overall_rating': {'type': 'STRING'},
+        },
+        'required': ['issues', 'suggestions', 'overall_rating'],
+    }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(issues=_items(data.get('issues')), suggestions=_items(data.get('suggestions')),
+                   overall_rating=_text(data.get('overall_rating')) or 'N/A')
+
+@dataclass
+class ReviewWithDocs:
+    # Critic review and documentation from one fused call
+    review: Review
+    docs: str = ''
+
+    SCHEMA = {
+        'type': 'OBJECT',
+        'properties': {**Review.SCHEMA['properties'], 'documentation': {'type': 'STRING'}},
+        'required': Review.SCHEMA['required'] + ['documentation'],
+    }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(review=Review.from_dict(data), docs=_text(data.get('documentation')).strip())
+
+def _text(value):
+    if value is None:
+        return ''
+    return value if isinstance(value, str) else json.dumps(value)
+
+def _items(value):
+    # Models sometimes answer a list field with one string; empty strings are not issues
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list):
+        value = [value]
+    return [_text(item).strip() for item in value if _text(item).strip()]
+
+def parse_json(text):
+    # Returns the decoded object, or None when even the repaired text is not JSON.
+    # Repairs the usual damage: markdown fences, prose around the object, trailing commas.
+    candidates = [text.strip()]
+    match = FENCE_RE.search(text)
+    if match:
+        candidates.append(match.group(1).strip())
+    start, end = text.find('{'), text.rfind('}')
+    if start != -1 and end > start:
+        candidates.append(text[start:end + 1])
+    for candidate in candidates:
+        for attempt in (candidate, TRAILING_COMMA_RE.sub(r'\1', candidate)):
+            try:
+                data = json.loads(attempt)
+            except ValueError:
+                continue
+            if isinstance(data, dict):
+                return data
+    return None
@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import uuid
+
+# Content-addressed artifact storage. Each blob is stored once under objects/ by its
+# SHA-256; per-job workspaces hardlink to those blobs, so identical files across
+# jobs share disk. All writes go through a temp file and os.replace, so readers
+# never see a partial file.
+
+JOB_ID_RE = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+DIGEST_RE = re.compile(r'^[0-9a-f]{64}$')
+
+class ArtifactStore:
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.objects_dir = os.path.join(self.root, 'objects')
+        self.workspaces_dir = os.path.join(self.root, 'workspaces')
+        self.manifests_dir = os.path.join(self.root, 'manifests')
+        for path in (self.objects_dir, self.workspaces_dir, self.manifests_dir):
+            os.makedirs(path, exist_ok=True)
+
+    def blob_path(self, digest):
+        if not DIGEST_RE.match(digest):
+            raise ValueError(f"Invalid digest: {digest}")
+        return os.path.join(self.objects_dir, digest[:2], digest[2:])
+
+    def put_blob(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._atomic_write(path, data)
+            os.chmod(path, 0o444)
+        return digest
+
+    def workspace(self, job_id):
+        if not JOB_ID_RE.match(job_id):
+            raise ValueError(f"Invalid job id: {job_id}")
+        path = os.path.join(self.workspaces_dir, job_id)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def workspace_path(self, job_id, filename):
+        root = self.workspace(job_id)
+        path = os.path.normpath(os.path.join(root, filename))
+        if not path.startswith(root + os.sep):
+            raise ValueError(f"Invalid artifact name: {filename}")
+        return path
+
+    def write_file(self, job_id, filename, content):
+        data = content.encode('utf-8')
+        digest = self.put_blob(data)
+        path = self.workspace_path(job_id, filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.link(self.blob_path(digest), tmp)
+        except OSError:
+            # Cross-device or no hardlink support: fall back to a private copy
+            with open(tmp, 'wb') as f:
+                f.write(data)
+        os.replace(tmp, path)
+        return {'filename': filename, 'size': len(data), 'hash': digest}
+
+    def write_manifest(self, job_id, manifest):
+        self.workspace(job_id)
+        self._atomic_write(os.path.join(self.manifests_dir, f"{job_id}.json"), json.dumps(manifest).encode('utf-8'))
+
+    def read_manifest(self, job_id):
+        if not JOB_ID_RE.match(job_id):
+            return None
+        try:
+            with open(os.path.join(self.manifests_dir, f"{job_id}.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _atomic_write(self, path, data):
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
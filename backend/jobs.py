@@ -0,0 +1,230 @@
+import asyncio
+import contextvars
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+import deadline
+
+FINAL_STATUSES = ('succeeded', 'failed', 'cancelled')
+
+class QueueFull(Exception):
+    pass
+
+class JobCancelled(Exception):
+    pass
+
+class JobFeed:
+    # Progress events a running job publishes, relayed by followers on an asyncio loop
+    # (e.g. an SSE response) that wait without holding a thread
+    def __init__(self):
+        self.events = []
+        self.closed = False
+        self._lock = threading.Lock()
+        self._waiters = []
+
+    def publish(self, event):
+        with self._lock:
+            self.events.append(event)
+            waiters, self._waiters = self._waiters, []
+        self._wake(waiters)
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+            waiters, self._waiters = self._waiters, []
+        self._wake(waiters)
+
+    @staticmethod
+    def _wake(waiters):
+        for loop, event in waiters:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(event.set)
+
+    async def follow(self):
+        # Every event from the first one on, ending once the feed is closed
+        loop = asyncio.get_running_loop()
+        index = 0
+        while True:
+            wake = asyncio.Event()
+            with self._lock:
+                events = self.events[index:]
+                closed = self.closed
+                if not events and not closed:
+                    self._waiters.append((loop, wake))
+            index += len(events)
+            for event in events:
+                yield event
+            if closed:
+                return
+            if not events:
+                await wake.wait()
+
+class JobStore:
+    # SQLite-backed job records, so queued and finished jobs survive a server restart
+    def __init__(self, path: str):
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, user_request TEXT NOT NULL, status TEXT NOT NULL, "
+            "result TEXT, error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL, deadline_at REAL)"
+        )
+        # Databases created before jobs kept their time budget
+        if 'deadline_at' not in [row[1] for row in self._db.execute("PRAGMA table_info(jobs)")]:
+            self._db.execute("ALTER TABLE jobs ADD COLUMN deadline_at REAL")
+        self._lock = threading.Lock()
+
+    def create(self, user_request: str, deadline_at: Optional[float] = None) -> Dict[str, Any]:
+        # deadline_at: wall-clock time (time.time()) the job's budget runs out, if it has one
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, user_request, status, created_at, updated_at, deadline_at) VALUES (?, ?, 'queued', ?, ?, ?)",
+                (job_id, user_request, now, now, deadline_at)
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, user_request, status, result, error, created_at, updated_at, deadline_at FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'job_id': row[0], 'user_request': row[1], 'status': row[2],
+            'result': json.loads(row[3]) if row[3] else None, 'error': row[4],
+            'created_at': row[5], 'updated_at': row[6], 'deadline_at': row[7]
+        }
+
+    def update(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None):
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job_id)
+            )
+
+    def unfinished(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            ids = [row[0] for row in self._db.execute(
+                "SELECT id FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            )]
+        return [self.get(job_id) for job_id in ids]
+
+class JobQueue:
+    # Runs jobs on a bounded worker pool. At most max_workers run at once and at most
+    # max_queue more wait; beyond that submit() raises QueueFull.
+    def __init__(self, store: JobStore, run_func: Callable[[str, str, Callable[[], bool]], Any], max_workers: int = 4, max_queue: int = 16):
+        self.store = store
+        self.run_func = run_func
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._futures = {}
+        self._cancel_events = {}
+        self._feeds = {}
+        self._lock = threading.Lock()
+
+    def recover(self):
+        # Jobs that were queued or mid-run when the previous process died start over,
+        # with whatever is left of their time budget
+        for job in self.store.unfinished():
+            self.store.update(job['job_id'], 'queued')
+            with self._lock:
+                future = self._enqueue(job['job_id'], job['user_request'], job['deadline_at'])
+            self._watch(job['job_id'], future)
+
+    def submit(self, user_request: str) -> Dict[str, Any]:
+        # A deadline in force in the caller's context (deadline.budget) becomes the job's budget
+        left = deadline.remaining()
+        deadline_at = time.time() + left if left is not None else None
+        with self._lock:
+            if len(self._futures) >= self.max_workers + self.max_queue:
+                raise QueueFull()
+            job = self.store.create(user_request, deadline_at)
+            future = self._enqueue(job['job_id'], user_request, deadline_at)
+        self._watch(job['job_id'], future)
+        return job
+
+    def future(self, job_id: str):
+        with self._lock:
+            return self._futures.get(job_id)
+
+    def feed(self, job_id: str) -> Optional[JobFeed]:
+        # The events of a queued or running job; None once it has finished
+        with self._lock:
+            return self._feeds.get(job_id)
+
+    def publish(self, job_id: str, event: Dict[str, Any]):
+        # Called by run_func; the feed is closed when the job finishes or is cancelled
+        feed = self.feed(job_id)
+        if feed is not None:
+            feed.publish(event)
+
+    def depth(self) -> int:
+        with self._lock:
+            return len(self._futures)
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.store.get(job_id)
+        if job is None or job['status'] in FINAL_STATUSES:
+            return job
+        with self._lock:
+            event = self._cancel_events.get(job_id)
+            future = self._futures.get(job_id)
+        if event is not None:
+            # A running job notices this between orchestration steps
+            event.set()
+        if future is None or future.cancel():
+            self.store.update(job_id, 'cancelled')
+        return self.store.get(job_id)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _enqueue(self, job_id: str, user_request: str, deadline_at: Optional[float]):
+        # Caller holds the lock, and passes the future to _watch() once it has released it
+        event = threading.Event()
+        self._feeds[job_id] = JobFeed()
+        # The job runs in a copy of the submitter's context, so e.g. tracing applies to it
+        future = self._pool.submit(contextvars.copy_context().run, self._run, job_id, user_request, deadline_at, event)
+        self._cancel_events[job_id] = event
+        self._futures[job_id] = future
+        return future
+
+    def _watch(self, job_id: str, future):
+        # Runs _forget() right away if the job is already done, so never under the lock
+        future.add_done_callback(lambda _: self._forget(job_id))
+
+    def _forget(self, job_id: str):
+        # The store already has the job's final status when its feed is closed
+        with self._lock:
+            self._futures.pop(job_id, None)
+            self._cancel_events.pop(job_id, None)
+            feed = self._feeds.pop(job_id, None)
+        if feed is not None:
+            feed.close()
+
+    def _run(self, job_id: str, user_request: str, deadline_at: Optional[float], cancel_event: threading.Event):
+        if cancel_event.is_set():
+            # Cancelled after it left the queue but before it started
+            self.store.update(job_id, 'cancelled')
+            raise JobCancelled()
+        self.store.update(job_id, 'running')
+        try:
+            with deadline.budget(max(0.0, deadline_at - time.time()) if deadline_at is not None else None):
+                result = self.run_func(job_id, user_request, cancel_event.is_set)
+        except JobCancelled:
+            self.store.update(job_id, 'cancelled')
+            raise
+        except Exception as e:
+            self.store.update(job_id, 'failed', error=str(e))
+            raise
+        self.store.update(job_id, 'succeeded', result=result)
+        return result
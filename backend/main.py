@@ -1,9 +1,44 @@
-from fastapi import FastAPI
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from .orchestrator import run_orchestration  # Import the orchestrator logic
+from typing import Optional
+from .orchestrator import artifacts, iter_orchestration  # Import the orchestrator logic
+from .jobs import JobCancelled, JobQueue, JobStore, QueueFull
+from runner_pool import get_test_runner
+import deadline
+import telemetry
 
-app = FastAPI()
+def run_job(job_id, user_request, should_cancel):
+    for event in iter_orchestration(user_request, job_id):
+        if should_cancel():
+            raise JobCancelled()
+        # Relayed by /project/stream
+        job_queue.publish(job_id, event)
+        if event['type'] == 'result':
+            return event['result']
+
+job_store = JobStore(os.getenv('JOB_DB', os.path.join(os.path.dirname(__file__), '../jobs.db')))
+job_queue = JobQueue(
+    job_store,
+    run_job,
+    max_workers=int(os.getenv('JOB_WORKERS', 4)),
+    max_queue=int(os.getenv('JOB_MAX_QUEUE', 16))
+)
+
+@asynccontextmanager
+async def lifespan(app):
+    get_test_runner().warm()
+    job_queue.recover()
+    yield
+    job_queue.shutdown()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -12,15 +47,152 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Compresses JSON and file bodies; text/event-stream is excluded so SSE still flushes per event
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 class ProjectRequest(BaseModel):
     user_request: str
+    # Attach the run's span tree (per-agent latency, tokens, cache hits) to the result
+    include_trace: bool = False
+    # Wall-clock budget for the run in seconds, counted from submission
+    budget_seconds: Optional[float] = None
+
+def strip_trace(result, include_trace):
+    if include_trace or not result:
+        return result
+    return {key: value for key, value in result.items() if key != 'trace'}
+
+def submit_job(user_request, budget_seconds=None):
+    try:
+        with deadline.budget(budget_seconds):
+            return job_queue.submit(user_request)
+    except QueueFull:
+        raise HTTPException(status_code=429, detail="Job queue is full, retry later", headers={'Retry-After': '10'})
+
+def get_job_or_404(job_id):
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/metrics")
+def metrics():
+    # Prometheus exposition: span latency histograms plus Gemini call/token/cache/retry counters
+    return Response(telemetry.render_prometheus(), media_type=telemetry.CONTENT_TYPE)
 
 @app.get("/health")
 def health_check():
-    return {"status": "ok"}
+    return {"status": "ok", "queued_jobs": job_queue.depth()}
 
 @app.post("/project")
-def submit_project(request: ProjectRequest):
-    result = run_orchestration(request.user_request)
-    return result 
\ No newline at end of file
+async def submit_project(request: ProjectRequest):
+    # Runs on the job pool; awaiting the future keeps Starlette's threadpool free
+    job = submit_job(request.user_request, request.budget_seconds)
+    future = job_queue.future(job['job_id'])
+    if future is None:
+        job = job_store.get(job['job_id'])
+    else:
+        try:
+            return strip_trace(await asyncio.wrap_future(future), request.include_trace)
+        except (JobCancelled, asyncio.CancelledError):
+            raise HTTPException(status_code=409, detail="Job was cancelled")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    if job['status'] != 'succeeded':
+        raise HTTPException(status_code=500, detail=job['error'] or f"Job {job['status']}")
+    return strip_trace(job['result'], request.include_trace)
+
+@app.post("/jobs", status_code=202)
+def create_job(request: ProjectRequest):
+    job = submit_job(request.user_request, request.budget_seconds)
+    return {'job_id': job['job_id'], 'status': job['status']}
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = get_job_or_404(job_id)
+    job.pop('result')
+    return job
+
+@app.get("/jobs/{job_id}/result")
+def job_result(job_id: str, include_trace: bool = False):
+    job = get_job_or_404(job_id)
+    if job['status'] == 'succeeded':
+        return strip_trace(job['result'], include_trace)
+    if job['status'] in ('queued', 'running'):
+        return JSONResponse(status_code=202, content={'job_id': job_id, 'status': job['status']})
+    raise HTTPException(status_code=409, detail=job['error'] or f"Job {job['status']}")
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    get_job_or_404(job_id)
+    job = job_queue.cancel(job_id)
+    job.pop('result')
+    return job
+
+def blob_response(request, digest, media_type='text/plain; charset=utf-8', cache_control='no-cache'):
+    # The content hash doubles as a strong ETag, so unchanged bodies revalidate with a 304
+    etag = f'"{digest}"'
+    headers = {'ETag': etag, 'Cache-Control': cache_control}
+    if request.headers.get('if-none-match') == etag:
+        return Response(status_code=304, headers=headers)
+    path = artifacts.blob_path(digest)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Blob not found")
+    return FileResponse(path, media_type=media_type, headers=headers)
+
+@app.get("/artifacts/{job_id}")
+def artifact_manifest(job_id: str):
+    manifest = artifacts.read_manifest(job_id)
+    if manifest is None:
+        raise HTTPException(status_code=404, detail="No artifacts for this job")
+    return manifest
+
+@app.get("/artifacts/{job_id}/files/{filename:path}")
+def artifact_file(job_id: str, filename: str, request: Request):
+    manifest = artifacts.read_manifest(job_id) or {}
+    entry = next((f for f in manifest.get('files_created', []) if f['filename'] == filename), None)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    return blob_response(request, entry['hash'])
+
+@app.get("/blobs/{digest}")
+def blob(digest: str, request: Request):
+    # Blobs are addressed by content, so they never change
+    try:
+        return blob_response(request, digest, cache_control='public, max-age=31536000, immutable')
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Blob not found")
+
+def sse(event):
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+@app.get("/project/stream")
+async def stream_project(user_request: str, include_trace: bool = False, budget: Optional[float] = None):
+    # Server-sent events: plan steps, finished files and test output as they happen. The
+    # run is a queued job like POST /jobs (same worker limit, 429 when full, cancellable);
+    # this only relays its events, waiting on the event loop rather than a thread.
+    job_id = submit_job(user_request, budget)['job_id']
+    feed = job_queue.feed(job_id)
+
+    async def events():
+        finished = False
+        try:
+            if feed is not None:
+                async for event in feed.follow():
+                    if event['type'] == 'result':
+                        finished = True
+                        event = {**event, 'result': strip_trace(event['result'], include_trace)}
+                    yield sse(event)
+            job = job_store.get(job_id)
+            if not finished:
+                if job['status'] == 'succeeded':
+                    yield sse({'type': 'result', 'result': strip_trace(job['result'], include_trace)})
+                else:
+                    yield sse({'type': 'error', 'message': job['error'] or f"Job {job['status']}"})
+            finished = True
+        finally:
+            if not finished:
+                # The client went away: stop the run instead of finishing it for nobody
+                job_queue.cancel(job_id)
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
@@ -1,20 +1,53 @@
 import sys
 import os
 import re
-import subprocess
-from typing import List, Dict, Any
+import uuid
+from typing import List, Dict, Any, Iterator
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from gemini_api import GeminiAPI
+from response_cache import ResponseCache
+from rate_limiter import RateLimiter
+from runner_pool import get_test_runner
+from artifact_store import ArtifactStore
+from events import EVENT_LOG, EventLog
+import deadline
+import telemetry
+
+# Shared across requests so every run reuses the same keep-alive connection pool and cache
+gemini = GeminiAPI(cache=ResponseCache.from_env(), rate_limiter=RateLimiter.from_env())
+# Per-job workspaces over a content-addressed blob store
+artifacts = ArtifactStore(os.getenv('ARTIFACT_ROOT', os.path.join(os.path.dirname(__file__), '../agent_output')))
+# Job progress goes to EVENT_LOG (if set) in the background; each job keeps only its recent messages
+event_log = EventLog(EVENT_LOG, console_level=None, artifacts=artifacts)
+
+CODE_BLOCK_RE = re.compile(r'```(?P<lang>\w+)?(?: filename=(?P<filename>[^\n]+))?\n(?P<code>[\s\S]*?)```')
+
+def _block_from_match(match) -> Dict[str, Any]:
+    lang = match.group('lang') or 'text'
+    code = match.group('code').strip()
+    filename = match.group('filename') or None
+    return {'language': lang, 'code': code, 'filename': filename}
 
 def extract_code_blocks(text: str) -> List[Dict[str, Any]]:
-    code_blocks = []
-    pattern = r'```(?P<lang>\w+)?(?: filename=(?P<filename>[^\n]+))?\n(?P<code>[\s\S]*?)```'
-    for match in re.finditer(pattern, text):
-        lang = match.group('lang') or 'text'
-        code = match.group('code').strip()
-        filename = match.group('filename') or None
-        code_blocks.append({'language': lang, 'code': code, 'filename': filename})
-    return code_blocks
+    return [_block_from_match(match) for match in CODE_BLOCK_RE.finditer(text)]
+
+class CodeBlockStream:
+    # Incremental extract_code_blocks: feed text chunks as they arrive and get back
+    # each fenced block as soon as its closing fence has been seen.
+    def __init__(self):
+        self.text = ''
+        self._pos = 0
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        self.text += chunk
+        blocks = []
+        while True:
+            match = CODE_BLOCK_RE.search(self.text, self._pos)
+            if not match:
+                break
+            blocks.append(_block_from_match(match))
+            self._pos = match.end()
+        return blocks
 
 def extract_plan(text: str) -> List[str]:
     plan = []
@@ -27,64 +60,131 @@ def extract_plan(text: str) -> List[str]:
                 plan.append(line)
     return plan
 
-def run_orchestration(user_prompt: str) -> Dict[str, Any]:
-    logs = []
-    gemini = GeminiAPI()
-    logs.append("Calling Gemini LLM...")
-    llm_output = gemini.call(user_prompt, modality='text')
-    logs.append("LLM response received.")
-    plan = extract_plan(llm_output)
-    code_blocks = extract_code_blocks(llm_output)
+LANGUAGE_EXTENSIONS = {
+    'python': 'py', 'py': 'py', 'javascript': 'js', 'js': 'js', 'jsx': 'jsx', 'typescript': 'ts', 'ts': 'ts',
+    'tsx': 'tsx', 'html': 'html', 'css': 'css', 'json': 'json', 'yaml': 'yml', 'yml': 'yml', 'sql': 'sql',
+    'bash': 'sh', 'sh': 'sh', 'shell': 'sh', 'toml': 'toml', 'markdown': 'md', 'md': 'md', 'cpp': 'cpp', 'c': 'c',
+    'java': 'java', 'go': 'go', 'rust': 'rs',
+}
+
+def _write_file(job_id: str, block: Dict[str, Any], index: int) -> Dict[str, Any]:
+    # Model-supplied names must stay inside the job workspace: a name that does not is
+    # reduced to its basename, and one that is still unusable ("..", "/") or missing
+    # becomes untitled_<index>.<ext>
+    filename = (block['filename'] or '').strip().rstrip('/\\')
+    for candidate in (filename, os.path.basename(filename)):
+        if not candidate or candidate in ('.', '..'):
+            continue
+        try:
+            entry = artifacts.write_file(job_id, candidate, block['code'])
+            break
+        except (ValueError, OSError):
+            continue
+    else:
+        extension = LANGUAGE_EXTENSIONS.get(block['language'].lower(), 'txt')
+        entry = artifacts.write_file(job_id, f"untitled_{index}.{extension}", block['code'])
+    return {'filename': entry['filename'], 'language': block['language'], 'size': entry['size'], 'hash': entry['hash']}
+
+def _count_spans(span: Dict[str, Any], attr: str) -> int:
+    return int(bool(span['attrs'].get(attr))) + sum(_count_spans(child, attr) for child in span['children'])
+
+def iter_orchestration(user_prompt: str, job_id: str = None, budget: float = None) -> Iterator[Dict[str, Any]]:
+    # Yields progress events (log, plan_step, file, test_result) as they happen and
+    # finishes with a 'result' event carrying the same dict run_orchestration returns.
+    # Files go to the job's own workspace; events and the result carry only a
+    # manifest (name, language, size, hash), bodies are served separately.
+    # The result's 'trace' is the span tree of this run (LLM streams, test runs).
+    # budget (seconds), or a deadline already in force, bounds every LLM stream and test
+    # run; the follow-up prompt and the test run are skipped once it is nearly spent.
+    job_id = job_id or uuid.uuid4().hex
+    limit = deadline.Deadline.after(budget) if budget else deadline.current()
+    trace = telemetry.Span('orchestration', job_id=job_id)
+    job_events = event_log.bind(job_id=job_id)
+
+    def log(message):
+        job_events.info('log', message)
+        return {'type': 'log', 'message': message}
+
     files_created = []
+    file_contents = {}
     test_results = {}
+    plan_steps = []
+
+    def stream_blocks(prompt, emit_plan):
+        blocks = CodeBlockStream()
+        chunks = gemini.stream(prompt, modality='text', role='coder')
+        if limit is not None:
+            chunks = deadline.within(chunks, limit)
+        for chunk in telemetry.traced_iter(chunks, trace):
+            for block in blocks.feed(chunk):
+                entry = _write_file(job_id, block, len(files_created) + 1)
+                files_created.append(entry)
+                file_contents[entry['filename']] = block['code']
+                yield {'type': 'file', **entry}
+                yield log(f"Created file: {entry['filename']}")
+            if not emit_plan:
+                continue
+            # Only complete lines can be trusted as plan steps while the text is still arriving
+            complete = blocks.text[:blocks.text.rfind('\n') + 1]
+            for step in extract_plan(complete)[len(plan_steps):]:
+                plan_steps.append(step)
+                yield {'type': 'plan_step', 'index': len(plan_steps) - 1, 'step': step}
+        return blocks.text
+
+    yield log("Calling Gemini LLM...")
+    llm_output = yield from stream_blocks(user_prompt, emit_plan=True)
+    yield log("LLM response received.")
+    plan = extract_plan(llm_output)
+    out_of_time = lambda: limit is not None and limit.remaining() < deadline.DEADLINE_RESERVE
     # If no code blocks, chain a follow-up prompt
-    if not code_blocks:
-        logs.append("No code blocks found. Sending follow-up prompt to generate code files.")
+    if not files_created and out_of_time():
+        yield log("No code blocks found, and too little of the time budget is left for a follow-up prompt.")
+    elif not files_created:
+        yield log("No code blocks found. Sending follow-up prompt to generate code files.")
         followup_prompt = (
             "Based on the plan you just gave, now generate the full code for the project. "
             "For each file, use a separate markdown code block with the filename, like this: "
             "```python filename=app.py\n# code here\n```\n. Only output code blocks, no extra explanation."
         )
-        llm_output2 = gemini.call(followup_prompt, modality='text')
-        logs.append("Follow-up LLM response received.")
-        code_blocks = extract_code_blocks(llm_output2)
+        llm_output2 = yield from stream_blocks(followup_prompt, emit_plan=False)
+        yield log("Follow-up LLM response received.")
         llm_output = llm_output + "\n\n---\n\n" + llm_output2
-    # Create files
-    output_dir = os.path.join(os.path.dirname(__file__), '../agent_output')
-    os.makedirs(output_dir, exist_ok=True)
-    for block in code_blocks:
-        filename = block['filename'] or f"untitled_{block['language']}.txt"
-        filepath = os.path.join(output_dir, filename)
-        with open(filepath, 'w') as f:
-            f.write(block['code'])
-        files_created.append({'filename': filename, 'language': block['language'], 'code': block['code']})
-        logs.append(f"Created file: {filename}")
     # Run tests if any test file is present
     test_file = next((f for f in files_created if 'test' in f['filename']), None)
-    if test_file:
-        logs.append(f"Running tests in {test_file['filename']}...")
+    if test_file and out_of_time():
+        yield log("Skipping tests: the time budget is nearly spent.")
+    elif test_file:
+        yield log(f"Running tests in {test_file['filename']}...")
         try:
-            proc = subprocess.run([
-                sys.executable, os.path.join(output_dir, test_file['filename'])
-            ], capture_output=True, text=True, timeout=20)
-            test_results = {
-                'status': 'success' if proc.returncode == 0 else 'error',
-                'stdout': proc.stdout,
-                'stderr': proc.stderr,
-                'returncode': proc.returncode,
-                'test_file': test_file['filename']
-            }
-            logs.append(f"Test run complete. Return code: {proc.returncode}")
+            # Sandboxed run on the pre-warmed pool; results are cached by file contents
+            with telemetry.activate(trace), deadline.activate(limit):
+                test_results = get_test_runner().run(file_contents, test_file['filename'])
+            yield {'type': 'test_result', 'test_results': test_results}
+            yield log(f"Test run complete. Return code: {test_results['returncode']}" + (" (cached)" if test_results['cached'] else ""))
         except Exception as e:
             test_results = {'status': 'error', 'stderr': str(e), 'test_file': test_file['filename']}
-            logs.append(f"Test run failed: {e}")
+            yield {'type': 'test_result', 'test_results': test_results}
+            yield log(f"Test run failed: {e}")
     else:
-        logs.append("No unittest found in generated files.")
-    logs.append("Orchestration complete.")
-    return {
+        yield log("No unittest found in generated files.")
+    yield log("Orchestration complete.")
+    llm_output_bytes = llm_output.encode('utf-8')
+    result = {
+        'job_id': job_id,
         'plan': plan,
         'files_created': files_created,
         'test_results': test_results,
-        'logs': logs,
-        'llm_output': llm_output
-    } 
\ No newline at end of file
+        'logs': [event['message'] for event in job_events.recent()],
+        'llm_output': {'size': len(llm_output_bytes), 'hash': artifacts.put_blob(llm_output_bytes)}
+    }
+    artifacts.write_manifest(job_id, result)
+    trace.finish()
+    result['trace'] = trace.to_dict()
+    # Streams that shared an identical in-flight request with another job
+    result['calls_saved'] = {'coalesced': _count_spans(result['trace'], 'coalesced')}
+    yield {'type': 'result', 'result': result}
+
+def run_orchestration(user_prompt: str, job_id: str = None, budget: float = None) -> Dict[str, Any]:
+    for event in iter_orchestration(user_prompt, job_id, budget):
+        if event['type'] == 'result':
+            return event['result']
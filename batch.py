@@ -0,0 +1,189 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, is_dataclass
+from gemini_api import GeminiAPI
+from response_cache import ResponseCache
+from rate_limiter import RateLimiter
+from model_router import ModelRouter
+from memory_store import MemoryStore
+from research_store import ResearchStore
+import events
+from checkpoint import CheckpointJournal
+from orchestrator import MEMORY_DB, build_agents, run_request
+
+# Unattended batch runs: streams requests from a JSONL file, runs them with bounded
+# concurrency under fixed approval policies, and appends one result line per request
+# as soon as it finishes. Requests already in the output file are skipped, so an
+# interrupted batch resumes where it stopped; a request that was mid-run continues
+# from its checkpoint journal in --checkpoint-dir. One GeminiAPI (connection pool, cache,
+# rate limiter), agent set and memory store is shared by every request.
+
+PLAN_POLICIES = ('approve', 'reject')
+DEPLOY_POLICIES = ('approve', 'on-success', 'reject')
+
+def request_id(item, line_number):
+    return str(item.get('request_id') or item.get('id') or f"line-{line_number}")
+
+def request_text(item):
+    if item.get('user_request'):
+        return item['user_request']
+    return '\n\n'.join(part for part in (item.get('title'), item.get('body')) if part)
+
+def iter_requests(path):
+    # Lazily, so a large backlog is never held in memory
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            if line.strip():
+                item = json.loads(line)
+                yield request_id(item, line_number), request_text(item)
+
+def finished_ids(path, retry_failed=False):
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut short by a crash; that request runs again
+                continue
+            if retry_failed and record.get('status') in ('failed', 'error'):
+                continue
+            done.add(record['request_id'])
+    return done
+
+def plan_policy(policy):
+    return lambda plan, replan: plan if policy == 'approve' else None
+
+def deploy_policy(policy):
+    if policy == 'approve':
+        return lambda context: True
+    if policy == 'on-success':
+        return lambda context: context.status != 'failed'
+    return lambda context: False
+
+class ResultWriter:
+    # Appends one JSON line per result; flushed and fsynced so a crash loses at most the line in flight
+    def __init__(self, path):
+        self._file = open(path, 'a')
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, default=_jsonable) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+def _jsonable(value):
+    if is_dataclass(value):
+        return asdict(value)
+    return str(value)
+
+def checkpoint_path(directory, rid):
+    safe = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in rid)
+    return os.path.join(directory, f"{safe}.jsonl")
+
+def run_one(rid, text, agents, memory, args):
+    start = time.monotonic()
+    journal = CheckpointJournal(checkpoint_path(args.checkpoint_dir, rid))
+    try:
+        context = run_request(text, agents, plan_policy(args.plan_policy), deploy_policy(args.deploy_policy),
+                              memory=memory, journal=journal, budget=args.budget)
+    except Exception as e:
+        return {'request_id': rid, 'status': 'error', 'error': str(e), 'duration': time.monotonic() - start}
+    finally:
+        journal.close()
+    return {
+        'request_id': rid,
+        'status': context.status,
+        'plan': context.plan,
+        'subtask_results': context.subtask_results,
+        'logs': list(context.logs),
+        'calls_saved': context.calls_saved,
+        'duration': time.monotonic() - start
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Run orchestration requests from a JSONL file without prompting.")
+    parser.add_argument('input', nargs='?', default='requests.jsonl',
+                        help="JSONL with 'user_request' or 'title'/'body', plus 'request_id'")
+    parser.add_argument('--output', default='batch_results.jsonl')
+    parser.add_argument('--checkpoint-dir', default='batch_checkpoints', help="Per-request checkpoint journals")
+    parser.add_argument('--concurrency', type=int, default=int(os.getenv('BATCH_CONCURRENCY', 2)))
+    parser.add_argument('--plan-policy', choices=PLAN_POLICIES, default='approve')
+    parser.add_argument('--deploy-policy', choices=DEPLOY_POLICIES, default='on-success')
+    parser.add_argument('--retry-failed', action='store_true', help="Run requests whose recorded status is failed/error again")
+    parser.add_argument('--budget', type=float, default=None, metavar='SECONDS', help="Wall-clock budget per request")
+    parser.add_argument('--limit', type=int, default=None, help="Stop after this many new requests")
+    parser.add_argument('--quiet', action='store_true', help="Suppress per-agent output")
+    args = parser.parse_args()
+
+    done = finished_ids(args.output, args.retry_failed)
+    gemini = GeminiAPI(cache=ResponseCache.from_env(), rate_limiter=RateLimiter.from_env(), router=ModelRouter.from_env())
+    research_store = ResearchStore.from_env()
+    agents = build_agents(gemini, research_store)
+    memory = MemoryStore(MEMORY_DB)
+    writer = ResultWriter(args.output)
+    # At most `concurrency` running plus as many queued, so the input is read as work frees up
+    slots = threading.BoundedSemaphore(args.concurrency * 2)
+    counts = {}
+    counts_lock = threading.Lock()
+    # Progress lines go to the real stdout even under --quiet
+    console = sys.stdout
+
+    def process(rid, text):
+        try:
+            record = run_one(rid, text, agents, memory, args)
+            writer.write(record)
+            # The result line is durable now, so the request's checkpoint is no longer needed
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(checkpoint_path(args.checkpoint_dir, rid))
+            with counts_lock:
+                counts[record['status']] = counts.get(record['status'], 0) + 1
+            print(f"[Batch] {rid}: {record['status']} in {record['duration']:.1f}s", file=console)
+        finally:
+            slots.release()
+
+    skipped = submitted = 0
+    output = open(os.devnull, 'w') if args.quiet else None
+    with contextlib.redirect_stdout(output) if output else contextlib.nullcontext():
+        with ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix='batch') as pool:
+            for rid, text in iter_requests(args.input):
+                if rid in done:
+                    skipped += 1
+                    continue
+                if args.limit is not None and submitted >= args.limit:
+                    break
+                slots.acquire()
+                pool.submit(process, rid, text)
+                submitted += 1
+        # Events still queued for the console belong under the same redirect
+        events.flush()
+    writer.close()
+    memory.close()
+
+    print(f"[Batch] {submitted} run, {skipped} already done: " + ', '.join(f"{n} {status}" for status, n in sorted(counts.items())))
+    if gemini.cache is not None:
+        print("[Response cache]", gemini.cache.stats())
+    if gemini.rate_limiter is not None:
+        print("[Rate limiter]", gemini.rate_limiter.stats())
+    if gemini.router is not None:
+        print("[Routing]", gemini.router.stats())
+        gemini.router.close()
+    if research_store is not None:
+        print("[Research store]", agents['research_agent'].stats)
+        research_store.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modality_classifier import Modality, ModalityClassifier
+
+# Offline accuracy and latency of the local modality classifier on labeled planner
+# output. Rows below the confidence threshold would go to the LLM fallback.
+
+DATA = os.path.join(os.path.dirname(__file__), 'data', 'modality_labeled.jsonl')
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the local modality classifier.")
+    parser.add_argument('--data', default=DATA)
+    parser.add_argument('--threshold', type=float, default=0.85)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    with open(args.data) as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    classifier = ModalityClassifier(threshold=args.threshold)
+
+    confident = correct_confident = correct_any = 0
+    errors = []
+    for row in rows:
+        expected = Modality(row['modality'])
+        predicted, confidence = classifier.predict(row['subtask'])
+        correct_any += predicted == expected
+        if confidence >= args.threshold:
+            confident += 1
+            correct_confident += predicted == expected
+        if predicted != expected:
+            errors.append((row['subtask'], expected.value, predicted.value, confidence))
+
+    latencies = []
+    for _ in range(args.repeat):
+        for row in rows:
+            t0 = time.perf_counter()
+            classifier.classify(row['subtask'])
+            latencies.append(time.perf_counter() - t0)
+    latencies.sort()
+
+    print(f"{len(rows)} labeled subtasks, threshold {args.threshold}")
+    print(f"coverage (decided locally):   {confident / len(rows):6.1%}  -> {len(rows) - confident} LLM fallbacks")
+    print(f"accuracy on local decisions:  {correct_confident / max(confident, 1):6.1%}")
+    print(f"accuracy of top guess (all):  {correct_any / len(rows):6.1%}")
+    print(f"latency per subtask:          p50={statistics.median(latencies) * 1e6:.1f}us "
+          f"p99={latencies[int(len(latencies) * 0.99)] * 1e6:.1f}us")
+    for subtask, expected, predicted, confidence in errors:
+        print(f"  miss: {subtask!r} expected={expected} predicted={predicted} p={confidence:.2f}")
+
+if __name__ == "__main__":
+    main()
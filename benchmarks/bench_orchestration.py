@@ -0,0 +1,193 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.mock_gemini import Cassette, agent_reply, start_mock_server, server_base_url
+
+# End-to-end orchestration benchmark against the local mock Gemini server (scripted
+# replies or a recorded cassette): orchestrator.execute_subtask,
+# backend.orchestrator.run_orchestration and concurrent POST /project. Reports
+# throughput, p50/p99 latency and Gemini calls per request, and compares against a
+# saved baseline so regressions fail the run.
+
+SCENARIOS = ('execute_subtask', 'run_orchestration', 'post_project')
+# Metrics where a larger value is a regression; throughput is the other way round
+LOWER_IS_BETTER = ('p50_ms', 'p99_ms', 'calls_per_request', 'errors')
+
+def summarize(latencies, errors, wall, calls):
+    latencies = sorted(latencies) or [0.0]
+    requests = len(latencies)
+    return {
+        'requests': requests,
+        'errors': errors,
+        'wall_s': round(wall, 3),
+        'throughput_rps': round(requests / wall, 3) if wall else 0.0,
+        'p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'p99_ms': round(latencies[min(requests - 1, int(requests * 0.99))] * 1000, 2),
+        'calls_per_request': round(calls / requests, 2),
+    }
+
+def run_concurrently(func, count, concurrency):
+    # Calls func(i) for every i; returns (latencies, errors, wall seconds)
+    latencies, errors = [], 0
+
+    def timed(i):
+        t0 = time.perf_counter()
+        ok = func(i)
+        return time.perf_counter() - t0, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for latency, ok in pool.map(timed, range(count)):
+            latencies.append(latency)
+            errors += not ok
+    return latencies, errors, time.perf_counter() - start
+
+def bench_execute_subtask(count, concurrency, workdir):
+    import orchestrator
+    from gemini_api import GeminiAPI
+    from memory_store import MemoryStore
+    # Measure the full agent pipeline, never a memoized result
+    orchestrator.MEMORY_MAX_AGE = 0
+    agents = orchestrator.build_agents(GeminiAPI())
+    memory = MemoryStore(os.path.join(workdir, 'memory.db'), legacy_json=os.path.join(workdir, 'none.json'))
+
+    def one(i):
+        context = orchestrator.Context(f"benchmark request {i}", memory=memory)
+        try:
+            orchestrator.execute_subtask(f"Implement the calculator module (variant {i})", context, agents)
+        except Exception:
+            return False
+        return context.status != 'failed'
+
+    return run_concurrently(one, count, concurrency)
+
+def bench_run_orchestration(count, concurrency, workdir):
+    from backend.orchestrator import run_orchestration
+
+    def one(i):
+        try:
+            result = run_orchestration(f"Build a calculator module with tests (variant {i})")
+        except Exception:
+            return False
+        return result['test_results'].get('status') == 'success'
+
+    return run_concurrently(one, count, concurrency)
+
+def bench_post_project(count, concurrency, workdir):
+    # In-process ASGI transport: the real app, job queue and event loop without a socket
+    import httpx
+    from backend.main import app
+
+    async def load():
+        latencies, errors = [], 0
+        semaphore = asyncio.Semaphore(concurrency)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench', timeout=600) as client:
+            async def one(i):
+                nonlocal errors
+                async with semaphore:
+                    t0 = time.perf_counter()
+                    response = await client.post('/project', json={'user_request': f"Build a calculator module (variant {i})"})
+                    latencies.append(time.perf_counter() - t0)
+                    errors += response.status_code != 200
+
+            start = time.perf_counter()
+            await asyncio.gather(*(one(i) for i in range(count)))
+            return latencies, errors, time.perf_counter() - start
+
+    return asyncio.run(load())
+
+BENCHMARKS = {
+    'execute_subtask': bench_execute_subtask,
+    'run_orchestration': bench_run_orchestration,
+    'post_project': bench_post_project,
+}
+
+def compare(results, baseline, tolerance):
+    # Returns the list of regressions beyond tolerance (a fraction, e.g. 0.2 = 20%)
+    regressions = []
+    for scenario, metrics in results.items():
+        base = baseline.get(scenario)
+        if not base:
+            continue
+        for metric in LOWER_IS_BETTER + ('throughput_rps',):
+            old, new = base.get(metric), metrics.get(metric)
+            if old is None or new is None:
+                continue
+            if metric in LOWER_IS_BETTER:
+                worse = new > old * (1 + tolerance) and new - old > (0 if metric in ('calls_per_request', 'errors') else 1.0)
+            else:
+                worse = new < old * (1 - tolerance)
+            change = f"{(new - old) / old:+.0%}" if old else f"{new - old:+g}"
+            print(f"  {scenario:<18} {metric:<18} {old:>10} -> {new:<10} {change:>6}{'  REGRESSION' if worse else ''}")
+            if worse:
+                regressions.append((scenario, metric, old, new))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark orchestration end to end against a mock Gemini endpoint.")
+    parser.add_argument('--requests', type=int, default=20, help="Requests per scenario")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--latency', default='lognormal:0.05,0.5', help="Mock latency: seconds or a distribution (see mock_gemini.make_latency)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of mock responses that are 429/503")
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--cassette', help="Replay Gemini responses from a recorded cassette instead of scripted replies")
+    parser.add_argument('--json', dest='json_out', help="Write results to this file")
+    parser.add_argument('--baseline', help="Compare against results saved earlier with --json")
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+
+    # Keep benchmark state (artifacts, jobs, memory) out of the working tree
+    workdir = tempfile.mkdtemp(prefix='bench-orchestration-')
+    os.environ['ARTIFACT_ROOT'] = os.path.join(workdir, 'artifacts')
+    os.environ['JOB_DB'] = os.path.join(workdir, 'jobs.db')
+    cassette = Cassette(args.cassette) if args.cassette else None
+    server = start_mock_server(latency=args.latency, reply=agent_reply, error_rate=args.error_rate,
+                               cassette=cassette, seed=args.seed)
+    os.environ['GEMINI_BASE_URL'] = server_base_url(server)
+    os.environ.setdefault('GEMINI_API_KEY', 'mock')
+
+    from runner_pool import get_test_runner
+    get_test_runner().warm()
+
+    print(f"{args.requests} requests per scenario, concurrency {args.concurrency}, latency {args.latency}, "
+          f"error rate {args.error_rate:.0%}" + (f", cassette {args.cassette}" if cassette else ""))
+    print(f"{'scenario':<18} {'req/s':>8} {'p50':>10} {'p99':>10} {'calls/req':>10} {'errors':>7}")
+    results = {}
+    for scenario in [s.strip() for s in args.scenarios.split(',') if s.strip()]:
+        before = server.request_count
+        # Agents print every step; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            latencies, errors, wall = BENCHMARKS[scenario](args.requests, args.concurrency, workdir)
+        stats = results[scenario] = summarize(latencies, errors, wall, server.request_count - before)
+        print(f"{scenario:<18} {stats['throughput_rps']:>8.2f} {stats['p50_ms']:>8.1f}ms {stats['p99_ms']:>8.1f}ms "
+              f"{stats['calls_per_request']:>10.2f} {stats['errors']:>7}")
+    if cassette is not None and cassette.misses:
+        print(f"warning: {cassette.misses} requests were not in the cassette")
+
+    if args.json_out:
+        with open(args.json_out, 'w') as f:
+            json.dump(results, f, indent=2)
+    server.shutdown()
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {args.baseline} (tolerance {args.tolerance:.0%}):")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s)")
+            sys.exit(1)
+        print("No regressions")
+
+if __name__ == "__main__":
+    main()
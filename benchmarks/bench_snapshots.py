@@ -0,0 +1,106 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from snapshot_store import SnapshotStore
+
+# Deploy-tree backup/rollback: the old full copytree per backup versus incremental
+# content-addressed snapshots. A synthetic tree is backed up, a fraction of its files
+# is changed (as a deploy would), backed up again, and rolled back to the first backup.
+
+def make_tree(root, files, size, rng):
+    for i in range(files):
+        path = os.path.join(root, f"pkg{i % 20}", f"mod{i % 7}", f"file{i}.bin")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(rng.randbytes(size))
+
+def deploy(root, fraction, rng):
+    # Rewrites a fraction of the files and adds a few new ones
+    paths = sorted(os.path.join(directory, name) for directory, _, names in os.walk(root) for name in names)
+    for path in rng.sample(paths, max(1, int(len(paths) * fraction))):
+        with open(path, 'wb') as f:
+            f.write(rng.randbytes(os.path.getsize(path)))
+    for i in range(max(1, int(len(paths) * fraction / 4))):
+        with open(os.path.join(root, f"new{i}.bin"), 'wb') as f:
+            f.write(rng.randbytes(1024))
+
+def disk_usage(root):
+    # Allocated bytes, counting each inode once
+    seen = set()
+    total = 0
+    for directory, _, names in os.walk(root):
+        for name in names:
+            st = os.lstat(os.path.join(directory, name))
+            if (st.st_dev, st.st_ino) not in seen:
+                seen.add((st.st_dev, st.st_ino))
+                total += st.st_blocks * 512
+    return total
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+def bench_copytree(target, workdir, fraction, seed):
+    # What DeploymentAgent.backup/rollback did: a full copy per backup and per rollback
+    rng = random.Random(seed)
+    first = os.path.join(workdir, 'backup-1')
+    second = os.path.join(workdir, 'backup-2')
+    result = {'backup': timed(lambda: shutil.copytree(target, first))}
+    deploy(target, fraction, rng)
+    result['incremental_backup'] = timed(lambda: shutil.copytree(target, second))
+    result['rollback'] = timed(lambda: shutil.copytree(first, target, dirs_exist_ok=True))
+    result['disk_bytes'] = disk_usage(first) + disk_usage(second)
+    return result
+
+def bench_snapshots(target, workdir, fraction, seed):
+    rng = random.Random(seed)
+    store = SnapshotStore(os.path.join(workdir, 'store'))
+    ids = []
+    result = {'backup': timed(lambda: ids.append(store.snapshot(target)))}
+    deploy(target, fraction, rng)
+    result['incremental_backup'] = timed(lambda: ids.append(store.snapshot(target)))
+    result['rollback'] = timed(lambda: store.restore(target, ids[0]))
+    result['disk_bytes'] = disk_usage(store.root)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark copytree backups against incremental snapshots.")
+    parser.add_argument('--files', type=int, default=2000)
+    parser.add_argument('--size', type=int, default=64 * 1024, help="Bytes per file")
+    parser.add_argument('--change', type=float, default=0.02, help="Fraction of files a deploy rewrites")
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--dir', help="Work directory (default: a temporary one, removed afterwards)")
+    parser.add_argument('--json', dest='json_out', help="Write results to this file")
+    args = parser.parse_args()
+
+    workdir = args.dir or tempfile.mkdtemp(prefix='bench-snapshots-')
+    try:
+        results = {}
+        for name, bench in (('copytree', bench_copytree), ('snapshots', bench_snapshots)):
+            # Both start from the same tree and apply the same deploy
+            target = os.path.join(workdir, name, 'target')
+            make_tree(target, args.files, args.size, random.Random(args.seed))
+            results[name] = bench(target, os.path.join(workdir, name), args.change, args.seed)
+    finally:
+        if not args.dir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{args.files} files x {args.size // 1024}KB, deploy rewrites {args.change:.0%}")
+    print(f"{'':<20} {'copytree':>12} {'snapshots':>12}")
+    for key in ('backup', 'incremental_backup', 'rollback'):
+        print(f"{key:<20} {results['copytree'][key] * 1000:>10.1f}ms {results['snapshots'][key] * 1000:>10.1f}ms")
+    print(f"{'disk (2 backups)':<20} {results['copytree']['disk_bytes'] / 2**20:>10.1f}MB "
+          f"{results['snapshots']['disk_bytes'] / 2**20:>10.1f}MB")
+    if args.json_out:
+        with open(args.json_out, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
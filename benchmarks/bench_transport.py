@@ -0,0 +1,76 @@
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import requests
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gemini_api import GeminiAPI
+from benchmarks.mock_gemini import start_mock_server, server_base_url
+
+# Per-call latency of the old one-connection-per-call transport versus the pooled
+# session and the async client, measured against a local mock endpoint.
+
+def summarize(label, latencies, wall):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{label:<28} mean={statistics.mean(latencies) * 1000:7.2f}ms "
+          f"p50={statistics.median(latencies) * 1000:7.2f}ms p99={p99 * 1000:7.2f}ms "
+          f"wall={wall:6.2f}s")
+
+def bench_unpooled(gemini, calls):
+    # What _call_text did before: module-level requests.post, new connection each time
+    latencies = []
+    start = time.perf_counter()
+    for i in range(calls):
+        t0 = time.perf_counter()
+        response = requests.post(gemini.api_url, headers=gemini._headers(), json=gemini._payload(f"prompt {i}"), timeout=30)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - t0)
+    return latencies, time.perf_counter() - start
+
+def bench_pooled(gemini, calls):
+    latencies = []
+    start = time.perf_counter()
+    for i in range(calls):
+        t0 = time.perf_counter()
+        gemini.call(f"prompt {i}")
+        latencies.append(time.perf_counter() - t0)
+    return latencies, time.perf_counter() - start
+
+async def bench_async(gemini, calls, concurrency):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            t0 = time.perf_counter()
+            await gemini.acall(f"prompt {i}")
+            latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    wall = time.perf_counter() - start
+    await gemini.aclose()
+    return latencies, wall
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark GeminiAPI transports against a local mock endpoint.")
+    parser.add_argument('--calls', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.0, help="Server-side latency per call in seconds")
+    parser.add_argument('--handshake', type=float, default=0.03, help="Simulated connection setup cost in seconds")
+    parser.add_argument('--concurrency', type=int, default=10)
+    args = parser.parse_args()
+
+    server = start_mock_server(latency=args.latency, handshake_delay=args.handshake)
+    gemini = GeminiAPI(api_key='mock', base_url=server_base_url(server), max_connections=args.concurrency)
+    print(f"{args.calls} calls, server latency {args.latency * 1000:.0f}ms, handshake {args.handshake * 1000:.0f}ms")
+    summarize("before: requests.post", *bench_unpooled(gemini, args.calls))
+    summarize("after: pooled session", *bench_pooled(gemini, args.calls))
+    summarize(f"after: acall x{args.concurrency}", *asyncio.run(bench_async(gemini, args.calls, args.concurrency)))
+    gemini.close()
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+import argparse
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+
+# Local stand-in for Gemini's generateContent, streamGenerateContent and cachedContents
+# endpoints, used by the benchmarks. Latency is drawn from a configurable distribution, a
+# fraction of requests can fail with 429/503, and replies are either scripted
+# (agent-aware, schema-aware) or replayed from a cassette recorded against the real API.
+
+class MockGeminiHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive between calls
+    protocol_version = "HTTP/1.1"
+    # Send headers and body in one segment; avoids Nagle/delayed-ACK stalls on reused sockets
+    disable_nagle_algorithm = True
+    wbufsize = -1
+
+    def setup(self):
+        super().setup()
+        # Stand-in for the TCP+TLS handshake a real endpoint costs on every new connection
+        if self.server.handshake_delay:
+            time.sleep(self.server.handshake_delay)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        raw = self.rfile.read(length) or b'{}'
+        body = json.loads(raw)
+        stream = ':streamGenerateContent' in self.path
+        with self.server.lock:
+            self.server.request_count += 1
+            delay = self.server.latency()
+            fail = self.server.error_rate and self.server.rng.random() < self.server.error_rate
+            status = self.server.rng.choice(self.server.error_statuses) if fail else 200
+        if delay:
+            time.sleep(delay)
+        if fail:
+            with self.server.lock:
+                self.server.error_count += 1
+            self._send_json(status, {'error': {'code': status, 'message': 'Injected mock error'}}, {'Retry-After': '0'})
+            return
+        if self.server.cassette is not None:
+            self._serve_cassette(self.path.split('?')[0], body, raw, stream)
+            return
+        if self.path.split('?')[0].endswith('/cachedContents'):
+            self._send_json(200, self.server.cached_contents.create(body))
+            return
+        prompt = body.get('contents', [{}])[0].get('parts', [{}])[0].get('text', '')
+        prefix = ''
+        if body.get('cachedContent'):
+            prefix = self.server.cached_contents.get(body['cachedContent'])
+            if prefix is None:
+                self._send_json(404, {'error': {'code': 404, 'message': 'CachedContent not found'}})
+                return
+        text = self.server.reply(prefix + prompt, body)
+        tokens = len(prefix + prompt) // 4
+        if stream:
+            self._send_stream([_text_event(text[i:i + 64], tokens) for i in range(0, len(text), 64)] or [_text_event('', tokens)])
+            return
+        event = _text_event(text, tokens)
+        if prefix:
+            event['usageMetadata']['cachedContentTokenCount'] = len(prefix) // 4
+        self._send_json(200, event)
+
+    def do_DELETE(self):
+        path = self.path.split('?')[0]
+        if self.server.cassette is not None and self.server.cassette.recording:
+            status, events = self.server.cassette.fetch_upstream(path, b'', self.headers.get('x-goog-api-key', ''), False,
+                                                                 method='DELETE')
+            self._send_json(status, events[0] if events else {})
+            return
+        self.server.cached_contents.delete(path[path.index('/cachedContents/') + 1:] if '/cachedContents/' in path else '')
+        self._send_json(200, {})
+
+    def _serve_cassette(self, path, body, raw, stream):
+        cassette = self.server.cassette
+        key = cassette_key(path, body)
+        if cassette.recording:
+            status, events = cassette.fetch_upstream(path, raw, self.headers.get('x-goog-api-key', ''), stream)
+            cassette.append(key, status, events)
+        else:
+            recorded = cassette.next(key)
+            if recorded is None:
+                self._send_json(404, {'error': {'code': 404, 'message': 'Request not found in cassette'}})
+                return
+            status, events = recorded
+        if status != 200:
+            self._send_json(status, events[0] if events else {})
+        elif stream:
+            self._send_stream(events)
+        else:
+            self._send_json(200, events[0])
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, events):
+        # SSE over chunked transfer encoding, one event per chunk
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for event in events:
+            data = f"data: {json.dumps(event)}\r\n\r\n".encode()
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+            if self.server.chunk_delay:
+                time.sleep(self.server.chunk_delay)
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, format, *args):
+        pass
+
+class MockGeminiServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+def _text_event(text, prompt_tokens=0):
+    return {
+        'candidates': [{'content': {'parts': [{'text': text}]}}],
+        'usageMetadata': {'promptTokenCount': prompt_tokens, 'candidatesTokenCount': len(text) // 4,
+                          'totalTokenCount': prompt_tokens + len(text) // 4}
+    }
+
+class CachedContents:
+    # In-memory stand-in for the cachedContents API: name -> prefix text, TTL ignored
+    def __init__(self):
+        self.entries = {}
+        self.created = 0
+        self._lock = threading.Lock()
+
+    def create(self, body):
+        text = ''.join(part.get('text', '') for content in body.get('contents', []) for part in content.get('parts', []))
+        with self._lock:
+            self.created += 1
+            name = f"cachedContents/mock-{self.created}"
+            self.entries[name] = text
+        return {'name': name, 'model': body.get('model'), 'usageMetadata': {'totalTokenCount': len(text) // 4}}
+
+    def get(self, name):
+        with self._lock:
+            return self.entries.get(name)
+
+    def delete(self, name):
+        with self._lock:
+            self.entries.pop(name, None)
+
+def make_latency(spec, seed=None):
+    # "0.05" or "fixed:0.05", "uniform:LOW,HIGH", "normal:MEAN,STDDEV",
+    # "lognormal:MEDIAN,SIGMA" or "exp:MEAN" (seconds) -> zero-argument sampler
+    if callable(spec):
+        return spec
+    rng = random.Random(seed)
+    spec = str(spec)
+    kind, args = spec.split(':', 1) if ':' in spec else ('fixed', spec)
+    values = [float(v) for v in args.split(',') if v.strip()]
+    if kind == 'fixed':
+        return lambda: values[0]
+    if kind == 'uniform':
+        return lambda: rng.uniform(values[0], values[1])
+    if kind == 'normal':
+        return lambda: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == 'lognormal':
+        mu = math.log(values[0])
+        return lambda: rng.lognormvariate(mu, values[1])
+    if kind == 'exp':
+        return lambda: rng.expovariate(1.0 / values[0])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+def echo_reply(prompt, body=None):
+    return f"[mock response to: {prompt[:40]}]"
+
+# Scripted replies for the built-in agents, enough to drive every branch of the
+# orchestration pipeline: a plan, code with a test file, passing structured tests.
+PROJECT_REPLY = """1. Implement the calculator module
+2. Write tests for the calculator (depends on: 1)
+
+```python filename=calculator.py
+def add(a, b):
+    return a + b
+
+
+def subtract(a, b):
+    return a - b
+```
+
+```python filename=test_calculator.py
+import unittest
+from calculator import add, subtract
+
+
+class TestCalculator(unittest.TestCase):
+    def test_add(self):
+        self.assertEqual(add(2, 3), 5)
+
+    def test_subtract(self):
+        self.assertEqual(subtract(5, 3), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
+```
+"""
+CODE_REPLY = """```python
+def add(a, b):
+    return a + b
+
+
+def subtract(a, b):
+    return a - b
+```
+"""
+SCHEMA_VALUES = {
+    'passed': True,
+    'details': 'All tests passed.',
+    'test_code': "from solution import add\n\n\ndef test_add():\n    assert add(2, 3) == 5\n",
+    'overall_rating': '8/10',
+    'documentation': "# Calculator\n\n`add(a, b)` and `subtract(a, b)` return the sum and difference of two numbers.",
+}
+
+def schema_reply(schema, name=None):
+    # JSON value shaped like an OpenAPI-style responseSchema
+    kind = str(schema.get('type', 'STRING')).upper()
+    if name in SCHEMA_VALUES:
+        return SCHEMA_VALUES[name]
+    if kind == 'OBJECT':
+        return {key: schema_reply(sub, key) for key, sub in schema.get('properties', {}).items()}
+    if kind == 'ARRAY':
+        return []
+    if kind == 'BOOLEAN':
+        return True
+    if kind in ('INTEGER', 'NUMBER'):
+        return 0
+    return ''
+
+def agent_reply(prompt, body=None):
+    schema = ((body or {}).get('generationConfig') or {}).get('responseSchema')
+    if schema:
+        return json.dumps(schema_reply(schema))
+    if 'modality selector' in prompt:
+        return 'code'
+    if 'software architect' in prompt:
+        return "1. Implement the calculator module\n2. Write tests for the calculator (depends on: 1)"
+    if 'technical writer' in prompt:
+        return "# Calculator\n\n`add(a, b)` and `subtract(a, b)` return the sum and difference of two numbers."
+    if 'technical researcher' in prompt:
+        return "Use the standard library; no third-party dependencies are needed."
+    if 'software engineer' in prompt or 'debugging expert' in prompt:
+        return CODE_REPLY
+    if 'meta-reasoning' in prompt:
+        return "Retry with a simpler implementation."
+    return PROJECT_REPLY
+
+def cassette_key(path, body):
+    canonical = json.dumps(body, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(f"{path}\x00{canonical}".encode()).hexdigest()
+
+class Cassette:
+    # JSONL of recorded interactions: {"key", "status", "events"}. When recording, requests
+    # are proxied to the real API; when replaying, the n-th identical request gets the n-th
+    # recorded answer (the last one repeats), so a replay is deterministic.
+    def __init__(self, path, upstream=None):
+        self.path = path
+        self.upstream = upstream.rstrip('/') if upstream else None
+        self.recording = upstream is not None
+        self.entries = {}
+        self.positions = {}
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+        if not self.recording:
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.entries.setdefault(entry['key'], []).append((entry['status'], entry['events']))
+
+    def next(self, key):
+        with self._lock:
+            recorded = self.entries.get(key)
+            if not recorded:
+                self.misses += 1
+                return None
+            position = self.positions.get(key, 0)
+            self.positions[key] = position + 1
+            return recorded[min(position, len(recorded) - 1)]
+
+    def fetch_upstream(self, path, raw, api_key, stream, method='POST'):
+        # path is /v1beta/models/... or /v1beta/cachedContents...; upstream is the real base URL including /v1beta
+        url = self.upstream + path[path.index('/', 1):]
+        headers = {'Content-Type': 'application/json', 'x-goog-api-key': api_key}
+        response = self._session.request(method, url, params={'alt': 'sse'} if stream else None, data=raw or None,
+                                         headers=headers, timeout=120)
+        if response.status_code != 200 or not stream:
+            try:
+                return response.status_code, [response.json()]
+            except ValueError:
+                return response.status_code, [{'error': {'message': response.text[:500]}}]
+        events = [json.loads(line[len('data:'):]) for line in response.iter_lines(decode_unicode=True)
+                  if line and line.startswith('data:')]
+        return 200, events
+
+    def append(self, key, status, events):
+        with self._lock:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps({'key': key, 'status': status, 'events': events}) + '\n')
+
+def start_mock_server(host='127.0.0.1', port=0, latency=0.0, handshake_delay=0.0, reply=echo_reply, chunk_delay=0.0,
+                      error_rate=0.0, error_statuses=(429, 503), cassette=None, seed=None):
+    server = MockGeminiServer((host, port), MockGeminiHandler)
+    server.reply = reply
+    server.chunk_delay = chunk_delay
+    server.latency = make_latency(latency, seed)
+    server.handshake_delay = handshake_delay
+    server.error_rate = error_rate
+    server.error_statuses = tuple(error_statuses)
+    server.cassette = cassette
+    server.cached_contents = CachedContents()
+    server.rng = random.Random(seed)
+    server.lock = threading.Lock()
+    server.request_count = 0
+    server.error_count = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+def server_base_url(server):
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}/v1beta"
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local mock Gemini endpoint (set GEMINI_BASE_URL to the printed URL).")
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', default='0', help="Seconds, or a distribution such as lognormal:0.8,0.5")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with 429/503")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--record', metavar='CASSETTE', help="Proxy to the real API and append every interaction")
+    parser.add_argument('--replay', metavar='CASSETTE', help="Answer from a recorded cassette")
+    parser.add_argument('--upstream', default="https://generativelanguage.googleapis.com/v1beta")
+    args = parser.parse_args()
+
+    cassette = None
+    if args.record:
+        cassette = Cassette(args.record, upstream=args.upstream)
+    elif args.replay:
+        cassette = Cassette(args.replay)
+    server = start_mock_server(port=args.port, latency=args.latency, reply=agent_reply, error_rate=args.error_rate,
+                               cassette=cassette, seed=args.seed)
+    print(f"Mock Gemini listening on {server_base_url(server)}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
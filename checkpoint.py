@@ -0,0 +1,68 @@
+import json
+import os
+import threading
+from dataclasses import asdict, is_dataclass
+
+# Append-only JSONL journal of finished orchestration stages, so an interrupted run
+# resumes without repeating any LLM call. Each line is {"p": path, "s": stage, "v": value}:
+# path is the subtask's position in the plan ("" for the request itself, "2" for the
+# third step, "2.0" for the first step of its MetaAgent breakdown), stage names the
+# step within execute_subtask ("code", "test.1", "review", "done", ...).
+
+class CheckpointJournal:
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # The line being written when the process died
+                        continue
+                    self.entries[(entry['p'], entry['s'])] = entry['v']
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'a')
+
+    def get(self, path, stage, default=None):
+        with self._lock:
+            return self.entries.get((path, stage), default)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self.entries
+
+    def record(self, path, stage, value):
+        line = json.dumps({'p': path, 's': stage, 'v': value}, separators=(',', ':'), default=_encode) + '\n'
+        with self._lock:
+            self.entries[(path, stage)] = json.loads(line)['v']
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+def _encode(value):
+    if is_dataclass(value):
+        return asdict(value)
+    return str(value)
+
+def path_key(path):
+    return '.'.join(str(i) for i in path)
+
+def checkpointed(journal, path, stage, func, decode=None):
+    # func()'s value, or the value recorded for (path, stage) by an earlier run
+    if journal is None:
+        return func()
+    key = path_key(path)
+    if (key, stage) in journal:
+        value = journal.get(key, stage)
+        return decode(value) if decode is not None else value
+    value = func()
+    journal.record(key, stage, value)
+    return value
@@ -0,0 +1,99 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Per-run time budgets. A Deadline set with budget() is carried in a context variable,
+# so it reaches every call made on behalf of the run: execute_subtask recursion (the
+# scheduler copies the context into its threads), the debugger attempts, each Gemini
+# request (whose timeout never outlasts it) and sandboxed test runs. Work that would
+# start after the deadline raises DeadlineExceeded; optional work is skipped once
+# running_low() says the remaining time is below DEADLINE_RESERVE.
+
+DEADLINE_RESERVE = float(os.getenv('DEADLINE_RESERVE', 30))
+
+class DeadlineExceeded(Exception):
+    pass
+
+class Deadline:
+    def __init__(self, at):
+        # time.monotonic() value
+        self.at = at
+
+    @classmethod
+    def after(cls, seconds):
+        return cls(time.monotonic() + seconds)
+
+    def remaining(self):
+        return max(0.0, self.at - time.monotonic())
+
+    def expired(self):
+        return time.monotonic() >= self.at
+
+    def __repr__(self):
+        return f"Deadline(remaining={self.remaining():.1f}s)"
+
+_current = ContextVar('deadline', default=None)
+
+def current():
+    return _current.get()
+
+def remaining():
+    # Seconds left, or None without a deadline
+    deadline = _current.get()
+    return deadline.remaining() if deadline is not None else None
+
+def expired():
+    deadline = _current.get()
+    return deadline is not None and deadline.expired()
+
+def running_low(reserve=None):
+    left = remaining()
+    return left is not None and left < (DEADLINE_RESERVE if reserve is None else reserve)
+
+def check(what='work'):
+    if expired():
+        raise DeadlineExceeded(f"Time budget exhausted before {what}")
+
+def timeout(default):
+    # default, shortened to the time left; raises once nothing is left
+    deadline = _current.get()
+    if deadline is None:
+        return default
+    left = deadline.remaining()
+    if left <= 0:
+        raise DeadlineExceeded("Time budget exhausted")
+    return min(default, left) if default is not None else left
+
+@contextmanager
+def activate(deadline):
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+@contextmanager
+def budget(seconds):
+    # A deadline `seconds` from now, never later than one already in force; None keeps the current one
+    outer = _current.get()
+    if seconds is None:
+        yield outer
+        return
+    deadline = Deadline.after(seconds)
+    if outer is not None and outer.at < deadline.at:
+        deadline = outer
+    with activate(deadline):
+        yield deadline
+
+def within(iterable, deadline):
+    # Advances iterable with deadline in force, without holding it across the caller's
+    # yields (like telemetry.traced_iter, for generators resumed from other threads)
+    iterator = iter(iterable)
+    while True:
+        with activate(deadline):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
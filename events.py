@@ -0,0 +1,259 @@
+import dataclasses
+import enum
+import hashlib
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from artifact_store import ArtifactStore
+
+# Structured run events instead of printing everything. emit() only builds a small
+# event dict, appends it to a bounded ring buffer of recent events and hands it to a
+# background thread; the caller never waits on terminal, pipe or disk I/O. That thread
+# writes JSON lines to EVENT_LOG (rotated by size) and one-line summaries to the
+# console. Strings longer than the inline limit (code, docs, test output) are stored
+# once in the content-addressed ArtifactStore and the event carries only their hash,
+# size and path. When the queue is full, events are dropped and counted, not waited on.
+
+LEVELS = {'debug': 10, 'info': 20, 'warning': 30, 'error': 40}
+EVENT_LOG = os.getenv('EVENT_LOG')
+EVENT_LEVEL = os.getenv('EVENT_LEVEL', 'info')
+EVENT_CONSOLE_LEVEL = os.getenv('EVENT_CONSOLE_LEVEL', 'info')
+EVENT_LOG_MAX_BYTES = int(os.getenv('EVENT_LOG_MAX_BYTES', 10 * 1024 * 1024))
+EVENT_LOG_BACKUPS = int(os.getenv('EVENT_LOG_BACKUPS', 5))
+EVENT_RING_SIZE = int(os.getenv('EVENT_RING_SIZE', 200))
+EVENT_INLINE_BYTES = int(os.getenv('EVENT_INLINE_BYTES', 1024))
+ARTIFACT_ROOT = os.getenv('ARTIFACT_ROOT', 'agent_output')
+PREVIEW_CHARS = 80
+
+class JsonlSink:
+    def __init__(self, path, max_bytes=EVENT_LOG_MAX_BYTES, backups=EVENT_LOG_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(path, 'ab')
+        self._size = self._file.tell()
+
+    def write(self, events):
+        for event in events:
+            line = (json.dumps(event, default=str) + '\n').encode('utf-8')
+            if self._size and self._size + len(line) > self.max_bytes:
+                self._rotate()
+            self._file.write(line)
+            self._size += len(line)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def _rotate(self):
+        # events.jsonl -> events.jsonl.1 -> ... -> events.jsonl.<backups>, the oldest dropped
+        self._file.close()
+        if self.backups > 0:
+            for i in range(self.backups - 1, 0, -1):
+                if os.path.exists(f"{self.path}.{i}"):
+                    os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, 'ab')
+        self._size = 0
+
+class ConsoleSink:
+    def __init__(self, level=EVENT_CONSOLE_LEVEL, stream=None):
+        self.level = LEVELS[level]
+        # None: whatever sys.stdout is at write time (batch --quiet redirects it)
+        self.stream = stream
+
+    def write(self, events):
+        lines = [format_event(event) for event in events if LEVELS[event['level']] >= self.level]
+        if lines:
+            stream = self.stream or sys.stdout
+            stream.write('\n'.join(lines) + '\n')
+            stream.flush()
+
+    def close(self):
+        pass
+
+def format_event(event):
+    line = '  ' * event.get('depth', 0) + event.get('message', '')
+    refs = [f"{name}: {value['size']} bytes, sha256:{value['sha256'][:12]}"
+            for name, value in event.items() if isinstance(value, dict) and 'sha256' in value]
+    return f"{line} [{'; '.join(refs)}]" if refs else line
+
+class _Writer:
+    # The one background thread behind an EventLog and everything bound from it
+    def __init__(self, sinks, artifacts, max_queue):
+        self.sinks = sinks
+        self.artifacts = artifacts
+        self.dropped = 0
+        self._queue = queue.Queue(max_queue)
+        self._thread = threading.Thread(target=self._run, name='event-writer', daemon=True)
+        self._thread.start()
+
+    def put(self, event, blobs):
+        try:
+            self._queue.put_nowait((event, blobs))
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        self._queue.join()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        for sink in self.sinks:
+            sink.close()
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            while len(items) < 256:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in items
+            events = []
+            for item in items:
+                if item is None:
+                    continue
+                event, blobs = item
+                for data in blobs:
+                    self._store(data)
+                events.append(event)
+            for sink in self.sinks:
+                try:
+                    sink.write(events)
+                except Exception as e:
+                    print(f"[Events] {type(sink).__name__} failed: {e}", file=sys.stderr)
+            for _ in items:
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _store(self, data):
+        try:
+            self.artifacts.put_blob(data)
+        except OSError as e:
+            print(f"[Events] Could not store artifact: {e}", file=sys.stderr)
+
+class EventLog:
+    def __init__(self, path=None, level=EVENT_LEVEL, console_level=EVENT_CONSOLE_LEVEL, ring_size=EVENT_RING_SIZE,
+                 max_bytes=EVENT_LOG_MAX_BYTES, backups=EVENT_LOG_BACKUPS, max_queue=10000, artifacts=None,
+                 inline_limit=EVENT_INLINE_BYTES):
+        self.level = LEVELS[level]
+        # Recent events only; older ones live in the JSONL file
+        self.ring = deque(maxlen=ring_size)
+        self.artifacts = artifacts
+        self.inline_limit = inline_limit
+        # Added to every event (e.g. the run or job id); see bind()
+        self.fields = {}
+        sinks = []
+        if path:
+            sinks.append(JsonlSink(path, max_bytes, backups))
+        if console_level not in (None, 'off'):
+            sinks.append(ConsoleSink(console_level))
+        self._writer = _Writer(sinks, artifacts, max_queue) if sinks or artifacts is not None else None
+        self._owner = True
+
+    @classmethod
+    def from_env(cls, console=True):
+        return cls(EVENT_LOG, console_level=EVENT_CONSOLE_LEVEL if console else None,
+                   artifacts=ArtifactStore(ARTIFACT_ROOT))
+
+    def bind(self, ring_size=None, **fields):
+        # Same sinks and thread, its own ring buffer and extra fields
+        child = object.__new__(type(self))
+        child.__dict__.update(self.__dict__)
+        child.ring = deque(maxlen=ring_size or self.ring.maxlen)
+        child.fields = {**self.fields, **fields}
+        child._owner = False
+        return child
+
+    def emit(self, level, kind, message='', **fields):
+        if LEVELS[level] < self.level:
+            return None
+        blobs = []
+        event = {'ts': round(time.time(), 3), 'level': level, 'kind': kind, 'message': message, **self.fields}
+        for name, value in fields.items():
+            event[name] = self._compact(value, blobs)
+        self.ring.append(event)
+        if self._writer is not None:
+            self._writer.put(event, blobs)
+        return event
+
+    def debug(self, kind, message='', **fields):
+        return self.emit('debug', kind, message, **fields)
+
+    def info(self, kind, message='', **fields):
+        return self.emit('info', kind, message, **fields)
+
+    def warning(self, kind, message='', **fields):
+        return self.emit('warning', kind, message, **fields)
+
+    def error(self, kind, message='', **fields):
+        return self.emit('error', kind, message, **fields)
+
+    def recent(self, n=None):
+        events = list(self.ring)
+        return events[-n:] if n else events
+
+    @property
+    def dropped(self):
+        return self._writer.dropped if self._writer is not None else 0
+
+    def flush(self):
+        # Waits until everything emitted so far has been written (e.g. before prompting)
+        if self._writer is not None:
+            self._writer.flush()
+
+    def close(self):
+        if self._owner and self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def _compact(self, value, blobs):
+        # JSON-ready copy of value with long strings replaced by artifact references
+        if isinstance(value, str):
+            data = value.encode('utf-8')
+            if len(data) <= self.inline_limit:
+                return value
+            digest = hashlib.sha256(data).hexdigest()
+            ref = {'sha256': digest, 'size': len(data), 'preview': value[:PREVIEW_CHARS]}
+            if self.artifacts is not None:
+                blobs.append(data)
+                ref['path'] = self.artifacts.blob_path(digest)
+            return ref
+        if isinstance(value, enum.Enum):
+            return value.value
+        if dataclasses.is_dataclass(value) and not isinstance(value, type):
+            value = dataclasses.asdict(value)
+        if isinstance(value, dict):
+            return {str(key): self._compact(item, blobs) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [self._compact(item, blobs) for item in value]
+        if value is None or isinstance(value, (bool, int, float)):
+            return value
+        return self._compact(str(value), blobs)
+
+_default = None
+_default_lock = threading.Lock()
+
+def default_log():
+    # Process-wide EventLog from the environment, created on first use
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = EventLog.from_env()
+        return _default
+
+def flush():
+    if _default is not None:
+        _default.flush()
@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useEffect, useState } from 'react';
 import './App.css';
 
 const EXAMPLES = [
@@ -19,6 +19,24 @@ const EXAMPLES = [
   "Create a SQL query to find the top 5 customers by total purchase amount.",
 ];
 
+const API_URL = 'http://localhost:8000';
+
+// File bodies and raw model output are content-addressed blobs fetched on demand
+function useBlob(hash, enabled = true) {
+  const [body, setBody] = useState(null);
+  useEffect(() => {
+    setBody(null);
+    if (!hash || !enabled) return;
+    let cancelled = false;
+    fetch(`${API_URL}/blobs/${hash}`)
+      .then(res => res.ok ? res.text() : Promise.reject(res.statusText))
+      .then(text => { if (!cancelled) setBody(text); })
+      .catch(() => { if (!cancelled) setBody(''); });
+    return () => { cancelled = true; };
+  }, [hash, enabled]);
+  return body;
+}
+
 function StatusBar({ response }) {
   if (!response) return null;
   const files = response.files_created || [];
@@ -64,15 +82,16 @@ function FileExplorer({ files, onSelect, selected }) {
 }
 
 function CodeViewer({ file }) {
+  const code = useBlob(file?.hash);
   if (!file) return <div className="code-viewer empty">Select a file to view its code.</div>;
   return (
     <div className="code-viewer">
       <div className="code-header">
         <span className="file-icon">📄</span> {file.filename}
-        <button className="copy-btn" onClick={() => navigator.clipboard.writeText(file.code)}>Copy</button>
-        <a className="download-btn" href={`data:text/plain;charset=utf-8,${encodeURIComponent(file.code)}`} download={file.filename}>Download</a>
+        <button className="copy-btn" disabled={code === null} onClick={() => navigator.clipboard.writeText(code)}>Copy</button>
+        <a className="download-btn" href={`${API_URL}/blobs/${file.hash}`} download={file.filename}>Download</a>
       </div>
-      <pre><code>{file.code}</code></pre>
+      <pre><code>{code === null ? 'Loading...' : code}</code></pre>
     </div>
   );
 }
@@ -105,11 +124,12 @@ function AgentLogs({ logs }) {
 
 function LLMOutput({ output }) {
   const [show, setShow] = useState(false);
+  const text = useBlob(output?.hash, show);
   if (!output) return null;
   return (
     <div className="llm-output">
       <button className="toggle-btn" onClick={() => setShow(s => !s)}>{show ? 'Hide' : 'Show'} Raw LLM Output</button>
-      {show && <pre className="llm-raw"><code>{output}</code></pre>}
+      {show && <pre className="llm-raw"><code>{text === null ? 'Loading...' : text}</code></pre>}
     </div>
   );
 }
@@ -123,33 +143,52 @@ function App() {
 
   const handleExample = (ex) => setRequest(ex);
 
-  const handleSubmit = async (e) => {
+  const handleSubmit = (e) => {
     e.preventDefault();
     setLoading(true);
     setError(null);
-    setResponse(null);
+    setResponse({ plan: [], files_created: [], test_results: {}, logs: [] });
     setSelectedFile(null);
-    try {
-      const res = await fetch('http://localhost:8000/project', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ user_request: request })
-      });
-      if (!res.ok) throw new Error('API error');
-      const data = await res.json();
-      setResponse(data);
-    } catch (err) {
-      setError(err.message);
-    } finally {
+    // Stream progress over server-sent events so plan steps and files show up as they are produced
+    const source = new EventSource(`${API_URL}/project/stream?user_request=${encodeURIComponent(request)}`);
+    let finished = false;
+    const update = (fn) => setResponse(prev => ({ ...prev, ...fn(prev) }));
+    source.addEventListener('plan_step', (ev) => {
+      const { step } = JSON.parse(ev.data);
+      update(prev => ({ plan: [...prev.plan, step] }));
+    });
+    source.addEventListener('file', (ev) => {
+      const { filename, language, size, hash } = JSON.parse(ev.data);
+      update(prev => ({ files_created: [...prev.files_created, { filename, language, size, hash }] }));
+    });
+    source.addEventListener('test_result', (ev) => {
+      const { test_results } = JSON.parse(ev.data);
+      update(() => ({ test_results }));
+    });
+    source.addEventListener('log', (ev) => {
+      const { message } = JSON.parse(ev.data);
+      update(prev => ({ logs: [...prev.logs, message] }));
+    });
+    source.addEventListener('result', (ev) => {
+      finished = true;
+      setResponse(JSON.parse(ev.data).result);
+      source.close();
       setLoading(false);
-    }
+    });
+    source.onerror = (ev) => {
+      source.close();
+      if (!finished) {
+        setError(ev.data ? JSON.parse(ev.data).message : 'API error');
+        setLoading(false);
+      }
+    };
   };
 
   const files = response?.files_created || [];
   const plan = response?.plan || [];
   const logs = response?.logs || [];
   const testResults = response?.test_results || {};
-  const llmOutput = response?.llm_output || '';
+  const llmOutput = response?.llm_output || null;
 
   return (
     <div className="app-container">
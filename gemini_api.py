@@ -1,36 +1,583 @@
+import asyncio
+import json
 import os
+import random
+import threading
+import time
 from dotenv import load_dotenv
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+from response_cache import ResponseCache
+from rate_limiter import estimate_tokens, priority_for
+from hedging import LatencyWindow, ahedged, hedged
+from single_flight import AsyncSingleFlight, SingleFlight, record_saved
+from concurrent.futures import ThreadPoolExecutor
+import deadline
+import telemetry
 
 load_dotenv()
 
+DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+DEFAULT_MODEL = "gemini-2.5-flash"
+RETRYABLE_STATUS = (429, 503)
+# Output budget assumed when reserving tokens/minute before the real usage is known
+EXPECTED_OUTPUT_TOKENS = 1024
+# Shorter prefixes are sent inline: explicit context caching has a minimum size
+PREFIX_MIN_TOKENS = int(os.getenv('GEMINI_PREFIX_MIN_TOKENS', 1024))
+PREFIX_TTL = int(os.getenv('GEMINI_PREFIX_TTL', 3600))
+# Percentile of recent latencies after which a duplicate request is sent (unset = no hedging)
+HEDGE_PERCENTILE = float(os.environ['GEMINI_HEDGE_PERCENTILE']) if os.getenv('GEMINI_HEDGE_PERCENTILE') else None
+# What an expired or evicted cachedContent is answered with
+STALE_PREFIX_STATUS = (400, 403, 404)
+# Identical concurrent cacheable calls share one request unless GEMINI_SINGLE_FLIGHT=0
+SINGLE_FLIGHT = os.getenv('GEMINI_SINGLE_FLIGHT', '1').lower() not in ('0', 'false', 'no')
+
+def _annotate(**attrs):
+    span = telemetry.current_span()
+    if span is not None:
+        span.set(**attrs)
+
+class GeminiAPIError(Exception):
+    pass
+
+class GeminiRateLimitError(GeminiAPIError):
+    pass
+
+class CachedPrefix:
+    # A long prompt prefix shared by many calls (see GeminiAPI.create_cached_prefix).
+    # With a name it lives server-side in cachedContents and calls send only their
+    # suffix; without one it is prepended to each prompt.
+    def __init__(self, text, name=None, tokens=0, model=None):
+        self.text = text
+        self.name = name
+        self.tokens = tokens
+        # cachedContents belong to one model; calls routed elsewhere send the text inline
+        self.model = model
+
+    def __repr__(self):
+        return f"CachedPrefix(name={self.name!r}, model={self.model!r}, tokens={self.tokens})"
+
 class GeminiAPI:
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, base_url=None, model=None, max_connections=20, timeout=30, cache=None,
+                 rate_limiter=None, max_retries=4, router=None, hedge_percentile=HEDGE_PERCENTILE,
+                 single_flight=SINGLE_FLIGHT):
         self.api_key = api_key or os.getenv('GEMINI_API_KEY')
-        self.api_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent"
+        self.base_url = (base_url or os.getenv('GEMINI_BASE_URL') or DEFAULT_BASE_URL).rstrip('/')
+        self.model = model or DEFAULT_MODEL
+        self.api_url = f"{self.base_url}/models/{self.model}:generateContent"
+        self.stream_url = f"{self.base_url}/models/{self.model}:streamGenerateContent"
+        self.max_connections = max_connections
+        self.timeout = timeout
+        # Opt-in ResponseCache; None disables caching
+        self.cache = cache
+        # Optional RateLimiter shared by everything using this instance
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        # Optional ModelRouter choosing the model per role; None sends everything to self.model
+        self.router = router
+        # Hedging: recent latencies per (URL, role), and threads for the duplicate requests.
+        # Roles differ a lot in output length, so each gets its own percentile.
+        self.hedge_percentile = hedge_percentile
+        self._latencies = {}
+        self._hedge_pool = None
+        # Single-flight: concurrent identical calls (those allowed to use the cache) share one request
+        self._flights = SingleFlight() if single_flight else None
+        self._aflights = AsyncSingleFlight() if single_flight else None
+        # Persistent keep-alive pool shared by every agent holding this instance,
+        # so only the first call to a host pays for the TCP+TLS handshake.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_connections)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        # An async client is bound to the event loop it was created on, so there is one per
+        # loop, each with a guard task that closes it when the loop shuts down.
+        self._async_clients = {}
+        self._stats_lock = threading.Lock()
+        self.prefix_stats = {'created': 0, 'inline': 0, 'reused_tokens': 0}
+        self.flight_stats = {'coalesced': 0}
+
+    # call/acall/stream raise GeminiAPIError (GeminiRateLimitError once 429/503 retries
+    # are exhausted) instead of handing error text to the agents as if it were output.
+    # response_schema (an OpenAPI-style dict) asks Gemini for JSON matching that schema
+    # via generationConfig.responseMimeType/responseSchema; the text returned is the JSON.
+    # cached_prefix (a CachedPrefix) goes before the prompt, by reference when it is cached.
+    def call(self, prompt, modality='text', use_cache=True, role=None, response_schema=None, cached_prefix=None):
+        prompt, cached_prefix = self._resolve_prefix(prompt, cached_prefix)
+        with telemetry.span('gemini.call', role=role, modality=modality):
+            call = lambda: self._call(prompt, modality, use_cache, role, response_schema, cached_prefix)
+            key = self._flight_key(prompt, modality, use_cache, role, response_schema, cached_prefix)
+            if key is None:
+                return call()
+            text, shared = self._flights.do(key, call)
+            if shared:
+                self._coalesced(role)
+            return text
+
+    async def acall(self, prompt, modality='text', use_cache=True, role=None, response_schema=None, cached_prefix=None):
+        prompt, cached_prefix = self._resolve_prefix(prompt, cached_prefix)
+        with telemetry.span('gemini.call', role=role, modality=modality):
+            call = lambda: self._acall(prompt, modality, use_cache, role, response_schema, cached_prefix)
+            key = self._flight_key(prompt, modality, use_cache, role, response_schema, cached_prefix)
+            if key is None:
+                return await call()
+            text, shared = await self._aflights.do(key, call)
+            if shared:
+                self._coalesced(role)
+            return text
+
+    def create_cached_prefix(self, text, ttl=PREFIX_TTL, role=None):
+        # Stores text as a cachedContents entry so later calls reference it instead of
+        # re-sending it. Falls back to an inline prefix when the text is below the caching
+        # minimum, there is no API key, or the cache cannot be created.
+        tokens = estimate_tokens(text)
+        if not self.api_key or tokens < PREFIX_MIN_TOKENS:
+            return self._inline_prefix(text, tokens)
+        payload = {
+            "model": f"models/{self.model}",
+            "contents": [{"role": "user", "parts": [{"text": text}]}],
+            "ttl": f"{int(ttl)}s"
+        }
+        with telemetry.span('gemini.cache_create', role=role):
+            try:
+                response = self.session.post(f"{self.base_url}/cachedContents", headers=self._headers(), json=payload,
+                                             timeout=self.timeout)
+                body = response.json()
+            except (requests.RequestException, ValueError) as e:
+                _annotate(error=type(e).__name__)
+                return self._inline_prefix(text, tokens)
+            if response.status_code >= 400 or 'name' not in body:
+                _annotate(error=response.status_code)
+                return self._inline_prefix(text, tokens)
+            tokens = (body.get('usageMetadata') or {}).get('totalTokenCount', tokens)
+            _annotate(prefix_tokens=tokens)
+        with self._stats_lock:
+            self.prefix_stats['created'] += 1
+        return CachedPrefix(text, name=body['name'], tokens=tokens, model=self.model)
+
+    def delete_cached_prefix(self, prefix):
+        if prefix is None or prefix.name is None:
+            return
+        name, prefix.name = prefix.name, None
+        try:
+            self.session.delete(f"{self.base_url}/{name}", headers=self._headers(), timeout=self.timeout)
+        except requests.RequestException:
+            # It still expires with its TTL
+            pass
+
+    def _inline_prefix(self, text, tokens):
+        with self._stats_lock:
+            self.prefix_stats['inline'] += 1
+        return CachedPrefix(text, tokens=tokens)
+
+    def _resolve_prefix(self, prompt, cached_prefix, model=None):
+        if cached_prefix is not None and (cached_prefix.name is None or (model is not None and model != cached_prefix.model)):
+            return cached_prefix.text + prompt, None
+        return prompt, cached_prefix
 
-    def call(self, prompt, modality='text'):
+    def _flight_key(self, prompt, modality, use_cache, role, response_schema=None, cached_prefix=None, method='generateContent'):
+        # Calls that may be answered from the cache may share a request; the role is part
+        # of the key because it picks the models and the validator
+        if self._flights is None or not use_cache:
+            return None
+        return ResponseCache.make_key(method, ','.join(self._models(role)), role, modality, prompt,
+                                      json.dumps(response_schema, sort_keys=True),
+                                      cached_prefix.text if cached_prefix is not None else '')
+
+    def _coalesced(self, role):
+        telemetry.count('agentic_gemini_coalesced_total', role=role or '')
+        _annotate(coalesced=True)
+        record_saved('coalesced')
+        with self._stats_lock:
+            self.flight_stats['coalesced'] += 1
+
+    def _models(self, role):
+        return self.router.models(role) if self.router is not None else [self.model]
+
+    def _url(self, model, method='generateContent'):
+        return f"{self.base_url}/models/{model}:{method}"
+
+    def _accept(self, model, role, text, response_schema, started, last):
+        # Without a router every answer is final. With one, an answer its validator rejects
+        # escalates to the next model of the role's route (the last model's answer stands).
+        if self.router is None:
+            return True
+        span = telemetry.current_span()
+        attrs = dict(span.attrs) if span is not None else {}
+        accepted = self.router.validate(role, text, response_schema)
+        self.router.record(role, model, accepted, time.monotonic() - started,
+                           attrs.get('prompt_tokens', 0), attrs.get('response_tokens', 0))
+        _annotate(model=model)
+        if not accepted and not last:
+            telemetry.count('agentic_gemini_escalations_total', role=role or '')
+            if span is not None:
+                span.add('escalations')
+        return accepted or last
+
+    def stream(self, prompt, modality='text', use_cache=True, role=None):
+        # Yields the response text incrementally as the model produces it
+        span = telemetry.start_span('gemini.stream', role=role, modality=modality)
+        try:
+            yield from telemetry.traced_iter(self._stream(prompt, modality, use_cache, role), span)
+        except BaseException as e:
+            span.set(error=type(e).__name__)
+            raise
+        finally:
+            span.finish()
+
+    def _call(self, prompt, modality, use_cache, role, response_schema, cached_prefix=None):
+        telemetry.count('agentic_gemini_calls_total', role=role or '')
         if not self.api_key:
             # Fallback to stub if no API key
             return f"[Gemini {modality} response to: {prompt}]"
-        if modality == 'text':
-            return self._call_text(prompt)
-        # Add other modalities as needed
-        return f"[Gemini {modality} response to: {prompt}]"
+        if modality != 'text':
+            # Add other modalities as needed
+            return f"[Gemini {modality} response to: {prompt}]"
+        models = self._models(role)
+        route = self._route(prompt, modality, use_cache, response_schema, cached_prefix, models)
+        for _, _, key in route:
+            cached = self._get_cached(key, role)
+            if cached is not None:
+                return cached
+        for tier, (sent, prefix, key) in enumerate(route):
+            model = models[tier]
+            started = time.monotonic()
+            text = self._request_text(sent, role, response_schema, prefix, model)
+            if self._accept(model, role, text, response_schema, started, tier == len(models) - 1):
+                if key is not None:
+                    self.cache.set(key, text)
+                return text
+
+    async def _acall(self, prompt, modality, use_cache, role, response_schema, cached_prefix=None):
+        telemetry.count('agentic_gemini_calls_total', role=role or '')
+        if not self.api_key or modality != 'text':
+            return f"[Gemini {modality} response to: {prompt}]"
+        models = self._models(role)
+        route = self._route(prompt, modality, use_cache, response_schema, cached_prefix, models)
+        for _, _, key in route:
+            cached = self._get_cached(key, role)
+            if cached is not None:
+                return cached
+        for tier, (sent, prefix, key) in enumerate(route):
+            model = models[tier]
+            started = time.monotonic()
+            text = await self._arequest_text(sent, role, response_schema, prefix, model)
+            if self._accept(model, role, text, response_schema, started, tier == len(models) - 1):
+                if key is not None:
+                    self.cache.set(key, text)
+                return text
+
+    def _route(self, prompt, modality, use_cache, response_schema, cached_prefix, models):
+        # Every tier's cache key is checked before sending anything, so repeating a call whose
+        # cheap model was rejected goes straight to the cached escalated answer
+        route = []
+        for model in models:
+            sent, prefix = self._resolve_prefix(prompt, cached_prefix, model)
+            key = self._cache_key(sent, modality, response_schema, prefix, model) if use_cache else None
+            route.append((sent, prefix, key))
+        return route
+
+    def _stream(self, prompt, modality, use_cache, role):
+        telemetry.count('agentic_gemini_calls_total', role=role or '')
+        if not self.api_key or modality != 'text':
+            yield f"[Gemini {modality} response to: {prompt}]"
+            return
+        key = self._cache_key(prompt, modality) if use_cache else None
+        cached = self._get_cached(key, role)
+        if cached is not None:
+            yield cached
+            return
+        flight_key = self._flight_key(prompt, modality, use_cache, role, method='streamGenerateContent')
+        if flight_key is None:
+            yield from self._stream_and_cache(prompt, role, key)
+            return
+        chunks, shared = self._flights.stream(flight_key, lambda: self._stream_and_cache(prompt, role, key))
+        if shared:
+            self._coalesced(role)
+        yield from chunks
+
+    def _stream_and_cache(self, prompt, role, key):
+        chunks = []
+        for chunk in self._stream_text(prompt, role):
+            chunks.append(chunk)
+            yield chunk
+        if key is not None:
+            self.cache.set(key, ''.join(chunks))
+
+    def _get_cached(self, key, role):
+        if key is None:
+            return None
+        cached = self.cache.get(key)
+        if cached is not None:
+            telemetry.count('agentic_gemini_cache_hits_total', role=role or '')
+            _annotate(cache_hit=True)
+        return cached
 
-    def _call_text(self, prompt):
-        headers = {
+    def _cache_key(self, prompt, modality, response_schema=None, cached_prefix=None, model=None):
+        if self.cache is None:
+            return None
+        if cached_prefix is not None:
+            # Keyed like the equivalent inline prompt
+            prompt = cached_prefix.text + prompt
+        url = self._url(model or self.model)
+        if response_schema is not None:
+            return ResponseCache.make_key(url, modality, prompt, json.dumps(response_schema, sort_keys=True))
+        return ResponseCache.make_key(url, modality, prompt)
+
+    def _headers(self):
+        return {
             "Content-Type": "application/json",
             "x-goog-api-key": self.api_key
         }
-        data = {
+
+    def _payload(self, prompt, response_schema=None, cached_prefix=None):
+        payload = {
             "contents": [{"parts": [{"text": prompt}]}]
         }
+        if cached_prefix is not None:
+            payload["cachedContent"] = cached_prefix.name
+        if response_schema is not None:
+            payload["generationConfig"] = {
+                "responseMimeType": "application/json",
+                "responseSchema": response_schema
+            }
+        return payload
+
+    def _parse_text(self, result):
+        # Parse Gemini's response format
         try:
-            response = requests.post(self.api_url, headers=headers, json=data, timeout=30)
-            response.raise_for_status()
-            result = response.json()
-            # Parse Gemini's response format
             return result['candidates'][0]['content']['parts'][0]['text']
-        except Exception as e:
-            return f"[Gemini API error: {e}]"
+        except (KeyError, IndexError, TypeError):
+            raise GeminiAPIError(f"Unexpected Gemini response: {json.dumps(result)[:500]}")
+
+    def _backoff_delay(self, attempt, retry_after=None):
+        # Exponential backoff with full jitter, never shorter than the server's Retry-After
+        delay = random.uniform(0, min(30.0, 2.0 ** attempt))
+        try:
+            return max(delay, float(retry_after)) if retry_after else delay
+        except ValueError:
+            return delay
+
+    def _reserve(self, prompt, role):
+        estimate = estimate_tokens(prompt) + EXPECTED_OUTPUT_TOKENS
+        if self.rate_limiter is not None:
+            waited = self.rate_limiter.acquire(priority_for(role), estimate, timeout=deadline.remaining())
+            telemetry.observe('agentic_gemini_rate_wait_seconds', waited, role=role or '')
+            # Summed over retries and hedges of the same call
+            span = telemetry.current_span()
+            if span is not None:
+                span.add('rate_wait', round(waited, 4))
+        return estimate
+
+    def _on_throttled(self, status, attempt, retry_after, role=None):
+        delay = self._backoff_delay(attempt, retry_after)
+        telemetry.count('agentic_gemini_retries_total', role=role or '')
+        span = telemetry.current_span()
+        if span is not None:
+            span.add('retries')
+        if self.rate_limiter is not None and status == 429:
+            self.rate_limiter.penalize(delay)
+        if attempt == self.max_retries:
+            raise GeminiRateLimitError(f"Gemini API returned {status} after {attempt + 1} attempts")
+        left = deadline.remaining()
+        if left is not None and left <= delay:
+            raise deadline.DeadlineExceeded(f"Time budget exhausted while backing off from a {status}")
+        return delay
+
+    def _finish(self, status, body, estimate, role=None):
+        if status >= 400:
+            raise GeminiAPIError(f"Gemini API returned {status}: {json.dumps(body)[:500]}")
+        self._record_usage(body.get('usageMetadata') or {}, estimate, role)
+        return self._parse_text(body)
+
+    def _record_usage(self, usage, estimate, role):
+        total = usage.get('totalTokenCount')
+        if self.rate_limiter is not None and total:
+            self.rate_limiter.record_usage(estimate, total)
+        prompt_tokens = usage.get('promptTokenCount', 0)
+        response_tokens = usage.get('candidatesTokenCount', 0)
+        telemetry.count('agentic_gemini_tokens_total', prompt_tokens, role=role or '', kind='prompt')
+        telemetry.count('agentic_gemini_tokens_total', response_tokens, role=role or '', kind='response')
+        _annotate(prompt_tokens=prompt_tokens, response_tokens=response_tokens)
+        cached_tokens = usage.get('cachedContentTokenCount', 0)
+        if cached_tokens:
+            telemetry.count('agentic_gemini_tokens_total', cached_tokens, role=role or '', kind='cached')
+            _annotate(cached_tokens=cached_tokens)
+            with self._stats_lock:
+                self.prefix_stats['reused_tokens'] += cached_tokens
+
+    def _request_text(self, prompt, role=None, response_schema=None, cached_prefix=None, model=None):
+        url = self._url(model or self.model)
+        for attempt in range(self.max_retries + 1):
+            estimate = self._reserve(prompt, role)
+            response = self._post(url, self._payload(prompt, response_schema, cached_prefix), lambda: self._reserve(prompt, role), role)
+            if response.status_code in RETRYABLE_STATUS:
+                time.sleep(self._on_throttled(response.status_code, attempt, response.headers.get('Retry-After'), role))
+                continue
+            if cached_prefix is not None and response.status_code in STALE_PREFIX_STATUS:
+                # The cached content expired or was evicted: send the prefix inline from now on
+                cached_prefix.name = None
+                return self._request_text(cached_prefix.text + prompt, role, response_schema, model=model)
+            try:
+                body = response.json()
+            except ValueError:
+                body = {'error': response.text[:500]}
+            return self._finish(response.status_code, body, estimate, role)
+
+    async def _arequest_text(self, prompt, role=None, response_schema=None, cached_prefix=None, model=None):
+        client = await self._get_async_client()
+        url = self._url(model or self.model)
+        for attempt in range(self.max_retries + 1):
+            estimate = await asyncio.to_thread(self._reserve, prompt, role)
+            response = await self._apost(client, url, self._payload(prompt, response_schema, cached_prefix),
+                                         lambda: asyncio.to_thread(self._reserve, prompt, role), role)
+            if response.status_code in RETRYABLE_STATUS:
+                await asyncio.sleep(self._on_throttled(response.status_code, attempt, response.headers.get('Retry-After'), role))
+                continue
+            if cached_prefix is not None and response.status_code in STALE_PREFIX_STATUS:
+                cached_prefix.name = None
+                return await self._arequest_text(cached_prefix.text + prompt, role, response_schema, model=model)
+            try:
+                body = response.json()
+            except ValueError:
+                body = {'error': response.text[:500]}
+            return self._finish(response.status_code, body, estimate, role)
+
+    def _hedge_delay(self, url, role):
+        if not self.hedge_percentile:
+            return None
+        return self._latencies.setdefault((url, role), LatencyWindow()).percentile(self.hedge_percentile)
+
+    def _observe(self, url, role, response, started):
+        if response.status_code < 400:
+            self._latencies.setdefault((url, role), LatencyWindow()).add(time.monotonic() - started)
+
+    def _hedged(self, winner):
+        if winner is not None:
+            telemetry.count('agentic_gemini_hedges_total', winner=winner)
+            _annotate(hedge_winner=winner)
+
+    def _post(self, url, payload, reserve, role=None):
+        # One POST, its timeout cut to the remaining deadline. With hedging on, a duplicate
+        # is sent once it has run longer than the hedge percentile of recent latencies;
+        # its timeout is cut to what is left of the deadline by then.
+        send = lambda: self.session.post(url, headers=self._headers(), json=payload, timeout=deadline.timeout(self.timeout))
+        delay = self._hedge_delay(url, role)
+        started = time.monotonic()
+        try:
+            if delay is None:
+                response = send()
+            else:
+                response, winner = hedged(send, lambda: (reserve(), send())[1], delay, self._get_hedge_pool(),
+                                          discard=lambda late: late.close())
+                self._hedged(winner)
+        except requests.RequestException as e:
+            deadline.check('Gemini answered')
+            raise GeminiAPIError(str(e)) from e
+        self._observe(url, role, response, started)
+        return response
+
+    def _get_hedge_pool(self):
+        with self._stats_lock:
+            if self._hedge_pool is None:
+                self._hedge_pool = ThreadPoolExecutor(max_workers=self.max_connections, thread_name_prefix='gemini-hedge')
+            return self._hedge_pool
+
+    async def _apost(self, client, url, payload, reserve, role=None):
+        send = lambda: client.post(url, headers=self._headers(), json=payload, timeout=deadline.timeout(self.timeout))
+
+        async def send_hedge():
+            await reserve()
+            return await send()
+
+        delay = self._hedge_delay(url, role)
+        started = time.monotonic()
+        try:
+            if delay is None:
+                response = await send()
+            else:
+                response, winner = await ahedged(send, send_hedge, delay)
+                self._hedged(winner)
+        except httpx.HTTPError as e:
+            deadline.check('Gemini answered')
+            raise GeminiAPIError(str(e)) from e
+        self._observe(url, role, response, started)
+        return response
+
+    def _stream_text(self, prompt, role=None):
+        for attempt in range(self.max_retries + 1):
+            estimate = self._reserve(prompt, role)
+            try:
+                response = self.session.post(self.stream_url, params={'alt': 'sse'}, headers=self._headers(),
+                                             json=self._payload(prompt), timeout=deadline.timeout(self.timeout), stream=True)
+            except requests.RequestException as e:
+                deadline.check('the stream finished')
+                raise GeminiAPIError(str(e)) from e
+            with response:
+                if response.status_code in RETRYABLE_STATUS:
+                    time.sleep(self._on_throttled(response.status_code, attempt, response.headers.get('Retry-After'), role))
+                    continue
+                if response.status_code >= 400:
+                    raise GeminiAPIError(f"Gemini API returned {response.status_code}: {response.text[:500]}")
+                response.encoding = 'utf-8'
+                usage = None
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith('data:'):
+                        continue
+                    try:
+                        event = json.loads(line[len('data:'):])
+                    except ValueError as e:
+                        raise GeminiAPIError(f"Malformed stream event: {line[:500]}") from e
+                    usage = event.get('usageMetadata', usage)
+                    parts = event.get('candidates', [{}])[0].get('content', {}).get('parts', [])
+                    text = ''.join(part.get('text', '') for part in parts)
+                    if text:
+                        yield text
+                self._record_usage(usage or {}, estimate, role)
+                return
+
+    async def _get_async_client(self):
+        loop = asyncio.get_running_loop()
+        with self._stats_lock:
+            # A loop closed without cancelling its tasks took the client's transports with it
+            for old in [old for old in self._async_clients if old.is_closed()]:
+                del self._async_clients[old]
+            entry = self._async_clients.get(loop)
+            if entry is None:
+                limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+                client = httpx.AsyncClient(limits=limits, timeout=self.timeout)
+                entry = self._async_clients[loop] = (client, loop.create_task(self._close_with_loop(loop, client)))
+        return entry[0]
+
+    async def _close_with_loop(self, loop, client):
+        # asyncio.run cancels leftover tasks before closing the loop, so this closes the
+        # client on its own loop when the loop ends, or earlier on close()/aclose()
+        try:
+            await loop.create_future()
+        finally:
+            with self._stats_lock:
+                if self._async_clients.get(loop, (None,))[0] is client:
+                    del self._async_clients[loop]
+            await client.aclose()
+
+    def _take_async_clients(self):
+        with self._stats_lock:
+            clients, self._async_clients = self._async_clients, {}
+        return clients
+
+    def close(self):
+        self.session.close()
+        if self._hedge_pool is not None:
+            self._hedge_pool.shutdown(wait=False)
+        for loop, (_, guard) in self._take_async_clients().items():
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(guard.cancel)
+
+    async def aclose(self):
+        current = asyncio.get_running_loop()
+        for loop, (client, guard) in self._take_async_clients().items():
+            if loop is current:
+                guard.cancel()
+                await client.aclose()
+            elif not loop.is_closed():
+                loop.call_soon_threadsafe(guard.cancel)
@@ -0,0 +1,73 @@
+import asyncio
+import contextvars
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+
+# Hedged requests: when a request has not answered within a high percentile of recent
+# latencies, a duplicate is sent and whichever answers first is used. The threshold
+# adapts to the observed latencies, so only the slow tail pays for a second request.
+
+class LatencyWindow:
+    def __init__(self, size=200, min_samples=20):
+        self.samples = deque(maxlen=size)
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, p):
+        # None until there are enough samples to trust
+        with self._lock:
+            if len(self.samples) < self.min_samples:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+def hedged(primary, hedge, delay, executor, discard=None):
+    # Runs primary(); if it has not finished after delay seconds, runs hedge() as well.
+    # Returns (result, winner) with winner None (no hedge sent), 'primary' or 'hedge'.
+    # The loser is cancelled if it has not started; otherwise discard(result) is called
+    # on its result when it arrives. An error only counts once both have failed.
+    first = executor.submit(contextvars.copy_context().run, primary)
+    done, _ = wait([first], timeout=delay)
+    if done:
+        return first.result(), None
+    second = executor.submit(contextvars.copy_context().run, hedge)
+    pending = {first, second}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                for loser in pending:
+                    if not loser.cancel() and discard is not None:
+                        loser.add_done_callback(lambda f: _discard(f, discard))
+                return future.result(), 'primary' if future is first else 'hedge'
+            error = error or future.exception()
+    raise error
+
+def _discard(future, discard):
+    if not future.cancelled() and future.exception() is None:
+        discard(future.result())
+
+async def ahedged(primary, hedge, delay):
+    # hedged() for coroutine functions; the loser task is cancelled outright
+    first = asyncio.ensure_future(primary())
+    done, _ = await asyncio.wait({first}, timeout=delay)
+    if done:
+        return first.result(), None
+    second = asyncio.ensure_future(hedge())
+    pending = {first, second}
+    error = None
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception() is None:
+                for loser in pending:
+                    loser.cancel()
+                return task.result(), 'primary' if task is first else 'hedge'
+            error = error or task.exception()
+    raise error
@@ -0,0 +1,75 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# Persistent subtask memory in SQLite (WAL), one row per normalized subtask, so a
+# result is written with a single upsert instead of rewriting the whole history.
+
+def normalize_subtask(subtask):
+    text = re.sub(r'^\s*(?:step\s*)?\d+\s*[.):]\s*', '', subtask.strip().lower())
+    return ' '.join(text.strip('-* ').split())
+
+def subtask_key(subtask):
+    return hashlib.sha256(normalize_subtask(subtask).encode('utf-8')).hexdigest()
+
+class MemoryStore:
+    def __init__(self, path="persistent_memory.db", legacy_json="persistent_memory.json"):
+        self.path = path
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS memory ("
+            "key TEXT PRIMARY KEY, subtask TEXT NOT NULL, passed INTEGER NOT NULL, "
+            "result TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+        if legacy_json and os.path.exists(legacy_json) and len(self) == 0:
+            self._import_json(legacy_json)
+
+    def get(self, subtask):
+        row = self._fetch(subtask)
+        return json.loads(row[0]) if row else None
+
+    def put(self, subtask, result, updated_at=None):
+        passed = bool((result.get('test_results') or {}).get('passed'))
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO memory (key, subtask, passed, result, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (subtask_key(subtask), subtask, int(passed), json.dumps(result), updated_at or time.time())
+            )
+
+    def lookup_fresh(self, subtask, max_age):
+        # A passing result recorded within max_age seconds, or None
+        row = self._fetch(subtask)
+        if row and row[1] and row[2] >= time.time() - max_age:
+            return json.loads(row[0])
+        return None
+
+    def __contains__(self, subtask):
+        return self._fetch(subtask) is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM memory").fetchone()[0]
+
+    def close(self):
+        self._db.close()
+
+    def _fetch(self, subtask):
+        with self._lock:
+            return self._db.execute(
+                "SELECT result, passed, updated_at FROM memory WHERE key = ?", (subtask_key(subtask),)
+            ).fetchone()
+
+    def _import_json(self, legacy_json):
+        # One-off migration from the old whole-file persistent_memory.json
+        with open(legacy_json, 'r') as f:
+            memory = json.load(f)
+        mtime = os.path.getmtime(legacy_json)
+        for subtask, result in memory.items():
+            self.put(subtask, result, updated_at=mtime)
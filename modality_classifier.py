@@ -0,0 +1,140 @@
+import math
+import re
+from collections import Counter
+from enum import Enum
+
+# Local modality classifier for ModalSwitcherAgent: keyword cues plus a small
+# multinomial Naive Bayes model trained at import time on labeled planner-style
+# subtasks. Decides confident cases in microseconds; the agent asks the LLM only
+# when the posterior is below the confidence threshold.
+
+class Modality(str, Enum):
+    CODE = 'code'
+    TEXT = 'text'
+    IMAGE = 'image'
+    DIAGRAM = 'diagram'
+
+    def __str__(self):
+        return self.value
+
+    @classmethod
+    def parse(cls, text, default=None):
+        # First modality named in free text such as "The best modality is code."
+        match = re.search(r'\b(code|text|image|diagram)\b', text.lower())
+        return cls(match.group(1)) if match else default
+
+# Cue words counted as extra evidence on top of the bag of words
+KEYWORDS = {
+    Modality.CODE: ('implement', 'function', 'class', 'endpoint', 'script', 'refactor', 'unit test', 'tests',
+                    'api', 'query', 'module', 'cli', 'bug', 'fix', 'install', 'configure', 'build', 'code'),
+    Modality.TEXT: ('explain', 'describe', 'document', 'documentation', 'readme', 'summarize', 'research',
+                    'compare', 'requirements', 'guide', 'tutorial', 'write up', 'outline', 'changelog'),
+    Modality.IMAGE: ('image', 'logo', 'icon', 'picture', 'illustration', 'screenshot', 'mockup', 'banner',
+                     'photo', 'favicon', 'artwork'),
+    Modality.DIAGRAM: ('diagram', 'flowchart', 'mermaid', 'uml', 'sequence diagram', 'er diagram',
+                       'architecture diagram', 'graphviz', 'chart of'),
+}
+KEYWORD_WEIGHT = 3
+CUE_PATTERNS = {
+    # (?!\.\w) keeps filenames such as requirements.txt from reading as cues
+    modality: re.compile(r'\b(?:' + '|'.join(re.escape(cue) for cue in cues) + r')\b(?!\.\w)')
+    for modality, cues in KEYWORDS.items()
+}
+
+SEED_EXAMPLES = [
+    ("Create a Flask app with CRUD endpoints for todos", Modality.CODE),
+    ("Implement the user authentication module with JWT", Modality.CODE),
+    ("Write a Python function to parse CSV files", Modality.CODE),
+    ("Write unit tests for the parser module", Modality.CODE),
+    ("Set up the project structure and virtual environment", Modality.CODE),
+    ("Add input validation to the login form", Modality.CODE),
+    ("Define SQLAlchemy models for users and posts", Modality.CODE),
+    ("Build a React component for the dashboard", Modality.CODE),
+    ("Write a bash script to back up the database", Modality.CODE),
+    ("Create the main.py entry point with argparse", Modality.CODE),
+    ("Handle errors and retries in the HTTP client", Modality.CODE),
+    ("Add logging to the scraper", Modality.CODE),
+    ("Connect to the MetaTrader 5 terminal and fetch prices", Modality.CODE),
+    ("Write a SQL query for the top customers by revenue", Modality.CODE),
+    ("Configure pytest and add fixtures", Modality.CODE),
+    ("Implement the order execution logic", Modality.CODE),
+    ("Save the results to a CSV file", Modality.CODE),
+    ("Create a Dockerfile for the service", Modality.CODE),
+    ("Write the email sending function using smtplib", Modality.CODE),
+    ("Refactor the data loader into a class", Modality.CODE),
+    ("Explain how the algorithm works", Modality.TEXT),
+    ("Document the API endpoints in the README", Modality.TEXT),
+    ("Write a user guide for non-technical users", Modality.TEXT),
+    ("Summarize the research on trading strategies", Modality.TEXT),
+    ("Research the best Python libraries for PDF parsing", Modality.TEXT),
+    ("Describe the deployment process step by step", Modality.TEXT),
+    ("Compare SQLite and PostgreSQL for this use case", Modality.TEXT),
+    ("Gather requirements from the user request", Modality.TEXT),
+    ("Outline the project milestones", Modality.TEXT),
+    ("Write release notes for version 1.0", Modality.TEXT),
+    ("Provide usage examples and instructions", Modality.TEXT),
+    ("Review licensing considerations for dependencies", Modality.TEXT),
+    ("Design a logo for the application", Modality.IMAGE),
+    ("Create an icon set for the toolbar", Modality.IMAGE),
+    ("Generate a banner image for the landing page", Modality.IMAGE),
+    ("Produce a mockup of the login screen", Modality.IMAGE),
+    ("Make an illustration for the onboarding page", Modality.IMAGE),
+    ("Create a favicon for the website", Modality.IMAGE),
+    ("Draw an architecture diagram of the services", Modality.DIAGRAM),
+    ("Create a flowchart of the checkout process", Modality.DIAGRAM),
+    ("Write a Mermaid sequence diagram for the login flow", Modality.DIAGRAM),
+    ("Produce a UML class diagram of the domain model", Modality.DIAGRAM),
+    ("Sketch an ER diagram for the database schema", Modality.DIAGRAM),
+    ("Visualize the data pipeline as a diagram", Modality.DIAGRAM),
+]
+
+def tokenize(text):
+    words = re.findall(r'[a-z][a-z0-9_]*', text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+class ModalityClassifier:
+    def __init__(self, examples=None, threshold=0.85, alpha=0.5):
+        self.threshold = threshold
+        self.alpha = alpha
+        self._train(examples or SEED_EXAMPLES)
+
+    def _train(self, examples):
+        self.word_counts = {m: Counter() for m in Modality}
+        self.class_counts = Counter()
+        for text, label in examples:
+            self.class_counts[label] += 1
+            self.word_counts[label].update(self._features(text))
+        self.vocabulary = set().union(*self.word_counts.values())
+        self.totals = {m: sum(c.values()) for m, c in self.word_counts.items()}
+        total = sum(self.class_counts.values())
+        self.log_priors = {m: math.log((self.class_counts[m] + 1) / (total + len(Modality))) for m in Modality}
+
+    def _features(self, text):
+        features = Counter(tokenize(text))
+        lowered = text.lower()
+        for modality, pattern in CUE_PATTERNS.items():
+            hits = len(pattern.findall(lowered))
+            if hits:
+                features[f"__cue_{modality.value}"] += hits * KEYWORD_WEIGHT
+        return features
+
+    def predict(self, text):
+        # Returns (Modality, posterior probability of that modality)
+        # Words never seen in training carry no evidence; counting them would favour the smallest class
+        features = {word: n for word, n in self._features(text).items() if word in self.vocabulary}
+        vocab = len(self.vocabulary) + 1
+        scores = {}
+        for modality in Modality:
+            counts = self.word_counts[modality]
+            denominator = self.totals[modality] + self.alpha * vocab
+            scores[modality] = self.log_priors[modality] + sum(
+                n * math.log((counts[word] + self.alpha) / denominator) for word, n in features.items()
+            )
+        best = max(scores, key=scores.get)
+        normalizer = sum(math.exp(score - scores[best]) for score in scores.values())
+        return best, 1.0 / normalizer
+
+    def classify(self, text):
+        # The modality when confident, otherwise None
+        modality, confidence = self.predict(text)
+        return modality if confidence >= self.threshold else None
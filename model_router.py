@@ -0,0 +1,122 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from agents.results import parse_json
+
+# Cost/latency-aware model cascade for GeminiAPI. Each agent role maps to a list of
+# models from cheapest to strongest; a call starts at the first one and escalates only
+# when a cheap validator rejects the answer (no code block, invalid JSON, empty text).
+# A failed test escalates the debugger's next attempt through escalated(). Every
+# routed request is appended to a JSONL decision log with its latency, tokens and cost,
+# so the routes can be tuned from real runs.
+
+FLASH_LITE = 'gemini-2.5-flash-lite'
+FLASH = 'gemini-2.5-flash'
+PRO = 'gemini-2.5-pro'
+
+DEFAULT_ROUTES = {
+    'modal_switcher': [FLASH_LITE, FLASH],
+    'documenter': [FLASH_LITE, FLASH],
+    'researcher': [FLASH_LITE, FLASH],
+    'coder': [FLASH_LITE, FLASH, PRO],
+    'debugger': [FLASH_LITE, FLASH, PRO],
+    'tester': [FLASH, PRO],
+    'critic': [FLASH, PRO],
+    'planner': [FLASH, PRO],
+    'meta': [FLASH, PRO],
+}
+
+# USD per million (input, output) tokens
+PRICES = {
+    FLASH_LITE: (0.10, 0.40),
+    FLASH: (0.30, 2.50),
+    PRO: (1.25, 10.00),
+}
+
+_min_tier = ContextVar('model_router_min_tier', default=0)
+
+@contextmanager
+def escalated(tier):
+    # Calls made inside start at least at this tier (0 = cheapest)
+    token = _min_tier.set(max(_min_tier.get(), tier))
+    try:
+        yield
+    finally:
+        _min_tier.reset(token)
+
+def has_code_block(text):
+    return '```' in text
+
+def non_empty(text):
+    return bool(text and text.strip())
+
+ROLE_VALIDATORS = {
+    'coder': has_code_block,
+    'debugger': has_code_block,
+}
+
+class ModelRouter:
+    def __init__(self, routes=None, default_model=FLASH, log_path=None, prices=None, validators=None):
+        self.routes = {role: list(models) for role, models in (routes or DEFAULT_ROUTES).items()}
+        self.default_model = default_model
+        self.prices = prices or PRICES
+        self.validators = {**ROLE_VALIDATORS, **(validators or {})}
+        self.stats_by_route = {}
+        self._lock = threading.Lock()
+        self._log = open(log_path, 'a', buffering=1) if log_path else None
+
+    @classmethod
+    def from_env(cls, default_model=FLASH):
+        # GEMINI_ROUTING=1 enables the default routes; GEMINI_ROUTES names a JSON file of
+        # {role: [models, cheapest first]} overriding them
+        routes_path = os.getenv('GEMINI_ROUTES')
+        if not routes_path and os.getenv('GEMINI_ROUTING', '').lower() not in ('1', 'true', 'yes'):
+            return None
+        routes = dict(DEFAULT_ROUTES)
+        if routes_path:
+            with open(routes_path) as f:
+                routes.update(json.load(f))
+        return cls(routes, default_model=default_model, log_path=os.getenv('GEMINI_ROUTING_LOG', 'routing_log.jsonl'))
+
+    def models(self, role):
+        models = self.routes.get(role) or [self.default_model]
+        return models[min(_min_tier.get(), len(models) - 1):]
+
+    def validate(self, role, text, response_schema=None):
+        if response_schema is not None:
+            return parse_json(text) is not None
+        return self.validators.get(role, non_empty)(text)
+
+    def cost(self, model, prompt_tokens, response_tokens):
+        input_price, output_price = self.prices.get(model, (0.0, 0.0))
+        return (prompt_tokens * input_price + response_tokens * output_price) / 1e6
+
+    def record(self, role, model, accepted, seconds, prompt_tokens=0, response_tokens=0):
+        cost = self.cost(model, prompt_tokens, response_tokens)
+        entry = {
+            'ts': round(time.time(), 3), 'role': role, 'model': model, 'min_tier': _min_tier.get(),
+            'accepted': accepted, 'seconds': round(seconds, 4),
+            'prompt_tokens': prompt_tokens, 'response_tokens': response_tokens, 'cost_usd': round(cost, 8)
+        }
+        with self._lock:
+            totals = self.stats_by_route.setdefault(f"{role or '-'}/{model}",
+                                                    {'calls': 0, 'rejected': 0, 'seconds': 0.0, 'cost_usd': 0.0})
+            totals['calls'] += 1
+            totals['rejected'] += not accepted
+            totals['seconds'] += seconds
+            totals['cost_usd'] += cost
+            if self._log is not None:
+                self._log.write(json.dumps(entry) + '\n')
+
+    def stats(self):
+        with self._lock:
+            return {route: dict(totals) for route, totals in self.stats_by_route.items()}
+
+    def close(self):
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
@@ -0,0 +1,158 @@
+import asyncio
+import contextvars
+import functools
+import hashlib
+import inspect
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Asyncio scheduler for continuous health checks over many monitored projects. Every
+# monitor is a task on one event loop: checks start with random jitter, run under a
+# concurrency cap with a per-check timeout, and blocking checks go to a bounded thread
+# pool. A monitor with a fingerprint (a content hash of its code and dependencies) is
+# only re-checked once that hash differs from the last healthy pass. Failures are
+# coalesced: each improvement function is called once per window with every monitor
+# that failed meanwhile, and never twice at the same time.
+
+class Monitor:
+    def __init__(self, name, check, improve=None, interval=3600, timeout=None, fingerprint=None):
+        self.name = name
+        # check() -> bool, sync or async
+        self.check = check
+        # improve(names) for the monitors that failed, sync or async; None only reports
+        self.improve = improve
+        self.interval = interval
+        self.timeout = timeout
+        # fingerprint() -> str; None re-checks on every interval
+        self.fingerprint = fingerprint
+        self.healthy_fingerprint = None
+        self.healthy = None
+        self.last_checked = None
+
+def content_hash(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+class MonitorScheduler:
+    def __init__(self, max_concurrency=100, jitter=0.1, default_timeout=60, coalesce_window=5.0):
+        self.monitors = {}
+        self.max_concurrency = max_concurrency
+        # Fraction of the interval each sleep is randomly stretched or shortened by
+        self.jitter = jitter
+        self.default_timeout = default_timeout
+        self.coalesce_window = coalesce_window
+        self.stats = {'checks': 0, 'skipped': 0, 'failures': 0, 'timeouts': 0, 'errors': 0,
+                      'improvements': 0, 'coalesced': 0}
+        self._pending = {}
+        self._flushes = {}
+        self._executor = None
+        self._semaphore = None
+        self._stopped = None
+        self._until = None
+
+    def add(self, monitor):
+        self.monitors[monitor.name] = monitor
+        return monitor
+
+    def stop(self):
+        if self._stopped is not None:
+            self._stopped.set()
+
+    async def run(self, until=None, poll_interval=1.0):
+        # Runs until stop() is called or until() returns True
+        self._stopped = asyncio.Event()
+        self._until = until
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='monitor')
+        tasks = [asyncio.create_task(self._loop(monitor)) for monitor in list(self.monitors.values())]
+        try:
+            while not self._stopped.is_set():
+                if until is not None and until():
+                    break
+                await self._sleep(poll_interval)
+        finally:
+            self._stopped.set()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await asyncio.gather(*list(self._flushes.values()), return_exceptions=True)
+            self._executor.shutdown(wait=False)
+
+    async def check_once(self, monitor):
+        # One health check; None when skipped because nothing changed since a healthy pass
+        fingerprint = await self._call(monitor.fingerprint) if monitor.fingerprint is not None else None
+        if fingerprint is not None and fingerprint == monitor.healthy_fingerprint:
+            self.stats['skipped'] += 1
+            return None
+        async with self._semaphore:
+            self.stats['checks'] += 1
+            try:
+                healthy = bool(await asyncio.wait_for(self._call(monitor.check), monitor.timeout or self.default_timeout))
+            except asyncio.TimeoutError:
+                self.stats['timeouts'] += 1
+                healthy = False
+            except Exception:
+                self.stats['errors'] += 1
+                healthy = False
+        monitor.healthy = healthy
+        monitor.last_checked = time.time()
+        monitor.healthy_fingerprint = fingerprint if healthy else None
+        if not healthy:
+            self.stats['failures'] += 1
+            self._report_failure(monitor)
+        return healthy
+
+    async def _loop(self, monitor):
+        # Spread the first checks over the interval so monitors added together do not fire together
+        if self.jitter and await self._sleep(random.uniform(0, monitor.interval * self.jitter)):
+            return
+        while not self._stopped.is_set():
+            if self._until is not None and self._until():
+                self.stop()
+                return
+            await self.check_once(monitor)
+            delay = monitor.interval * (1 + random.uniform(-self.jitter, self.jitter))
+            if await self._sleep(delay):
+                return
+
+    def _report_failure(self, monitor):
+        if monitor.improve is None:
+            return
+        names = self._pending.setdefault(monitor.improve, [])
+        if names:
+            self.stats['coalesced'] += 1
+        if monitor.name not in names:
+            names.append(monitor.name)
+        if monitor.improve not in self._flushes:
+            self._flushes[monitor.improve] = asyncio.create_task(self._flush(monitor.improve))
+
+    async def _flush(self, improve):
+        # Wait out the window, then one call for every failure collected in it; failures
+        # arriving while it runs are collected for the next call
+        while self._pending.get(improve):
+            if await self._sleep(self.coalesce_window):
+                break
+            names = self._pending.pop(improve)
+            self.stats['improvements'] += 1
+            try:
+                await self._call(improve, names)
+            except Exception:
+                self.stats['errors'] += 1
+        del self._flushes[improve]
+
+    async def _call(self, func, *args):
+        if inspect.iscoroutinefunction(func):
+            return await func(*args)
+        loop = asyncio.get_running_loop()
+        call = functools.partial(contextvars.copy_context().run, func, *args)
+        return await loop.run_in_executor(self._executor, call)
+
+    async def _sleep(self, seconds):
+        # True if the scheduler was stopped meanwhile
+        try:
+            await asyncio.wait_for(self._stopped.wait(), timeout=max(0.0, seconds))
+            return True
+        except asyncio.TimeoutError:
+            return self._stopped.is_set()
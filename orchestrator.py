@@ -1,35 +1,54 @@
 from agents.planner import PlannerAgent
 from agents.coder import CoderAgent
-from agents.tester import TesterAgent
+from agents.tester import TesterAgent, tests_at_fault
 from agents.debugger import DebuggerAgent
 from agents.documenter import DocumenterAgent
 from agents.modal_switcher import ModalSwitcherAgent
 from agents.critic import CriticAgent
 from agents.researcher import ResearchAgent
 from agents.deployment import DeploymentAgent
-from gemini_api import GeminiAPI
+from gemini_api import GeminiAPI, GeminiAPIError
+from response_cache import ResponseCache
+from rate_limiter import RateLimiter
+from model_router import ModelRouter, escalated
+from subtask_scheduler import run_plan
+from memory_store import MemoryStore
+from research_store import ResearchStore
+from modality_classifier import Modality
+from agents.results import Review, TestResult
+from checkpoint import CheckpointJournal, checkpointed, path_key
+from deadline import DeadlineExceeded
+from single_flight import record_saved, saved_calls
+from events import default_log
+import events
+import deadline
+import telemetry
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+import argparse
+import contextvars
 import json
 import os
+import threading
+import time
+import uuid
 
 def web_search_func(query):
     # Placeholder: In production, connect to a real web search API
     # For now, just return the query as a string
     return f"[Web search results for: {query}]"
 
-MEMORY_FILE = "persistent_memory.json"
-
-def load_memory():
-    if os.path.exists(MEMORY_FILE):
-        with open(MEMORY_FILE, 'r') as f:
-            return json.load(f)
-    return {}
-
-def save_memory(memory):
-    with open(MEMORY_FILE, 'w') as f:
-        json.dump(memory, f, indent=2)
+MEMORY_DB = os.getenv('MEMORY_DB', "persistent_memory.db")
+# How long a passing subtask result may be reused instead of re-running the pipeline; 0 disables reuse
+MEMORY_MAX_AGE = float(os.getenv('MEMORY_MAX_AGE', 7 * 24 * 3600))
+CHECKPOINT_DIR = os.getenv('CHECKPOINT_DIR', "checkpoints")
+# How Critic review and documentation are produced after the tests pass: 'sequential'
+# (two calls, one after the other), 'fused' (one structured call returning both) or
+# 'concurrent' (both calls at once)
+REVIEW_MODE = os.getenv('REVIEW_MODE', 'sequential')
 
 class Context:
-    def __init__(self, user_request):
+    def __init__(self, user_request, memory=None, journal=None, gemini=None, events=None):
         self.user_request = user_request
         self.research = None
         self.plan = []
@@ -37,10 +56,64 @@ class Context:
         self.final_docs = []
         self.status = "in_progress"
         self.current_subtask = None
-        self.logs = []
-        self.memory = load_memory()
+        # Structured events of this run; logs holds only the most recent ones, the full
+        # history goes to the event log's JSONL sink with large artifacts by hash
+        self.events = (events or default_log()).bind(run=uuid.uuid4().hex[:12])
+        self.logs = self.events.ring
+        self.memory = memory if memory is not None else MemoryStore(MEMORY_DB)
+        # Optional CheckpointJournal; finished stages are replayed from it instead of re-run
+        self.journal = journal
+        # Subtasks run concurrently; every shared mutation goes through this lock
+        self.lock = threading.RLock()
+        # Owns the research findings as a cached prompt prefix for the lifetime of the run
+        self.gemini = gemini
+        self._prefix = None
+        # Gemini calls avoided during the run, by kind (coalesced, fused)
+        self.calls_saved = {}
+
+    def record_result(self, result, persist=True):
+        with self.lock:
+            self.subtask_results.append(result)
+            self.final_docs.append(result['docs'])
+        if persist:
+            # Save to persistent memory
+            self.memory.put(result['subtask'], {
+                'code': result['code'],
+                'test_results': asdict(result['test_results']),
+                'review': asdict(result['review']),
+                'docs': result['docs']
+            })
+
+    def checkpoint(self, path, stage, func, decode=None):
+        return checkpointed(self.journal, path, stage, func, decode)
+
+    def restored(self, path, stage):
+        # The value an earlier run recorded for this stage, or None
+        return self.journal.get(path_key(path), stage) if self.journal is not None else None
+
+    def shared_prefix(self):
+        # Research findings for the request, cached on first use so planner and MetaAgent
+        # calls send only their own instructions; deleted again by close()
+        with self.lock:
+            if self._prefix is None and self.research and self.gemini is not None:
+                self._prefix = self.gemini.create_cached_prefix(
+                    f"Relevant research findings for the user request:\n{self.research}\n\n", role='context')
+            return self._prefix
+
+    def close(self):
+        with self.lock:
+            if self._prefix is not None:
+                self.gemini.delete_cached_prefix(self._prefix)
+                self._prefix = None
+
+    def fail(self, log_entry, message=None):
+        with self.lock:
+            self.status = "failed"
+        self.events.error('failed', message or f"[ERROR] {log_entry.get('subtask') or log_entry.get('stage')} failed", **log_entry)
 
 class MetaAgent:
+    role = 'meta'
+
     def __init__(self, name, gemini=None):
         self.name = name
         self.gemini = gemini or GeminiAPI()
@@ -50,170 +123,312 @@ class MetaAgent:
             "Given the following subtask, repeated failures, and context, suggest a new approach, alternative plan, or escalation.\n"
             f"Subtask: {subtask}\nFailures: {failures}\nContext: {context.user_request}"
         )
-        return self.gemini.call(prompt, modality='text')
+        with telemetry.span('agent.run', role=self.role, agent=self.name):
+            return self.gemini.call(prompt, modality='text', role=self.role, cached_prefix=context.shared_prefix())
 
 # Recursive subtask execution
-def execute_subtask(subtask, context, agents, depth=0):
-    indent = '  ' * depth
-    print(f"{indent}[Modal Switcher] For subtask: {subtask}")
-    modality = agents['modal_switcher'].run(subtask)
-    print(f"{indent}Modality: {modality}")
+def execute_subtask(subtask, context, agents, depth=0, path=()):
+    with telemetry.span('subtask', subtask=subtask, depth=depth):
+        _execute_subtask(subtask, context, agents, depth, path)
+
+def _execute_subtask(subtask, context, agents, depth, path):
+    def emit(level, kind, message, **fields):
+        context.events.emit(level, kind, message, subtask=subtask, path=path_key(path), depth=depth, **fields)
+
+    # Every finished stage is checkpointed under this subtask's path; on resume it is replayed, not re-run
+    def stage(name, func, decode=None):
+        return context.checkpoint(path, name, func, decode)
+
+    done = context.restored(path, 'done')
+    if done is not None:
+        emit('info', 'restored', f"[Checkpoint] Restored finished subtask: {subtask}")
+        context.record_result(done, persist=False)
+        return
+    # Reuse a fresh passing result for an identical subtask instead of re-running every agent
+    memoized = context.memory.lookup_fresh(subtask, MEMORY_MAX_AGE) if MEMORY_MAX_AGE > 0 else None
+    if memoized:
+        emit('info', 'memoized', f"[Memory] Reusing stored result for: {subtask}")
+        context.record_result({'subtask': subtask, **memoized, 'memoized': True}, persist=False)
+        return
+    deadline.check(f"subtask: {subtask}")
+
+    emit('debug', 'modality.start', f"[Modal Switcher] For subtask: {subtask}")
+    modality = stage('modality', lambda: agents['modal_switcher'].run(subtask), Modality)
+    emit('info', 'modality', f"[Modal Switcher] {subtask}: {modality}", modality=modality)
 
     # Research for subtask if needed
-    if modality not in ["code", "text"]:
-        print(f"{indent}[Researching for subtask: {subtask}]")
-        subtask_research = agents['research_agent'].run(subtask)
-        print(subtask_research)
+    if modality not in (Modality.CODE, Modality.TEXT):
+        emit('debug', 'research.start', f"[Researcher] Researching for subtask: {subtask}")
+        subtask_research = stage('research', lambda: agents['research_agent'].run(subtask))
+        emit('info', 'research', "[Researcher] Research findings ready", research=subtask_research)
         subtask_input = f"{subtask}\n\nRelevant research findings:\n{subtask_research}"
     else:
         subtask_input = subtask
 
     # Coding
-    print(f"{indent}[Coder] Coding for: {subtask}")
-    code = agents['coder'].run(subtask_input)
-    print(f"{indent}Generated code:\n{code}")
+    emit('debug', 'code.start', f"[Coder] Coding for: {subtask}")
+    code = stage('code', lambda: agents['coder'].run(subtask_input))
+    emit('info', 'code', "[Coder] Generated code", code=code)
 
     # Testing and Debugging Loop
     max_attempts = 3
     failures = []
     for attempt in range(max_attempts):
-        print(f"{indent}[Tester] Running tests...")
-        test_results = agents['tester'].run(code)
-        print(f"{indent}Test results: {test_results}")
-        if test_results.get('passed'):
+        emit('debug', 'test.start', "[Tester] Running tests...", attempt=attempt)
+        # Retries re-run the tests written on the first attempt instead of asking for new ones,
+        # except on the last attempt or when the tests themselves were what broke
+        regenerate = attempt == max_attempts - 1 or (attempt and tests_at_fault(test_results.details))
+        previous_tests = test_results.test_code if attempt and not regenerate else None
+        test_results = stage(f'test.{attempt}', lambda: agents['tester'].run(code, previous_tests), TestResult.from_dict)
+        emit('info' if test_results.passed else 'warning', 'test',
+             f"[Tester] Tests {'passed' if test_results.passed else 'failed'} (attempt {attempt + 1})",
+             attempt=attempt, passed=test_results.passed, details=test_results.details, test_code=test_results.test_code)
+        if test_results.passed:
             break
-        print(f"{indent}[Debugger] Debugging...")
-        code = agents['debugger'].run(code, test_results)
-        failures.append(test_results.get('details', ''))
+        if deadline.running_low():
+            context.fail({'subtask': subtask, 'failures': failures + [test_results.details], 'error': "Time budget exhausted"},
+                         f"[Deadline] Not enough time left for another debug attempt: {subtask}")
+            return
+        emit('debug', 'debug.start', "[Debugger] Debugging...", attempt=attempt)
+        # Each failed attempt moves the debugger one model tier up its route
+        with escalated(attempt):
+            code = stage(f'debug.{attempt}', lambda: agents['debugger'].run(code, test_results))
+        report = agents['debugger'].last_report()
+        message = f"[Debugger] {report['outcome']}, ~{report['tokens_saved']} tokens saved vs. full rewrite" if report else "[Debugger] Applied fix"
+        emit('info', 'debug', message, attempt=attempt, code=code, **(report or {}))
+        failures.append(test_results.details)
     else:
-        print(f"{indent}[MetaAgent] Reflecting after repeated failures...")
-        meta_reflection = agents['meta_agent'].reflect(context, subtask, failures)
-        print(f"{indent}MetaAgent suggestion: {meta_reflection}")
+        emit('debug', 'meta.start', "[MetaAgent] Reflecting after repeated failures...")
+        meta_reflection = stage('meta', lambda: agents['meta_agent'].reflect(context, subtask, failures))
+        emit('warning', 'meta', "[MetaAgent] Suggested a new approach", reflection=meta_reflection)
         # Try to break down the subtask recursively if suggested
         if 'break down' in meta_reflection.lower() or 'subtask' in meta_reflection.lower():
-            print(f"{indent}[Planner] Recursively breaking down subtask...")
-            sub_subtasks = agents['planner'].run(f"{subtask}\n\nMetaAgent suggestion: {meta_reflection}")
-            for sub_subtask in sub_subtasks:
-                execute_subtask(sub_subtask, context, agents, depth=depth+1)
+            deadline.check(f"breaking down: {subtask}")
+            sub_subtasks = stage('subplan', lambda: agents['planner'].run(f"{subtask}\n\nMetaAgent suggestion: {meta_reflection}",
+                                                                         cached_prefix=context.shared_prefix()))
+            emit('info', 'subplan', f"[Planner] Broke the subtask down into {len(sub_subtasks)} steps", steps=sub_subtasks)
+            run_plan(sub_subtasks, context, agents, execute_subtask, depth=depth+1, path=path)
             return
         else:
-            print(f"{indent}[ERROR] Unable to resolve test failures after multiple attempts.")
-            context.status = "failed"
-            context.logs.append({'subtask': subtask, 'failures': failures, 'meta_reflection': meta_reflection})
+            context.fail({'subtask': subtask, 'failures': failures, 'meta_reflection': meta_reflection},
+                         f"[ERROR] Unable to resolve test failures after multiple attempts: {subtask}")
             return
 
-    # Critic Review
-    print(f"{indent}[Critic] Reviewing code...")
-    review = agents['critic'].run(code, subtask)
-    print(f"{indent}Critic review: {review}")
-    if review.get('issues') and review.get('issues') != '':
-        print(f"{indent}[Coder] Improving code based on critic feedback...")
-        code = agents['coder'].run(f"{subtask}\n\nCritic feedback:\n{review}")
+    # Review and documentation are dropped when the time budget runs low; such a result is
+    # neither checkpointed as done nor stored in memory, so a later run completes it
+    downgraded = deadline.running_low()
+    early_docs = None
+    if downgraded:
+        emit('warning', 'deadline', "[Deadline] Time is running low; skipping review and documentation.")
+        review = Review(overall_rating='skipped (time budget)')
+    elif REVIEW_MODE in ('fused', 'concurrent') and context.restored(path, 'review') is None:
+        emit('debug', 'review.start', f"[Critic+Documenter] Reviewing and documenting ({REVIEW_MODE})...")
+        early_review, early_docs = review_and_document(code, subtask, agents)
+        review = stage('review', lambda: early_review or agents['critic'].run(code, subtask), Review.from_dict)
+    else:
+        emit('debug', 'review.start', "[Critic] Reviewing code...")
+        review = stage('review', lambda: agents['critic'].run(code, subtask), Review.from_dict)
+    if not downgraded:
+        emit('info', 'review', f"[Critic] Rating {review.overall_rating}, {len(review.issues)} issue(s)", review=review)
+    if review.issues:
+        feedback = '\n'.join(f"- {issue}" for issue in review.issues)
+        code = stage('improve', lambda: agents['coder'].run(f"{subtask}\n\nCritic feedback:\n{feedback}"))
+        emit('info', 'improve', "[Coder] Improved code based on critic feedback", code=code)
 
     # Documentation
-    print(f"{indent}[Documenter] Generating documentation...")
-    docs = agents['documenter'].run(code)
-    print(f"{indent}{docs}")
-    context.subtask_results.append({
+    if downgraded:
+        docs = "Documentation skipped: time budget exhausted."
+    elif early_docs and not review.issues:
+        # Written alongside the review, for code the review left unchanged
+        docs = stage('docs', lambda: early_docs)
+        if REVIEW_MODE == 'fused':
+            record_saved('fused')
+        emit('info', 'docs', "[Documenter] Documentation ready", docs=docs)
+    else:
+        emit('debug', 'docs.start', "[Documenter] Generating documentation...")
+        docs = stage('docs', lambda: agents['documenter'].run(code))
+        emit('info', 'docs', "[Documenter] Documentation ready", docs=docs)
+    result = {
         'subtask': subtask,
         'code': code,
         'test_results': test_results,
         'review': review,
         'docs': docs
-    })
-    context.final_docs.append(docs)
-    # Save to persistent memory
-    context.memory[subtask] = {
-        'code': code,
-        'test_results': test_results,
-        'review': review,
-        'docs': docs
     }
-    save_memory(context.memory)
+    context.record_result(result, persist=not downgraded)
+    if not downgraded:
+        stage('done', lambda: result)
 
     # (Stub) Continuous monitoring/self-improvement hook
     # e.g., schedule re-testing, re-research, or optimization
-    # print(f"{indent}[Monitor] Scheduling continuous improvement for: {subtask}")
+    # emit('info', 'monitor', f"[Monitor] Scheduling continuous improvement for: {subtask}")
 
 
-def main():
-    user_request = input("Enter your coding request: ")
-    context = Context(user_request)
-
-    gemini = GeminiAPI()
-    research_agent = ResearchAgent("Researcher", web_search_func, gemini)
-    planner = PlannerAgent("Planner", gemini)
-    modal_switcher = ModalSwitcherAgent("ModalSwitcher", gemini)
-    coder = CoderAgent("Coder", gemini)
-    tester = TesterAgent("Tester", gemini)
-    debugger = DebuggerAgent("Debugger", gemini)
-    documenter = DocumenterAgent("Documenter", gemini)
-    critic = CriticAgent("Critic", gemini)
-    deployment = DeploymentAgent("Deployment")
-    meta_agent = MetaAgent("Meta", gemini)
-
-    agents = {
-        'research_agent': research_agent,
-        'planner': planner,
-        'modal_switcher': modal_switcher,
-        'coder': coder,
-        'tester': tester,
-        'debugger': debugger,
-        'documenter': documenter,
-        'critic': critic,
-        'deployment': deployment,
-        'meta_agent': meta_agent
+def review_and_document(code, subtask, agents):
+    # (Review, docs) for REVIEW_MODE fused or concurrent; either is None when the fused
+    # answer lacked it, and is then produced by its own agent
+    if REVIEW_MODE == 'fused':
+        fused = agents['critic'].review_with_docs(code, subtask)
+        if fused is None:
+            return None, None
+        return fused.review, fused.docs or None
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix='documenter') as pool:
+        docs = pool.submit(contextvars.copy_context().run, agents['documenter'].run, code)
+        review = agents['critic'].run(code, subtask)
+        return review, docs.result()
+
+def build_agents(gemini, research_store=None):
+    return {
+        'research_agent': ResearchAgent("Researcher", web_search_func, gemini, store=research_store),
+        'planner': PlannerAgent("Planner", gemini),
+        'modal_switcher': ModalSwitcherAgent("ModalSwitcher", gemini),
+        'coder': CoderAgent("Coder", gemini),
+        'tester': TesterAgent("Tester", gemini),
+        'debugger': DebuggerAgent("Debugger", gemini),
+        'documenter': DocumenterAgent("Documenter", gemini),
+        'critic': CriticAgent("Critic", gemini),
+        'deployment': DeploymentAgent("Deployment"),
+        'meta_agent': MetaAgent("Meta", gemini)
     }
 
-    # Step 1: Research
-    print("\n[Researching]")
-    context.research = research_agent.run(user_request)
-    print(context.research)
+def run_request(user_request, agents, review_plan, review_results, memory=None, journal=None, budget=None):
+    # One request end to end without any prompting: review_plan(plan, replan) returns the
+    # plan to execute (replan() asks the planner again) or None to abort; review_results(context)
+    # returns whether to accept the results. Returns the Context, whose status is
+    # "complete", "failed" or "aborted". With a CheckpointJournal, stages finished by an
+    # earlier run (including the approved plan) are restored instead of repeated.
+    # budget (seconds) bounds the whole run; work that would overrun it is skipped or cut short.
+    context = Context(user_request, memory=memory, journal=journal, gemini=agents['planner'].gemini)
+    try:
+        with deadline.budget(budget), saved_calls(context.calls_saved):
+            _run_request(context, agents, review_plan, review_results)
+    finally:
+        context.close()
+    return context
+
+def _run_request(context, agents, review_plan, review_results):
+    user_request = context.user_request
+    context.checkpoint((), 'request', lambda: user_request)
+    try:
+        # Step 1: Research
+        print("\n[Researching]")
+        context.research = context.checkpoint((), 'research', lambda: agents['research_agent'].run(user_request))
+        print(context.research)
 
-    # Step 2: Planning
-    print("\n[Planning]")
-    plan_input = f"{user_request}\n\nRelevant research findings:\n{context.research}"
-    context.plan = planner.run(plan_input)
-    print("Plan:", context.plan)
+        # Step 2: Planning
+        print("\n[Planning]")
+        replan = lambda: agents['planner'].run(user_request, cached_prefix=context.shared_prefix())
+        context.plan = context.checkpoint((), 'plan', replan)
+        print("Plan:", context.plan)
+    except (GeminiAPIError, DeadlineExceeded) as e:
+        print(f"[FATAL] Research/planning did not finish: {e}")
+        context.fail({'stage': 'planning', 'error': str(e)})
+        return
 
     # User-in-the-loop checkpoint: Approve or edit plan
+    plan = context.checkpoint((), 'approved_plan', lambda: review_plan(context.plan, replan))
+    if plan is None:
+        context.status = "aborted"
+        return
+    context.plan = plan
+
+    # Step 3: Execute subtasks as a dependency DAG, independent ones in parallel (with recursion/meta-reasoning)
+    run_plan(context.plan, context, agents, execute_subtask)
+    if context.status == "failed":
+        print("[FATAL] Stopping due to unresolved failures.")
+
+    # User-in-the-loop checkpoint: Approve or edit before deployment (stub)
+    if not review_results(context):
+        print("Aborting deployment.")
+        if context.status != "failed":
+            context.status = "aborted"
+        return
+    if context.status != "failed":
+        context.status = "complete"
+
+def interactive_plan_review(plan, replan):
+    # Subtask events are printed in the background; let them finish before prompting
+    events.flush()
     print("\n[User Checkpoint] Review the plan above.")
     user_action = input("Type 'approve' to continue, 'edit' to modify the plan, or 'replan' to start over: ").strip().lower()
     if user_action == 'edit':
         new_plan = input("Enter your edited plan as a JSON array or comma-separated list: ")
         try:
-            context.plan = json.loads(new_plan)
+            return json.loads(new_plan)
         except Exception:
-            context.plan = [item.strip() for item in new_plan.split(',') if item.strip()]
+            return [item.strip() for item in new_plan.split(',') if item.strip()]
     elif user_action == 'replan':
         print("Re-running planner...")
-        context.plan = planner.run(plan_input)
-        print("New Plan:", context.plan)
-
-    # Step 3: Execute each subtask (with recursion/meta-reasoning)
-    for subtask in context.plan:
-        execute_subtask(subtask, context, agents)
-        if context.status == "failed":
-            print("[FATAL] Stopping due to unresolved failures.")
-            break
+        plan = replan()
+        print("New Plan:", plan)
+    return plan
 
-    # User-in-the-loop checkpoint: Approve or edit before deployment (stub)
+def print_results(results):
+    for result in results:
+        print(f"\nSubtask: {result['subtask']}")
+        print("Code:\n", result['code'])
+        print("Test Results:", result['test_results'])
+        print("Critic Review:", result['review'])
+        print("Documentation:\n", result['docs'])
+
+def interactive_results_review(context):
+    events.flush()
+    # The console only shows one-line events, so show what is about to be deployed
+    print_results(context.subtask_results)
     print("\n[User Checkpoint] Review all results before deployment.")
     user_action = input("Type 'approve' to deploy, 'edit' to modify code/docs, or 'abort' to stop: ").strip().lower()
     if user_action == 'edit':
         print("Manual editing not implemented yet. Please edit files directly if needed.")
-    elif user_action == 'abort':
-        print("Aborting deployment.")
+    return user_action != 'abort'
+
+def main():
+    parser = argparse.ArgumentParser(description="Interactive multi-agent coding run.")
+    parser.add_argument('--resume', metavar='CHECKPOINT', help="Continue an interrupted run from its checkpoint journal")
+    parser.add_argument('--budget', type=float, default=float(os.environ['RUN_BUDGET']) if os.getenv('RUN_BUDGET') else None,
+                        metavar='SECONDS', help="Wall-clock budget for the run, including time at the review prompts")
+    args = parser.parse_args()
+    if args.resume:
+        journal = CheckpointJournal(args.resume)
+        user_request = journal.get('', 'request')
+        if user_request is None:
+            print(f"[FATAL] {args.resume} has no recorded request to resume.")
+            return
+        print(f"[Checkpoint] Resuming: {user_request}")
+    else:
+        user_request = input("Enter your coding request: ")
+        journal = CheckpointJournal(os.path.join(CHECKPOINT_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.jsonl"))
+        print(f"[Checkpoint] Recording to {journal.path} (resume with --resume {journal.path})")
+    gemini = GeminiAPI(cache=ResponseCache.from_env(), rate_limiter=RateLimiter.from_env(), router=ModelRouter.from_env())
+    research_store = ResearchStore.from_env()
+    agents = build_agents(gemini, research_store)
+    context = run_request(user_request, agents, interactive_plan_review, interactive_results_review, journal=journal,
+                          budget=args.budget)
+    journal.close()
+    events.flush()
+    if context.status == "aborted" or not context.plan:
         return
 
-    context.status = "complete"
     print("\n[All subtasks complete. Final documentation and results:]")
-    for result in context.subtask_results:
-        print(f"\nSubtask: {result['subtask']}")
-        print("Code:\n", result['code'])
-        print("Test Results:", result['test_results'])
-        print("Critic Review:", result['review'])
-        print("Documentation:\n", result['docs'])
+    print_results(context.subtask_results)
+    if gemini.cache is not None:
+        print("\n[Response cache]", gemini.cache.stats())
+    if gemini.rate_limiter is not None:
+        print("[Rate limiter]", gemini.rate_limiter.stats())
+    print("[Context cache]", gemini.prefix_stats)
+    print("[Calls saved]", context.calls_saved or 'none')
+    if gemini.router is not None:
+        print("[Routing]")
+        for route, totals in sorted(gemini.router.stats().items()):
+            print(f"  {route:<40} {totals['calls']:>5} calls {totals['rejected']:>4} rejected "
+                  f"{totals['seconds']:>8.2f}s ${totals['cost_usd']:.4f}")
+        gemini.router.close()
+    print("[Debugger]", agents['debugger'].stats)
+    if research_store is not None:
+        print("[Research store]", agents['research_agent'].stats)
+        research_store.close()
+    print("[Telemetry]")
+    for (name, role), totals in sorted(telemetry.summary().items(), key=lambda item: -item[1]['seconds']):
+        print(f"  {name:<16} {role:<15} {totals['count']:>5} calls {totals['seconds']:>9.2f}s")
 
 if __name__ == "__main__":
     main()
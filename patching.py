@@ -0,0 +1,108 @@
+import re
+
+# Helpers for the diff-based debug loop: pick the failing region of a file from test
+# output, render it with line numbers, and apply the unified diff the model returns.
+# Hunks are located by their context lines (near the line numbers given, tolerating
+# drift and whitespace differences); anything that does not apply raises PatchError.
+
+HUNK_RE = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+DIFF_BLOCK_RE = re.compile(r'```(?:diff|patch)?\s*\n([\s\S]*?)```')
+# Traceback and pytest references to the file under test
+LINE_REF_RE = re.compile(r'(?:solution|main)\.py(?:", line |:)(\d+)')
+# A line-number gutter the model may copy from the excerpt ("  42| ")
+GUTTER_RE = re.compile(r'^\s*\d+\| ?')
+
+class PatchError(Exception):
+    pass
+
+def failing_lines(details):
+    return sorted({int(n) for n in LINE_REF_RE.findall(details or '')})
+
+def code_window(code, lines, context=15, full_file_lines=60):
+    # Numbered excerpt covering `context` lines around each failing line; small files,
+    # or errors without line information, are sent whole
+    source = code.splitlines()
+    if len(source) <= full_file_lines or not lines:
+        ranges = [(1, len(source))]
+    else:
+        ranges = []
+        for line in lines:
+            start, end = max(1, line - context), min(len(source), line + context)
+            if ranges and start <= ranges[-1][1] + 1:
+                ranges[-1] = (ranges[-1][0], max(ranges[-1][1], end))
+            else:
+                ranges.append((start, end))
+    width = len(str(len(source)))
+    parts = []
+    for start, end in ranges:
+        if parts or start > 1:
+            parts.append('...')
+        parts.extend(f"{n:>{width}}| {source[n - 1]}" for n in range(start, end + 1))
+    if ranges and ranges[-1][1] < len(source):
+        parts.append('...')
+    return '\n'.join(parts)
+
+def extract_diff(response):
+    match = DIFF_BLOCK_RE.search(response)
+    return match.group(1) if match else response
+
+def parse_hunks(diff):
+    hunks = []
+    current = None
+    for line in diff.splitlines():
+        header = HUNK_RE.match(line)
+        if header:
+            current = {'old_start': int(header.group(1)), 'lines': []}
+            hunks.append(current)
+        elif current is None or line.startswith(('--- ', '+++ ', '\\')):
+            continue
+        elif line == '':
+            # Editors and models drop the single space of empty context lines
+            current['lines'].append((' ', ''))
+        elif line[0] in ' +-':
+            current['lines'].append((line[0], GUTTER_RE.sub('', line[1:], count=1)))
+        else:
+            raise PatchError(f"Malformed hunk line: {line!r}")
+    if not hunks:
+        raise PatchError("No hunks in the model's response")
+    return hunks
+
+def _find(lines, old, expected, normalize):
+    wanted = [normalize(line) for line in old]
+    # Nearest match to where the hunk says it belongs, which may be past the end of the file
+    expected = min(expected, max(0, len(lines) - len(old)))
+    for distance in range(len(lines) + 1):
+        for pos in (expected - distance, expected + distance):
+            if 0 <= pos <= len(lines) - len(old) and [normalize(line) for line in lines[pos:pos + len(old)]] == wanted:
+                return pos
+    return None
+
+def apply_unified_diff(code, diff):
+    lines = code.splitlines()
+    offset = 0
+    for hunk in parse_hunks(diff):
+        old = [text for tag, text in hunk['lines'] if tag in ' -']
+        new = [text for tag, text in hunk['lines'] if tag in ' +']
+        expected = max(0, hunk['old_start'] - 1 + offset)
+        if not old:
+            pos = min(expected, len(lines))
+        else:
+            pos = _find(lines, old, expected, str.rstrip)
+            if pos is None:
+                pos = _find(lines, old, expected, str.strip)
+            if pos is None:
+                raise PatchError(f"Hunk at line {hunk['old_start']} does not match the code")
+        lines[pos:pos + len(old)] = new
+        offset = pos - (hunk['old_start'] - 1) + len(new) - len(old)
+    return '\n'.join(lines) + ('\n' if code.endswith('\n') else '')
+
+def validate_python(original, patched):
+    # A patch must not turn compiling code into code that does not compile
+    try:
+        compile(original, 'solution.py', 'exec')
+    except SyntaxError:
+        return
+    try:
+        compile(patched, 'solution.py', 'exec')
+    except SyntaxError as e:
+        raise PatchError(f"Patched code does not compile: {e}")
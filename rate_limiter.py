@@ -0,0 +1,148 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from deadline import DeadlineExceeded
+
+# Client-side quota control shared by every GeminiAPI call: token buckets for
+# requests/minute and tokens/minute, served strictly in priority order.
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+# Planner and Coder go first when we are close to quota; bookkeeping calls wait
+ROLE_PRIORITIES = {
+    'planner': PRIORITY_HIGH,
+    'coder': PRIORITY_HIGH,
+    'debugger': PRIORITY_HIGH,
+    'tester': PRIORITY_NORMAL,
+    'critic': PRIORITY_NORMAL,
+    'researcher': PRIORITY_NORMAL,
+    'meta': PRIORITY_NORMAL,
+    'documenter': PRIORITY_LOW,
+    'modal_switcher': PRIORITY_LOW,
+}
+
+def priority_for(role):
+    return ROLE_PRIORITIES.get(role, PRIORITY_NORMAL)
+
+def estimate_tokens(text):
+    # Rough count (~4 characters per token) used until usageMetadata reports the real one
+    return max(1, len(text) // 4)
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount):
+        # May go negative when usage is reconciled upwards; later callers then wait longer
+        self.tokens -= amount
+
+    def drain(self):
+        self.tokens = min(self.tokens, 0.0)
+
+class RateLimiter:
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._paused_until = 0.0
+        self.metrics = {'acquired': 0, 'throttled': 0, 'timed_out': 0, 'wait_seconds_total': 0.0, 'wait_seconds_max': 0.0}
+        self.wait_by_priority = {PRIORITY_HIGH: 0.0, PRIORITY_NORMAL: 0.0, PRIORITY_LOW: 0.0}
+
+    @classmethod
+    def from_env(cls):
+        rpm = os.getenv('GEMINI_RPM')
+        tpm = os.getenv('GEMINI_TPM')
+        if not rpm and not tpm:
+            return None
+        return cls(requests_per_minute=int(rpm) if rpm else None, tokens_per_minute=int(tpm) if tpm else None)
+
+    def acquire(self, priority=PRIORITY_NORMAL, tokens=0, timeout=None):
+        # Blocks until this caller is first in line and both buckets can cover it.
+        # Returns the time spent waiting in seconds. With a timeout (e.g. the time left
+        # before the caller's deadline), raises DeadlineExceeded as soon as it is clear
+        # the caller cannot be served in time, without taking anything from the buckets.
+        ticket = (priority, next(self._sequence))
+        start = time.monotonic()
+        limit = start + timeout if timeout is not None else None
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    if self._waiters[0] != ticket:
+                        if limit is not None and now >= limit:
+                            self._time_out(now - start)
+                        self._cond.wait(limit - now if limit is not None else None)
+                        continue
+                    delay = max(
+                        self._paused_until - now,
+                        self.requests.wait_time(1, now) if self.requests else 0.0,
+                        self.tokens.wait_time(tokens, now) if self.tokens else 0.0
+                    )
+                    if delay <= 0:
+                        if self.requests:
+                            self.requests.take(1)
+                        if self.tokens:
+                            self.tokens.take(tokens)
+                        break
+                    if limit is not None and now + delay > limit:
+                        self._time_out(now - start)
+                    self._cond.wait(delay)
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+            waited = time.monotonic() - start
+            self.metrics['acquired'] += 1
+            self.metrics['wait_seconds_total'] += waited
+            self.metrics['wait_seconds_max'] = max(self.metrics['wait_seconds_max'], waited)
+            self.wait_by_priority[priority] = self.wait_by_priority.get(priority, 0.0) + waited
+        return waited
+
+    def _time_out(self, waited):
+        # Caller holds the condition
+        self.metrics['timed_out'] += 1
+        raise DeadlineExceeded(f"Time budget exhausted waiting {waited:.1f}s for the Gemini rate limit")
+
+    def record_usage(self, estimated, actual):
+        # Reconcile the estimate taken in acquire() with usageMetadata.totalTokenCount
+        if self.tokens is None:
+            return
+        with self._cond:
+            self.tokens.take(actual - estimated)
+            self._cond.notify_all()
+
+    def penalize(self, seconds):
+        # The server said we are over quota: hold everyone back and empty the request bucket
+        with self._cond:
+            self.metrics['throttled'] += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            if self.requests:
+                self.requests.drain()
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self.metrics)
+            stats['waiting'] = len(self._waiters)
+            stats['wait_seconds_by_priority'] = dict(self.wait_by_priority)
+        stats['wait_seconds_mean'] = stats['wait_seconds_total'] / stats['acquired'] if stats['acquired'] else 0.0
+        return stats
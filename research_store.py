@@ -0,0 +1,207 @@
+import hashlib
+import math
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from array import array
+
+# Local index of past research summaries, so ResearchAgent can reuse or refresh a
+# close match instead of searching and summarizing again. Everything lives in one
+# SQLite file (WAL): a BM25 inverted index over query and summary for full-text search,
+# and a MinHash signature of each query with LSH bands for near-duplicate lookup.
+# Adding or replacing an entry updates postings, document frequencies and bands in one
+# transaction; nothing is ever rebuilt.
+
+STOPWORDS = frozenset(
+    "a an and are as at be build by can create for from how i in into is it make me my of on or please "
+    "should that the this to use using want we with write you your".split()
+)
+NUM_PERM = 64
+# 16 bands of 4 rows: queries sharing any band are candidates (~50% Jaccard and up)
+BANDS = 16
+_MERSENNE = (1 << 61) - 1
+_rng = random.Random(0x5EED)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE), _rng.randrange(0, _MERSENNE)) for _ in range(NUM_PERM)]
+
+def tokenize(text):
+    return [token for token in re.findall(r'[a-z0-9][a-z0-9+#]*', text.lower()) if token not in STOPWORDS]
+
+def shingles(text):
+    # Words and word pairs: short queries still get several shingles, and word order counts a little
+    tokens = tokenize(text)
+    return set(tokens) | {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+
+def minhash(text):
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'big') for s in shingles(text)]
+    if not hashes:
+        return None
+    return array('Q', [min((a * h + b) % _MERSENNE for h in hashes) for a, b in _PERMUTATIONS])
+
+def similarity(sig_a, sig_b):
+    # Estimated Jaccard similarity of the two shingle sets
+    if sig_a is None or sig_b is None:
+        return 0.0
+    return sum(x == y for x, y in zip(sig_a, sig_b)) / NUM_PERM
+
+def _band_buckets(signature):
+    rows = NUM_PERM // BANDS
+    for band in range(BANDS):
+        digest = hashlib.blake2b(signature[band * rows:(band + 1) * rows].tobytes(), digest_size=8).digest()
+        # SQLite integers are signed 64-bit
+        yield band, int.from_bytes(digest, 'big') >> 1
+
+class ResearchMatch:
+    def __init__(self, id, query, summary, updated_at, similarity, fresh):
+        self.id = id
+        self.query = query
+        self.summary = summary
+        self.updated_at = updated_at
+        self.similarity = similarity
+        # Younger than the store's max_age: reusable as is; otherwise worth a refresh
+        self.fresh = fresh
+
+class ResearchStore:
+    def __init__(self, path="research_store.db", threshold=0.6, max_age=7 * 24 * 3600, k1=1.2, b=0.75):
+        self.path = path
+        # Smallest estimated query similarity that counts as a match
+        self.threshold = threshold
+        # Seconds a match is reused as is; older matches are refreshed
+        self.max_age = max_age
+        self.k1 = k1
+        self.b = b
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            "id INTEGER PRIMARY KEY, query TEXT NOT NULL, summary TEXT NOT NULL, length INTEGER NOT NULL, "
+            "signature BLOB, updated_at REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS postings ("
+            "term TEXT NOT NULL, doc_id INTEGER NOT NULL, tf INTEGER NOT NULL, PRIMARY KEY (term, doc_id)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS postings_doc ON postings(doc_id);"
+            "CREATE TABLE IF NOT EXISTS terms (term TEXT PRIMARY KEY, df INTEGER NOT NULL) WITHOUT ROWID;"
+            "CREATE TABLE IF NOT EXISTS bands ("
+            "band INTEGER NOT NULL, bucket INTEGER NOT NULL, doc_id INTEGER NOT NULL, "
+            "PRIMARY KEY (band, bucket, doc_id)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS bands_doc ON bands(doc_id);"
+        )
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        # RESEARCH_DB enables the store; unset keeps every research call fresh
+        path = os.getenv('RESEARCH_DB')
+        if not path:
+            return None
+        return cls(path, threshold=float(os.getenv('RESEARCH_SIMILARITY', 0.6)),
+                   max_age=float(os.getenv('RESEARCH_MAX_AGE', 7 * 24 * 3600)))
+
+    def lookup(self, query, candidates=20):
+        # The most similar past query at or above the threshold, or None. Candidates come
+        # from shared LSH bands and the BM25 top hits; MinHash similarity decides.
+        signature = minhash(query)
+        if signature is None:
+            return None
+        with self._lock:
+            ids = {row[0] for band, bucket in _band_buckets(signature) for row in self._db.execute(
+                "SELECT doc_id FROM bands WHERE band = ? AND bucket = ?", (band, bucket))}
+        ids.update(doc_id for doc_id, _ in self.search(query, limit=candidates))
+        best = None
+        for doc_id, doc_query, summary, updated_at, blob in self._docs(ids):
+            score = similarity(signature, array('Q', blob) if blob else None)
+            if score >= self.threshold and (best is None or score > best.similarity):
+                fresh = self.max_age > 0 and time.time() - updated_at <= self.max_age
+                best = ResearchMatch(doc_id, doc_query, summary, updated_at, score, fresh)
+        return best
+
+    def search(self, text, limit=10):
+        # BM25 over query and summary: [(doc id, score)], best first
+        terms = set(tokenize(text))
+        if not terms:
+            return []
+        with self._lock:
+            total, avg_length = self._db.execute("SELECT COUNT(*), AVG(length) FROM docs").fetchone()
+            placeholders = ','.join('?' * len(terms))
+            rows = self._db.execute(
+                f"SELECT p.doc_id, p.tf, d.length, t.df FROM postings p "
+                f"JOIN docs d ON d.id = p.doc_id JOIN terms t ON t.term = p.term WHERE p.term IN ({placeholders})",
+                tuple(terms)
+            ).fetchall()
+        scores = {}
+        for doc_id, tf, length, df in rows:
+            idf = math.log((total - df + 0.5) / (df + 0.5) + 1)
+            norm = tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / (avg_length or 1)))
+            scores[doc_id] = scores.get(doc_id, 0.0) + idf * norm
+        return sorted(scores.items(), key=lambda item: -item[1])[:limit]
+
+    def add(self, query, summary, replaces=None):
+        # Indexes a summary and returns its id; replaces drops an entry it supersedes
+        tokens = tokenize(f"{query}\n{summary}")
+        frequencies = {}
+        for token in tokens:
+            frequencies[token] = frequencies.get(token, 0) + 1
+        signature = minhash(query)
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                if replaces is not None:
+                    self._remove(replaces)
+                doc_id = self._db.execute(
+                    "INSERT INTO docs (query, summary, length, signature, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (query, summary, len(tokens), signature.tobytes() if signature else None, time.time())
+                ).lastrowid
+                self._db.executemany("INSERT INTO postings (term, doc_id, tf) VALUES (?, ?, ?)",
+                                     [(term, doc_id, tf) for term, tf in frequencies.items()])
+                self._db.executemany("INSERT INTO terms (term, df) VALUES (?, 1) ON CONFLICT(term) DO UPDATE SET df = df + 1",
+                                     [(term,) for term in frequencies])
+                if signature is not None:
+                    self._db.executemany("INSERT INTO bands (band, bucket, doc_id) VALUES (?, ?, ?)",
+                                         [(band, bucket, doc_id) for band, bucket in _band_buckets(signature)])
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return doc_id
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._remove(doc_id)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def get(self, doc_id):
+        rows = self._docs([doc_id])
+        return {'id': rows[0][0], 'query': rows[0][1], 'summary': rows[0][2], 'updated_at': rows[0][3]} if rows else None
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def close(self):
+        self._db.close()
+
+    def _docs(self, ids):
+        ids = list(ids)
+        if not ids:
+            return []
+        with self._lock:
+            return self._db.execute(
+                f"SELECT id, query, summary, updated_at, signature FROM docs WHERE id IN ({','.join('?' * len(ids))})",
+                ids
+            ).fetchall()
+
+    def _remove(self, doc_id):
+        # Caller holds the lock inside a transaction
+        terms = [(row[0],) for row in self._db.execute("SELECT term FROM postings WHERE doc_id = ?", (doc_id,))]
+        self._db.executemany("UPDATE terms SET df = df - 1 WHERE term = ?", terms)
+        self._db.execute("DELETE FROM terms WHERE df <= 0")
+        self._db.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+        self._db.execute("DELETE FROM bands WHERE doc_id = ?", (doc_id,))
+        self._db.execute("DELETE FROM docs WHERE id = ?", (doc_id,))
@@ -0,0 +1,161 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Two-tier cache for model responses: an in-process LRU with TTL in front of an
+# optional SQLite file that several processes can share. Both tiers evict by size.
+
+# The disk tier keeps a running byte total and checks it against the table (other
+# processes write to it too) every this many writes, dropping expired rows then
+DISK_RESYNC_WRITES = 256
+
+class ResponseCache:
+    def __init__(self, max_memory_bytes=16 * 1024 * 1024, ttl=86400, db_path=None, max_disk_bytes=256 * 1024 * 1024):
+        self.max_memory_bytes = max_memory_bytes
+        self.ttl = ttl
+        self.db_path = db_path
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()  # key -> (value, expires_at, size)
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+        self._db = None
+        self._disk_bytes = None
+        self._disk_writes = 0
+        if db_path:
+            self._db = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+            # WAL lets readers in other processes proceed while one process writes
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed_at)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_expires ON responses(expires_at)")
+
+    @classmethod
+    def from_env(cls):
+        # GEMINI_CACHE_DB enables both tiers; GEMINI_CACHE=1 enables the memory tier only
+        db_path = os.getenv('GEMINI_CACHE_DB')
+        if not db_path and os.getenv('GEMINI_CACHE', '').lower() not in ('1', 'true', 'yes'):
+            return None
+        return cls(ttl=float(os.getenv('GEMINI_CACHE_TTL', 86400)), db_path=db_path)
+
+    @staticmethod
+    def make_key(*parts):
+        return hashlib.sha256('\x00'.join(str(p) for p in parts).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at, size = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.counters['memory_hits'] += 1
+                    return value
+                self._drop_memory(key)
+            if self._db is not None:
+                row = self._db.execute("SELECT value, expires_at, size FROM responses WHERE key = ?", (key,)).fetchone()
+                if row and row[1] > now:
+                    self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                    self._store_memory(key, row[0], row[1])
+                    self.counters['disk_hits'] += 1
+                    return row[0]
+                if row:
+                    # Expired rows are dropped when met, and in bulk on each resync
+                    self._db.execute("DELETE FROM responses WHERE key = ? AND expires_at <= ?", (key, now))
+                    if self._disk_bytes is not None:
+                        self._disk_bytes -= row[2]
+            self.counters['misses'] += 1
+            return None
+
+    def set(self, key, value):
+        now = time.time()
+        expires_at = now + self.ttl
+        with self._lock:
+            self._store_memory(key, value, expires_at)
+            self.counters['stores'] += 1
+            if self._db is not None:
+                size = len(value.encode('utf-8'))
+                replaced = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, value, size, expires_at, now)
+                )
+                self._evict_disk(now, size - (replaced[0] if replaced else 0))
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats['memory_entries'] = len(self._memory)
+            stats['memory_bytes'] = self._memory_bytes
+            if self._db is not None:
+                stats['disk_bytes'] = self._disk_bytes
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._disk_bytes = 0
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _store_memory(self, key, value, expires_at):
+        size = len(value.encode('utf-8'))
+        if size > self.max_memory_bytes:
+            return
+        self._drop_memory(key)
+        self._memory[key] = (value, expires_at, size)
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes:
+            oldest = next(iter(self._memory))
+            self._drop_memory(oldest)
+            self.counters['evictions'] += 1
+
+    def _drop_memory(self, key):
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= entry[2]
+
+    def _resync_disk(self, now):
+        self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        self._disk_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _evict_disk(self, now, added):
+        self._disk_writes += 1
+        if self._disk_bytes is None or self._disk_writes % DISK_RESYNC_WRITES == 0:
+            self._resync_disk(now)
+        else:
+            self._disk_bytes += added
+        if self._disk_bytes <= self.max_disk_bytes:
+            return
+        # Over budget by our count: expired rows go first, then least recently used
+        # rows until we are back under 90% of the budget
+        self._resync_disk(now)
+        if self._disk_bytes <= self.max_disk_bytes:
+            return
+        excess = self._disk_bytes - int(self.max_disk_bytes * 0.9)
+        victims = []
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            victims.append((key,))
+            excess -= size
+            self._disk_bytes -= size
+            if excess <= 0:
+                break
+        self._db.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self.counters['evictions'] += len(victims)
@@ -0,0 +1,234 @@
+import atexit
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from response_cache import ResponseCache
+import deadline
+import telemetry
+
+# Sandboxed runner for generated code and tests. A pool of pre-warmed worker
+# interpreters forks one child per run; the child gets its own scratch directory
+# and CPU/memory/file-size rlimits, and the worker enforces a wall-clock timeout.
+
+MAX_OUTPUT = 64 * 1024
+
+def _warm_worker():
+    # Import the test frameworks once so every forked run starts hot
+    import runpy  # noqa: F401
+    import unittest  # noqa: F401
+    try:
+        import pytest  # noqa: F401
+    except ImportError:
+        pass
+
+def _safe_path(root, filename):
+    path = os.path.normpath(os.path.join(root, filename))
+    if not path.startswith(root + os.sep):
+        raise ValueError(f"Refusing to write outside the scratch directory: {filename}")
+    return path
+
+def _vm_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return 0
+
+def _apply_limits(cpu_seconds, memory_mb):
+    import resource
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+    # The forked child already maps the warm interpreter, so the budget is on top of that
+    memory = _vm_bytes() + memory_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (64 * 1024 * 1024, 64 * 1024 * 1024))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+
+def _uses_pytest(source, mode):
+    if mode != 'auto':
+        return False
+    # Files that drive themselves (unittest.main() or a __main__ block) run as scripts, like `python file.py`
+    if 'unittest.main' in source or '__main__' in source:
+        return False
+    return re.search(r'^\s*def test_', source, re.MULTILINE) is not None
+
+def _child_main(workdir, entry, mode):
+    import runpy
+    os.chdir(workdir)
+    sys.path.insert(0, workdir)
+    sys.argv = [entry]
+    with open(entry) as f:
+        source = f.read()
+    if _uses_pytest(source, mode):
+        try:
+            import pytest
+        except ImportError:
+            pytest = None
+        if pytest is not None:
+            return int(pytest.main(['-q', '-p', 'no:cacheprovider', entry]))
+    runpy.run_path(entry, run_name='__main__' if mode != 'import' else '__sandbox__')
+    return 0
+
+def _print_user_traceback(exc):
+    # Drop the runner's own frames so the traceback starts in the generated code
+    tb = exc.__traceback__
+    while tb is not None and (tb.tb_frame.f_code.co_filename == __file__ or tb.tb_frame.f_code.co_filename.startswith('<frozen')):
+        tb = tb.tb_next
+    traceback.print_exception(type(exc), exc, tb or exc.__traceback__)
+
+def _read_tail(path):
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - MAX_OUTPUT))
+        return f.read().decode('utf-8', errors='replace')
+
+def _execute(files, entry, mode, cpu_seconds, memory_mb, wall_timeout):
+    workdir = tempfile.mkdtemp(prefix='testrun-')
+    logdir = tempfile.mkdtemp(prefix='testrun-log-')
+    try:
+        for filename, content in files.items():
+            path = _safe_path(workdir, filename)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write(content)
+        out_path = os.path.join(logdir, 'stdout')
+        err_path = os.path.join(logdir, 'stderr')
+        start = time.monotonic()
+        if not hasattr(os, 'fork'):
+            return _execute_subprocess(workdir, entry, out_path, err_path, wall_timeout, start)
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                # Own process group, so a timeout also kills anything the code spawned
+                os.setpgid(0, 0)
+                devnull = os.open(os.devnull, os.O_RDONLY)
+                os.dup2(devnull, 0)
+                os.dup2(os.open(out_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC), 1)
+                os.dup2(os.open(err_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC), 2)
+                _apply_limits(cpu_seconds, memory_mb)
+                code = _child_main(workdir, entry, mode)
+            except SystemExit as e:
+                code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+            except BaseException as e:
+                _print_user_traceback(e)
+                code = 1
+            finally:
+                try:
+                    sys.stdout.flush()
+                    sys.stderr.flush()
+                finally:
+                    os._exit(code)
+        timed_out = False
+        while True:
+            waited, status = os.waitpid(pid, os.WNOHANG)
+            if waited:
+                break
+            if time.monotonic() - start > wall_timeout:
+                timed_out = True
+                try:
+                    os.killpg(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                _, status = os.waitpid(pid, 0)
+                break
+            time.sleep(0.005)
+        returncode = os.waitstatus_to_exitcode(status)
+        stderr = _read_tail(err_path)
+        if timed_out:
+            stderr += f"\n[Timed out after {wall_timeout}s]"
+        return {
+            'status': 'success' if returncode == 0 else 'error',
+            'stdout': _read_tail(out_path),
+            'stderr': stderr,
+            'returncode': returncode,
+            'test_file': entry,
+            'timed_out': timed_out,
+            'duration': time.monotonic() - start
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        shutil.rmtree(logdir, ignore_errors=True)
+
+def _execute_subprocess(workdir, entry, out_path, err_path, wall_timeout, start):
+    # Platforms without fork: plain child interpreter, no rlimits
+    timed_out = False
+    with open(out_path, 'w') as out, open(err_path, 'w') as err:
+        try:
+            returncode = subprocess.run([sys.executable, entry], cwd=workdir, stdin=subprocess.DEVNULL,
+                                        stdout=out, stderr=err, timeout=wall_timeout).returncode
+        except subprocess.TimeoutExpired:
+            returncode, timed_out = -9, True
+    return {
+        'status': 'success' if returncode == 0 else 'error',
+        'stdout': _read_tail(out_path),
+        'stderr': _read_tail(err_path),
+        'returncode': returncode,
+        'test_file': entry,
+        'timed_out': timed_out,
+        'duration': time.monotonic() - start
+    }
+
+class TestRunnerPool:
+    def __init__(self, workers=4, cpu_seconds=10, memory_mb=512, wall_timeout=20, cache=None):
+        self.workers = workers
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.wall_timeout = wall_timeout
+        # Results keyed by a hash of every file's content, so unchanged code is never re-run
+        self.cache = cache or ResponseCache(ttl=3600)
+        context = multiprocessing.get_context('forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn')
+        self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_warm_worker)
+
+    def warm(self):
+        # Start every worker now rather than on the first run
+        for future in [self._pool.submit(os.getpid) for _ in range(self.workers)]:
+            future.result()
+
+    def run(self, files, entry, mode='auto'):
+        # mode: 'auto' runs pytest-style files under pytest and anything else as a script;
+        # 'script' always runs `python entry`; 'import' executes entry without __main__.
+        with telemetry.span('test_runner.run', entry=entry, mode=mode) as span:
+            result = self._run(files, entry, mode)
+            span.set(status=result['status'], cached=result['cached'], timed_out=result['timed_out'])
+            return result
+
+    def _run(self, files, entry, mode):
+        key = ResponseCache.make_key('test-run', mode, entry, *(f"{name}\x00{files[name]}" for name in sorted(files)))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return dict(json.loads(cached), cached=True)
+        # Never outlast the run's deadline
+        wall_timeout = deadline.timeout(self.wall_timeout)
+        result = self._pool.submit(_execute, dict(files), entry, mode, self.cpu_seconds, self.memory_mb, wall_timeout).result()
+        if not result['timed_out']:
+            self.cache.set(key, json.dumps(result))
+        return dict(result, cached=False)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+_default_runner = None
+_default_lock = threading.Lock()
+
+def get_test_runner():
+    global _default_runner
+    with _default_lock:
+        if _default_runner is None:
+            _default_runner = TestRunnerPool(
+                workers=int(os.getenv('TEST_WORKERS', 4)),
+                cpu_seconds=int(os.getenv('TEST_CPU_SECONDS', 10)),
+                memory_mb=int(os.getenv('TEST_MEMORY_MB', 512)),
+                wall_timeout=float(os.getenv('TEST_TIMEOUT', 20))
+            )
+            atexit.register(_default_runner.shutdown)
+        return _default_runner
@@ -0,0 +1,172 @@
+import asyncio
+import contextvars
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+import deadline
+
+# Single-flight execution: a call made while an identical one is already running waits
+# for that one and shares its result instead of sending the same request again. Errors
+# are shared as well, except a DeadlineExceeded or cancellation that belonged to the
+# caller who ran it; the waiting callers then run the call themselves. Streams are
+# shared through a buffer filled by a background thread, so a caller joining late
+# replays the chunks received so far and then follows along. saved_calls() counts, per
+# run, the calls avoided this way and by other means (e.g. fused review and docs).
+
+_saved = ContextVar('single_flight_saved', default=None)
+_saved_lock = threading.Lock()
+
+@contextmanager
+def saved_calls(counts=None):
+    # Calls avoided inside the block, by kind, are added to counts (a new dict by default)
+    counts = {} if counts is None else counts
+    token = _saved.set(counts)
+    try:
+        yield counts
+    finally:
+        _saved.reset(token)
+
+def record_saved(kind, n=1):
+    counts = _saved.get()
+    if counts is not None:
+        with _saved_lock:
+            counts[kind] = counts.get(kind, 0) + n
+
+def _retry_alone(error):
+    # The leader's own deadline or cancellation says nothing about the other callers
+    return isinstance(error, deadline.DeadlineExceeded) or not isinstance(error, Exception)
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class _StreamFlight:
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.readers = 0
+        self.cond = threading.Condition()
+
+class SingleFlight:
+    def __init__(self):
+        self._flights = {}
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        # (func()'s result, shared); shared is True when another caller's run supplied it
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+            if leader:
+                try:
+                    flight.result = func()
+                    return flight.result, False
+                except BaseException as e:
+                    flight.error = e
+                    raise
+                finally:
+                    with self._lock:
+                        del self._flights[key]
+                    flight.done.set()
+            if not flight.done.wait(deadline.timeout(None)):
+                deadline.check('a shared call finished')
+                continue
+            if flight.error is None:
+                return flight.result, True
+            if not _retry_alone(flight.error):
+                raise flight.error
+
+    def stream(self, key, func):
+        # (iterator over func()'s chunks, shared). The first caller's context runs func()
+        # on a background thread; it stops early once every reader has gone away.
+        with self._lock:
+            flight = self._streams.get(key)
+            shared = flight is not None
+            if not shared:
+                flight = self._streams[key] = _StreamFlight()
+            with flight.cond:
+                flight.readers += 1
+        if not shared:
+            context = contextvars.copy_context()
+            threading.Thread(target=context.run, args=(self._pump, key, flight, func),
+                             name='single-flight-stream', daemon=True).start()
+        return self._follow(flight), shared
+
+    def _pump(self, key, flight, func):
+        iterator = iter(func())
+        try:
+            for chunk in iterator:
+                with flight.cond:
+                    flight.chunks.append(chunk)
+                    flight.cond.notify_all()
+                    if flight.readers == 0:
+                        break
+        except BaseException as e:
+            flight.error = e
+        finally:
+            iterator.close()
+            with self._lock:
+                del self._streams[key]
+            with flight.cond:
+                flight.done = True
+                flight.cond.notify_all()
+
+    def _follow(self, flight):
+        index = 0
+        try:
+            while True:
+                with flight.cond:
+                    while index == len(flight.chunks) and not flight.done:
+                        flight.cond.wait(deadline.timeout(None))
+                    chunks = flight.chunks[index:]
+                    index += len(chunks)
+                    finished = flight.done
+                yield from chunks
+                if finished:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+        finally:
+            with flight.cond:
+                flight.readers -= 1
+
+class AsyncSingleFlight:
+    def __init__(self):
+        # Futures belong to one event loop, so flights are per loop
+        self._flights = {}
+
+    async def do(self, key, func):
+        loop = asyncio.get_running_loop()
+        while True:
+            future = self._flights.get((loop, key))
+            if future is None:
+                future = self._flights[(loop, key)] = loop.create_future()
+                try:
+                    result = await func()
+                except BaseException as e:
+                    if _retry_alone(e):
+                        future.cancel()
+                    else:
+                        future.set_exception(e)
+                        # Retrieved here, so no "exception never retrieved" warning without followers
+                        future.exception()
+                    raise
+                finally:
+                    del self._flights[(loop, key)]
+                future.set_result(result)
+                return result, False
+            try:
+                # shield: a waiting caller being cancelled must not cancel the shared call
+                return await asyncio.wait_for(asyncio.shield(future), deadline.timeout(None)), True
+            except asyncio.TimeoutError:
+                deadline.check('a shared call finished')
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
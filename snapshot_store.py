@@ -0,0 +1,292 @@
+import hashlib
+import json
+import os
+import shutil
+import stat
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError:
+    # Windows: no reflinks, plain copies
+    fcntl = None
+
+# Incremental snapshots of a deploy tree for backup/rollback. File contents are stored
+# once under objects/ by SHA-256 (the same layout as ArtifactStore); a snapshot is a
+# manifest of path -> hash, size, mtime and mode. Files whose size and mtime match the
+# previous snapshot of the same target reuse its hash without being read, and only
+# content the store has never seen is copied in (reflinked where the filesystem
+# supports it). Restore rewrites only files that differ from the snapshot and removes
+# files the snapshot does not have. Old snapshots are pruned per target after each new
+# one, and pruning runs gc(), which deletes objects no remaining snapshot refers to.
+#
+# Live files are never hardlinked into the store: an in-place write to the deploy tree
+# would silently change the stored copy too.
+
+CHUNK_SIZE = 1024 * 1024
+# ioctl(dest, FICLONE, src): copy-on-write clone on btrfs, XFS and other reflink filesystems
+FICLONE = 0x40049409
+
+class SnapshotError(Exception):
+    pass
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def clone_file(src, dest):
+    # Reflink when possible, otherwise a regular copy (sendfile on Linux)
+    with open(src, 'rb') as fin, open(dest, 'wb') as fout:
+        if fcntl is not None:
+            try:
+                fcntl.ioctl(fout.fileno(), FICLONE, fin.fileno())
+                return
+            except OSError:
+                pass
+        shutil.copyfileobj(fin, fout, CHUNK_SIZE)
+
+class SnapshotStore:
+    def __init__(self, root, keep=10):
+        self.root = os.path.abspath(root)
+        self.objects_dir = os.path.join(self.root, 'objects')
+        self.snapshots_dir = os.path.join(self.root, 'snapshots')
+        # Snapshots retained per target; older ones are pruned after each new snapshot
+        self.keep = keep
+        for path in (self.objects_dir, self.snapshots_dir):
+            os.makedirs(path, exist_ok=True)
+
+    def blob_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest[2:])
+
+    def snapshot(self, target):
+        # Records target (a file or directory tree) and returns the snapshot id
+        with self._locked(shared=True):
+            snapshot_id = self._snapshot(os.path.abspath(target))
+        self.prune(target)
+        return snapshot_id
+
+    def _snapshot(self, target):
+        if not os.path.lexists(target):
+            raise SnapshotError(f"Nothing to snapshot at {target}")
+        previous = self.latest(target)
+        known = previous['files'] if previous else {}
+        files = {}
+        dirs = []
+        stats = {'files': 0, 'hashed': 0, 'stored': 0, 'stored_bytes': 0}
+        for rel, path in self._walk(target, dirs):
+            st = os.lstat(path)
+            if stat.S_ISLNK(st.st_mode):
+                files[rel] = {'link': os.readlink(path)}
+                continue
+            stats['files'] += 1
+            old = known.get(rel)
+            if old and 'hash' in old and old['size'] == st.st_size and old['mtime_ns'] == st.st_mtime_ns \
+                    and os.path.exists(self.blob_path(old['hash'])):
+                digest = old['hash']
+            else:
+                digest = file_digest(path)
+                stats['hashed'] += 1
+                if self._store(path, digest):
+                    stats['stored'] += 1
+                    stats['stored_bytes'] += st.st_size
+            files[rel] = {'hash': digest, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'mode': stat.S_IMODE(st.st_mode)}
+        # Sortable by creation time, so the last id is the latest snapshot
+        now = time.time_ns()
+        snapshot_id = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now // 10**9))}-{now % 10**9:09d}-{uuid.uuid4().hex[:4]}"
+        manifest = {
+            'id': snapshot_id,
+            'target': target,
+            'kind': 'dir' if os.path.isdir(target) else 'file',
+            'created': time.time(),
+            'dirs': dirs,
+            'files': files,
+            'stats': stats
+        }
+        self._write_json(self._manifest_path(target, snapshot_id), manifest)
+        return snapshot_id
+
+    def restore(self, target, snapshot_id=None):
+        # Brings target back to a snapshot (default: the latest) touching only what differs
+        target = os.path.abspath(target)
+        manifest = self.load(target, snapshot_id) if snapshot_id else self.latest(target)
+        if manifest is None:
+            raise SnapshotError(f"No snapshot of {target}")
+        stats = {'restored': 0, 'unchanged': 0, 'removed': 0, 'restored_bytes': 0}
+        if manifest['kind'] == 'file':
+            if os.path.isdir(target) and not os.path.islink(target):
+                shutil.rmtree(target)
+        else:
+            if os.path.lexists(target) and not os.path.isdir(target):
+                os.unlink(target)
+            os.makedirs(target, exist_ok=True)
+            wanted = set(manifest['files'])
+            # Files created since the snapshot go first, deepest paths before their parents
+            current_dirs = []
+            for rel, path in self._walk(target, current_dirs):
+                if rel not in wanted:
+                    os.unlink(path)
+                    stats['removed'] += 1
+            keep_dirs = set(manifest['dirs'])
+            for rel in sorted(current_dirs, key=len, reverse=True):
+                if rel not in keep_dirs:
+                    shutil.rmtree(os.path.join(target, rel), ignore_errors=True)
+            for rel in manifest['dirs']:
+                os.makedirs(os.path.join(target, rel), exist_ok=True)
+        for rel, entry in manifest['files'].items():
+            path = os.path.join(target, rel) if rel else target
+            if self._matches(path, entry):
+                stats['unchanged'] += 1
+                continue
+            self._restore_file(path, entry)
+            stats['restored'] += 1
+            stats['restored_bytes'] += entry.get('size', 0)
+        return stats
+
+    def list(self, target):
+        directory = self._target_dir(os.path.abspath(target))
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-len('.json')] for name in os.listdir(directory) if name.endswith('.json'))
+
+    def load(self, target, snapshot_id):
+        try:
+            with open(self._manifest_path(os.path.abspath(target), snapshot_id)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def latest(self, target):
+        ids = self.list(target)
+        return self.load(target, ids[-1]) if ids else None
+
+    def prune(self, target, keep=None):
+        # Drops all but the newest `keep` snapshots of target and the content only they
+        # referred to; returns bytes freed
+        keep = self.keep if keep is None else keep
+        ids = self.list(target)
+        pruned = ids[:max(0, len(ids) - keep)]
+        for snapshot_id in pruned:
+            os.unlink(self._manifest_path(os.path.abspath(target), snapshot_id))
+        return self.gc() if pruned else 0
+
+    def gc(self):
+        # Deletes objects that no snapshot of any target refers to; returns bytes freed
+        with self._locked(shared=False):
+            return self._gc()
+
+    @contextmanager
+    def _locked(self, shared):
+        # Snapshots share the lock and gc() takes it alone, so it never deletes content a
+        # snapshot in progress (in any process) has stored or reused but not yet recorded
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.root, '.lock'), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _gc(self):
+        referenced = set()
+        for directory in os.listdir(self.snapshots_dir):
+            for name in os.listdir(os.path.join(self.snapshots_dir, directory)):
+                if name.endswith('.json'):
+                    with open(os.path.join(self.snapshots_dir, directory, name)) as f:
+                        referenced.update(entry['hash'] for entry in json.load(f)['files'].values() if 'hash' in entry)
+        freed = 0
+        for prefix in os.listdir(self.objects_dir):
+            prefix_dir = os.path.join(self.objects_dir, prefix)
+            for rest in os.listdir(prefix_dir):
+                if prefix + rest not in referenced:
+                    path = os.path.join(prefix_dir, rest)
+                    freed += os.path.getsize(path)
+                    os.unlink(path)
+        return freed
+
+    def _walk(self, target, dirs):
+        # (relative path, path) of every file and symlink; directories are appended to dirs
+        if not os.path.isdir(target) or os.path.islink(target):
+            yield '', target
+            return
+        for root, subdirs, names in os.walk(target):
+            # A store kept inside the tree it snapshots is not part of it
+            subdirs[:] = [name for name in subdirs if os.path.join(root, name) != self.root]
+            rel_root = os.path.relpath(root, target)
+            if rel_root != '.':
+                dirs.append(rel_root)
+            for name in subdirs:
+                # os.walk does not descend into directory symlinks; record them as links
+                if os.path.islink(os.path.join(root, name)):
+                    yield os.path.normpath(os.path.join(rel_root, name)), os.path.join(root, name)
+            for name in names:
+                yield os.path.normpath(os.path.join(rel_root, name)), os.path.join(root, name)
+
+    def _store(self, path, digest):
+        # Adds the file's content under its digest unless already present; True if added
+        blob = self.blob_path(digest)
+        if os.path.exists(blob):
+            return False
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(blob), prefix='.tmp-')
+        os.close(fd)
+        try:
+            clone_file(path, tmp)
+            os.chmod(tmp, 0o444)
+            os.replace(tmp, blob)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        return True
+
+    def _matches(self, path, entry):
+        try:
+            st = os.lstat(path)
+        except FileNotFoundError:
+            return False
+        if 'link' in entry:
+            return stat.S_ISLNK(st.st_mode) and os.readlink(path) == entry['link']
+        if not stat.S_ISREG(st.st_mode) or st.st_size != entry['size']:
+            return False
+        if st.st_mtime_ns == entry['mtime_ns']:
+            return stat.S_IMODE(st.st_mode) == entry['mode']
+        # Same size, different mtime: only the content decides
+        return file_digest(path) == entry['hash'] and stat.S_IMODE(st.st_mode) == entry['mode']
+
+    def _restore_file(self, path, entry):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            if 'link' in entry:
+                os.symlink(entry['link'], tmp)
+            else:
+                clone_file(self.blob_path(entry['hash']), tmp)
+                os.chmod(tmp, entry['mode'])
+                os.utime(tmp, ns=(entry['mtime_ns'], entry['mtime_ns']))
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.lexists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def _target_dir(self, target):
+        return os.path.join(self.snapshots_dir, hashlib.sha256(target.encode('utf-8')).hexdigest()[:16])
+
+    def _manifest_path(self, target, snapshot_id):
+        return os.path.join(self._target_dir(target), f"{snapshot_id}.json")
+
+    def _write_json(self, path, value):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(value, f, separators=(',', ':'))
+        os.replace(tmp, path)
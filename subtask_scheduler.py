@@ -0,0 +1,144 @@
+import contextvars
+import os
+import re
+import threading
+from contextvars import ContextVar
+
+# Turns planner output into a dependency DAG and runs ready subtasks concurrently.
+
+DEFAULT_MAX_WORKERS = int(os.getenv('MAX_PARALLEL_SUBTASKS', 4))
+
+# "(depends on: 1, 2)" as requested from the planner
+DEPENDS_RE = re.compile(r'\s*\(\s*(?:depends on|requires|after)\s*:?\s*(?:steps?\s*)?([\d,\s]*(?:and\s*\d+)?)\)\s*$', re.IGNORECASE)
+STEP_NUMBER_RE = re.compile(r'^\s*(?:step\s*)?(\d+)\s*[.):]\s+', re.IGNORECASE)
+FILENAME_RE = re.compile(r'\b[\w/-]+\.(?:py|js|jsx|ts|tsx|html|css|json|ya?ml|sql|sh|toml|cfg|ini|md)\b')
+# Steps that naturally come after the pieces they combine, test or ship
+AGGREGATE_RE = re.compile(r'\b(?:tests?|testing|integrat\w*|combine|wire up|end-to-end|deploy\w*|document\w*|readme|package|release)\b', re.IGNORECASE)
+
+def parse_dependencies(subtask):
+    match = DEPENDS_RE.search(subtask)
+    if not match:
+        return subtask, None
+    numbers = {int(n) for n in re.findall(r'\d+', match.group(1))}
+    return subtask[:match.start()].rstrip(), numbers
+
+def build_dag(plan):
+    nodes = []
+    number_to_index = {}
+    explicit = False
+    for index, subtask in enumerate(plan):
+        text, numbers = parse_dependencies(subtask)
+        explicit = explicit or numbers is not None
+        number = STEP_NUMBER_RE.match(text)
+        number_to_index[int(number.group(1)) if number else index + 1] = index
+        nodes.append({'index': index, 'subtask': text, 'numbers': numbers, 'deps': set()})
+    for node in nodes:
+        if node['numbers'] is not None:
+            deps = {number_to_index.get(n) for n in node['numbers']}
+        elif explicit:
+            # The planner annotated its dependencies; an unannotated step is independent
+            deps = set()
+        else:
+            deps = infer_dependencies(node, nodes)
+        # Only edges to earlier steps, so the graph is acyclic by construction
+        node['deps'] = {d for d in deps if d is not None and d < node['index']}
+        del node['numbers']
+    return nodes
+
+def infer_dependencies(node, nodes):
+    earlier = nodes[:node['index']]
+    deps = set()
+    # A step that mentions a file named by an earlier step builds on that step
+    for filename in FILENAME_RE.findall(node['subtask']):
+        for other in earlier:
+            if filename in other['subtask']:
+                deps.add(other['index'])
+                break
+    if AGGREGATE_RE.search(node['subtask']):
+        deps.update(other['index'] for other in earlier if not AGGREGATE_RE.search(other['subtask']))
+    return deps
+
+class _Slots:
+    # How many subtasks may run at once, shared by a plan and every plan nested in it
+    def __init__(self, size):
+        self.free = size
+        self.cond = threading.Condition()
+
+    def acquire(self):
+        with self.cond:
+            while not self.free:
+                self.cond.wait()
+            self.free -= 1
+
+    def release(self):
+        with self.cond:
+            self.free += 1
+            self.cond.notify_all()
+
+_slots = ContextVar('subtask_slots', default=None)
+
+def run_plan(plan, context, agents, execute, depth=0, max_workers=None, path=()):
+    nodes = build_dag(plan)
+    waiting = {node['index']: set(node['deps']) for node in nodes}
+    dependents = {node['index']: [] for node in nodes}
+    for node in nodes:
+        for dep in node['deps']:
+            dependents[dep].append(node['index'])
+    slots = _slots.get()
+    # Called from inside a subtask (a recursive breakdown): that subtask's slot goes to
+    # its children while it waits for them. A top-level call sets up the slots.
+    nested = slots is not None
+    if nested:
+        slots.release()
+    else:
+        slots = _Slots(max_workers or DEFAULT_MAX_WORKERS)
+        token = _slots.set(slots)
+    finished = []
+    running = 0
+
+    def work(index):
+        error = None
+        try:
+            execute(nodes[index]['subtask'], context, agents, depth, path + (index,))
+        except Exception as e:
+            error = e
+        finally:
+            with slots.cond:
+                slots.free += 1
+                finished.append((index, error))
+                slots.cond.notify_all()
+
+    try:
+        while True:
+            with slots.cond:
+                while True:
+                    # Once any branch fails, let in-flight work finish but start nothing new
+                    ready = [] if context.status == "failed" else sorted(i for i, deps in waiting.items() if not deps)
+                    if finished or (ready and slots.free) or not (running or ready):
+                        break
+                    slots.cond.wait()
+                completed = finished[:]
+                del finished[:]
+                starts = [] if completed else ready[:slots.free]
+                slots.free -= len(starts)
+            if not completed and not starts:
+                break
+            for index in starts:
+                del waiting[index]
+                running += 1
+                # Each task runs in a copy of the caller's context, so tracing spans nest under it
+                # path locates the subtask in the (recursive) plan, e.g. (2, 0), for checkpointing
+                threading.Thread(target=contextvars.copy_context().run, args=(work, index),
+                                 name=f"subtask-{'.'.join(map(str, path + (index,)))}").start()
+            for index, error in completed:
+                running -= 1
+                if error is not None:
+                    context.fail({'subtask': nodes[index]['subtask'], 'error': str(error)})
+                for dependent in dependents[index]:
+                    waiting[dependent].discard(index)
+    finally:
+        if nested:
+            slots.acquire()
+        else:
+            _slots.reset(token)
+    return nodes
@@ -0,0 +1,200 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Lightweight tracing and metrics. Spans nest through a ContextVar, so a span opened
+# inside another (including in worker threads started with contextvars.copy_context())
+# becomes its child. Every finished span feeds the latency histogram; counters cover
+# tokens, cache hits and retries. render_prometheus() returns the text exposition format.
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_current = ContextVar('telemetry_span', default=None)
+
+class Span:
+    def __init__(self, name, parent=None, **attrs):
+        self.name = name
+        self.attrs = attrs
+        self.children = []
+        self.start = time.time()
+        self.duration = None
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        if parent is not None:
+            with parent._lock:
+                parent.children.append(self)
+
+    def set(self, **attrs):
+        with self._lock:
+            self.attrs.update(attrs)
+
+    def add(self, key, n=1):
+        with self._lock:
+            self.attrs[key] = self.attrs.get(key, 0) + n
+
+    def finish(self):
+        if self.duration is None:
+            self.duration = time.perf_counter() - self._t0
+            SPAN_SECONDS.observe(self.duration, span=self.name, role=self.attrs.get('role') or '')
+
+    def to_dict(self, origin=None):
+        origin = self.start if origin is None else origin
+        with self._lock:
+            children = list(self.children)
+            attrs = dict(self.attrs)
+        return {
+            'name': self.name,
+            'attrs': attrs,
+            'start_ms': round((self.start - origin) * 1000, 3),
+            'duration_ms': round(self.duration * 1000, 3) if self.duration is not None else None,
+            'children': [child.to_dict(origin) for child in children]
+        }
+
+def current_span():
+    return _current.get()
+
+def start_span(name, **attrs):
+    # A child of the current span that is not made current; the caller must finish() it
+    return Span(name, _current.get(), **attrs)
+
+@contextmanager
+def activate(span):
+    token = _current.set(span)
+    try:
+        yield span
+    finally:
+        _current.reset(token)
+
+@contextmanager
+def span(name, **attrs):
+    s = start_span(name, **attrs)
+    try:
+        with activate(s):
+            yield s
+    except BaseException as e:
+        s.set(error=type(e).__name__)
+        raise
+    finally:
+        s.finish()
+
+def traced_iter(iterable, parent):
+    # Advances iterable with parent as the current span, without keeping it current
+    # across the caller's yields (generators may be resumed from another thread or context).
+    iterator = iter(iterable)
+    while True:
+        with activate(parent):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+def count(name, n=1, **labels):
+    registry.counter(name).inc(n, **labels)
+
+def observe(name, value, **labels):
+    registry.histogram(name).observe(value, **labels)
+
+class Counter:
+    def __init__(self, name, help_text=''):
+        self.name = name
+        self.help = help_text
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, n=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + n
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_labels(key)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name, help_text='', buckets=BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][i] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self.series.items()):
+                for bound, n in zip(self.buckets, series['counts']):
+                    lines.append(f"{self.name}_bucket{_labels(key + (('le', repr(bound)),))} {n}")
+                lines.append(f"{self.name}_bucket{_labels(key + (('le', '+Inf'),))} {series['count']}")
+                lines.append(f"{self.name}_sum{_labels(key)} {series['sum']}")
+                lines.append(f"{self.name}_count{_labels(key)} {series['count']}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name, help_text=''):
+        return self._get(name, Counter, help_text)
+
+    def histogram(self, name, help_text=''):
+        return self._get(name, Histogram, help_text)
+
+    def _get(self, name, kind, help_text):
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = kind(name, help_text)
+            return metric
+
+    def render(self):
+        with self._lock:
+            metrics = [self.metrics[name] for name in sorted(self.metrics)]
+        return '\n'.join(line for metric in metrics for line in metric.render()) + '\n'
+
+def _labels(key):
+    if not key:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in key) + '}'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+registry = Registry()
+SPAN_SECONDS = registry.histogram('agentic_span_seconds', "Span latency by span name and agent role")
+registry.counter('agentic_gemini_calls_total', "Gemini calls by agent role, including cache hits")
+registry.counter('agentic_gemini_cache_hits_total', "Gemini calls answered from the response cache")
+registry.counter('agentic_gemini_retries_total', "Gemini requests retried after 429/503")
+registry.counter('agentic_gemini_tokens_total', "Tokens reported in usageMetadata, by role and kind (prompt/response/cached)")
+registry.counter('agentic_gemini_escalations_total', "Routed calls whose answer was rejected and retried on a stronger model")
+registry.counter('agentic_gemini_hedges_total', "Hedged Gemini requests, by which copy answered first (primary/hedge)")
+registry.counter('agentic_gemini_coalesced_total', "Gemini calls that shared an identical in-flight request instead of sending their own")
+registry.histogram('agentic_gemini_rate_wait_seconds', "Time Gemini requests waited in the client-side rate limiter, by role")
+registry.counter('agentic_debug_tokens_saved_total', "Estimated tokens saved by diff-based debugging versus full rewrites")
+
+def render_prometheus():
+    return registry.render()
+
+def summary():
+    # {(span name, role): {'count', 'seconds'}} from the latency histogram
+    with SPAN_SECONDS._lock:
+        series = dict(SPAN_SECONDS.series)
+    return {(dict(key)['span'], dict(key)['role']): {'count': s['count'], 'seconds': s['sum']} for key, s in series.items()}
@@ -0,0 +1,59 @@
+import json
+import threading
+import pytest
+from fastapi.testclient import TestClient
+from backend import main
+from backend.jobs import JobQueue, JobStore
+
+def fake_orchestration(user_request, job_id=None, budget=None):
+    yield {'type': 'log', 'message': "Calling Gemini LLM..."}
+    yield {'type': 'plan_step', 'index': 0, 'step': "Write app.py"}
+    yield {'type': 'result', 'result': {'plan': ["Write app.py"], 'trace': {'name': 'orchestration'}}}
+
+def parse(body):
+    events = []
+    for block in body.strip().split('\n\n'):
+        kind, data = block.split('\n')
+        events.append((kind[len('event: '):], json.loads(data[len('data: '):])))
+    return events
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    store = JobStore(str(tmp_path / 'jobs.db'))
+    queue = JobQueue(store, main.run_job, max_workers=1, max_queue=0)
+    monkeypatch.setattr(main, 'job_store', store)
+    monkeypatch.setattr(main, 'job_queue', queue)
+    monkeypatch.setattr(main, 'iter_orchestration', fake_orchestration)
+    yield TestClient(main.app)
+    queue.shutdown()
+
+def test_stream_runs_as_a_queued_job(app):
+    response = app.get('/project/stream', params={'user_request': "build it"})
+    assert response.status_code == 200
+    events = parse(response.text)
+    assert [kind for kind, _ in events] == ['log', 'plan_step', 'result']
+    assert 'trace' not in events[-1][1]['result']
+    jobs = main.job_store.unfinished()
+    assert jobs == []
+
+def test_stream_reports_a_failed_job(app, monkeypatch):
+    def failing(user_request, job_id=None, budget=None):
+        yield {'type': 'log', 'message': "Calling Gemini LLM..."}
+        raise RuntimeError("Gemini is down")
+    monkeypatch.setattr(main, 'iter_orchestration', failing)
+    events = parse(app.get('/project/stream', params={'user_request': "x"}).text)
+    assert events == [('log', {'type': 'log', 'message': "Calling Gemini LLM..."}),
+                      ('error', {'type': 'error', 'message': "Gemini is down"})]
+
+def test_stream_is_refused_when_the_queue_is_full(app, monkeypatch):
+    release = threading.Event()
+
+    def blocked(user_request, job_id=None, budget=None):
+        release.wait(5)
+        yield {'type': 'result', 'result': {}}
+    monkeypatch.setattr(main, 'iter_orchestration', blocked)
+    assert app.post('/jobs', json={'user_request': "first"}).status_code == 202
+    response = app.get('/project/stream', params={'user_request': "second"})
+    release.set()
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '10'
@@ -0,0 +1,29 @@
+import pytest
+from artifact_store import ArtifactStore
+from backend import orchestrator
+
+@pytest.fixture
+def artifacts(tmp_path, monkeypatch):
+    store = ArtifactStore(str(tmp_path / 'artifacts'))
+    monkeypatch.setattr(orchestrator, 'artifacts', store)
+    return store
+
+@pytest.mark.parametrize('filename, expected', [
+    ("app.py", "app.py"),
+    ("src/app.py ", "src/app.py"),
+    ("../../etc/app.py", "app.py"),
+    ("foo/", "foo"),
+    ("..", "untitled_3.py"),
+    ("/", "untitled_3.py"),
+    (".", "untitled_3.py"),
+    (None, "untitled_3.py"),
+])
+def test_write_file_names(artifacts, filename, expected):
+    entry = orchestrator._write_file("job1", {'language': 'python', 'code': "print(1)", 'filename': filename}, 3)
+    assert entry['filename'] == expected
+    with open(artifacts.workspace_path("job1", expected)) as f:
+        assert f.read() == "print(1)"
+
+def test_unknown_language_falls_back_to_txt(artifacts):
+    entry = orchestrator._write_file("job1", {'language': 'text', 'code': "notes", 'filename': None}, 1)
+    assert entry['filename'] == "untitled_1.txt"
@@ -0,0 +1,71 @@
+import asyncio
+import pytest
+from gemini_api import GeminiAPI, GeminiAPIError
+from model_router import ModelRouter
+from response_cache import ResponseCache
+
+REPLIES = {'cheap': 'no code here', 'strong': '```python\nprint(1)\n```'}
+
+def make_api(sent):
+    api = GeminiAPI(api_key='test', cache=ResponseCache(),
+                    router=ModelRouter(routes={'coder': ['cheap', 'strong']}))
+
+    def request_text(prompt, role=None, response_schema=None, cached_prefix=None, model=None):
+        sent.append(model)
+        return REPLIES[model]
+
+    async def arequest_text(*args, **kwargs):
+        return request_text(*args, **kwargs)
+
+    api._request_text = request_text
+    api._arequest_text = arequest_text
+    return api
+
+def test_repeat_of_an_escalated_call_is_answered_from_the_cache():
+    sent = []
+    api = make_api(sent)
+    assert api.call('write it', role='coder') == REPLIES['strong']
+    assert sent == ['cheap', 'strong']
+    assert api.call('write it', role='coder') == REPLIES['strong']
+    assert sent == ['cheap', 'strong']
+    api.close()
+
+def test_async_repeat_of_an_escalated_call_is_answered_from_the_cache():
+    sent = []
+    api = make_api(sent)
+
+    async def main():
+        first = await api.acall('write it', role='coder')
+        second = await api.acall('write it', role='coder')
+        return first, second
+
+    assert asyncio.run(main()) == (REPLIES['strong'], REPLIES['strong'])
+    assert sent == ['cheap', 'strong']
+    api.close()
+
+class FakeStreamResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, lines):
+        self.lines = lines
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def iter_lines(self, decode_unicode=False):
+        return iter(self.lines)
+
+def test_malformed_stream_event_raises_gemini_api_error(monkeypatch):
+    api = GeminiAPI(api_key='test')
+    lines = ['data: {"candidates": [{"content": {"parts": [{"text": "partial"}]}}]}', 'data: {"candidates": [']
+    monkeypatch.setattr(api.session, 'post', lambda *args, **kwargs: FakeStreamResponse(lines))
+    chunks = []
+    with pytest.raises(GeminiAPIError):
+        for chunk in api.stream('hello', use_cache=False):
+            chunks.append(chunk)
+    assert chunks == ['partial']
+    api.close()
@@ -0,0 +1,184 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+import pytest
+import deadline
+from backend.jobs import JobCancelled, JobQueue, JobStore, QueueFull
+
+def wait_for(predicate, timeout=5):
+    end = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < end, "timed out"
+        time.sleep(0.01)
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / 'jobs.db'))
+
+def test_submit_runs_the_job_and_stores_the_result(store):
+    queue = JobQueue(store, lambda job_id, request, should_cancel: {'echo': request})
+    job = queue.submit("hello")
+    assert job['status'] == 'queued'
+    future = queue.future(job['job_id'])
+    if future is not None:
+        assert future.result(5) == {'echo': "hello"}
+    wait_for(lambda: store.get(job['job_id'])['status'] == 'succeeded')
+    assert store.get(job['job_id'])['result'] == {'echo': "hello"}
+    wait_for(lambda: queue.depth() == 0)
+    queue.shutdown()
+
+def test_failed_job_records_the_error(store):
+    def run(job_id, request, should_cancel):
+        raise RuntimeError("boom")
+    queue = JobQueue(store, run)
+    job = queue.submit("x")
+    wait_for(lambda: store.get(job['job_id'])['status'] == 'failed')
+    assert store.get(job['job_id'])['error'] == "boom"
+    queue.shutdown()
+
+def test_queue_full(store):
+    release = threading.Event()
+    queue = JobQueue(store, lambda *args: release.wait(5), max_workers=1, max_queue=1)
+    queue.submit("a")
+    queue.submit("b")
+    with pytest.raises(QueueFull):
+        queue.submit("c")
+    release.set()
+    queue.shutdown()
+
+def test_cancel_queued_and_running_jobs(store):
+    started = threading.Event()
+
+    def run(job_id, request, should_cancel):
+        started.set()
+        while not should_cancel():
+            time.sleep(0.01)
+        raise JobCancelled()
+
+    queue = JobQueue(store, run, max_workers=1)
+    running = queue.submit("running")
+    queued = queue.submit("queued")
+    assert started.wait(5)
+    assert queue.cancel(queued['job_id'])['status'] == 'cancelled'
+    queue.cancel(running['job_id'])
+    wait_for(lambda: store.get(running['job_id'])['status'] == 'cancelled')
+    queue.shutdown()
+
+def test_cancel_after_dequeue_is_recorded(store):
+    # The job left the queue (future.cancel() fails) but was cancelled before it started
+    queue = JobQueue(store, lambda *args: "never")
+    job = store.create("x")
+    event = threading.Event()
+    event.set()
+    with pytest.raises(JobCancelled):
+        queue._run(job['job_id'], "x", None, event)
+    assert store.get(job['job_id'])['status'] == 'cancelled'
+    queue.shutdown()
+
+class InlineExecutor:
+    # Runs each job inside submit(), so its future is already done when it is returned
+    def submit(self, func, *args):
+        future = Future()
+        try:
+            future.set_result(func(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, **kwargs):
+        pass
+
+def test_job_that_finishes_at_once_does_not_deadlock(store):
+    queue = JobQueue(store, lambda *args: "done")
+    queue._pool = InlineExecutor()
+    done = threading.Event()
+
+    def submit():
+        queue.submit("x")
+        done.set()
+
+    threading.Thread(target=submit, daemon=True).start()
+    assert done.wait(5), "submit() deadlocked"
+    assert queue.depth() == 0
+
+def test_recover_requeues_unfinished_jobs_with_their_budget(store):
+    budgets = {}
+
+    def run(job_id, request, should_cancel):
+        budgets[request] = deadline.remaining()
+        return request
+
+    done = store.create("finished")
+    store.update(done['job_id'], 'succeeded', result="finished")
+    interrupted = store.create("interrupted", deadline_at=time.time() + 60)
+    store.update(interrupted['job_id'], 'running')
+    unbounded = store.create("unbounded")
+
+    queue = JobQueue(store, run)
+    queue.recover()
+    wait_for(lambda: all(store.get(job['job_id'])['status'] == 'succeeded' for job in (interrupted, unbounded)))
+    assert set(budgets) == {"interrupted", "unbounded"}
+    assert 50 < budgets["interrupted"] <= 60
+    assert budgets["unbounded"] is None
+    queue.shutdown()
+
+def test_submit_persists_the_callers_budget(store):
+    queue = JobQueue(store, lambda *args: None)
+    with deadline.budget(30):
+        job = queue.submit("x")
+    assert 25 < job['deadline_at'] - time.time() <= 30
+    queue.shutdown()
+
+def test_old_database_gains_the_deadline_column(tmp_path):
+    import sqlite3
+    path = str(tmp_path / 'old.db')
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE jobs (id TEXT PRIMARY KEY, user_request TEXT NOT NULL, status TEXT NOT NULL, "
+               "result TEXT, error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)")
+    db.execute("INSERT INTO jobs VALUES ('a', 'req', 'queued', NULL, NULL, 0, 0)")
+    db.commit()
+    db.close()
+    store = JobStore(path)
+    assert store.get('a')['deadline_at'] is None
+    assert store.unfinished()[0]['user_request'] == 'req'
+
+def test_feed_relays_published_events_until_the_job_ends(store):
+    release = threading.Event()
+
+    def run(job_id, request, should_cancel):
+        queue.publish(job_id, {'type': 'log', 'message': "one"})
+        release.wait(5)
+        queue.publish(job_id, {'type': 'log', 'message': "two"})
+        return "done"
+
+    queue = JobQueue(store, run)
+    job = queue.submit("x")
+    feed = queue.feed(job['job_id'])
+
+    async def follow():
+        seen = []
+        async for event in feed.follow():
+            seen.append(event['message'])
+            release.set()
+        return seen
+
+    assert asyncio.run(follow()) == ["one", "two"]
+    assert store.get(job['job_id'])['status'] == 'succeeded'
+    assert queue.feed(job['job_id']) is None
+    queue.shutdown()
+
+def test_cancelling_a_queued_job_closes_its_feed(store):
+    release = threading.Event()
+    queue = JobQueue(store, lambda *args: release.wait(5), max_workers=1)
+    queue.submit("running")
+    queued = queue.submit("queued")
+    feed = queue.feed(queued['job_id'])
+    queue.cancel(queued['job_id'])
+
+    async def follow():
+        return [event async for event in feed.follow()]
+
+    assert asyncio.run(follow()) == []
+    release.set()
+    queue.shutdown()
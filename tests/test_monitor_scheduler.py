@@ -0,0 +1,62 @@
+import asyncio
+from agents.monitoring import subtask_monitors
+from agents import results
+from monitor_scheduler import Monitor, MonitorScheduler
+
+class Context:
+    def __init__(self, results):
+        self.plan = [result['subtask'] for result in results]
+        self.subtask_results = results
+
+class Runner:
+    def __init__(self):
+        self.runs = 0
+
+    def run(self, files, entry):
+        self.runs += 1
+        return {'status': 'success'}
+
+def test_timed_out_check_is_reported_as_a_failure():
+    scheduler = MonitorScheduler(jitter=0, coalesce_window=0)
+    improved = []
+
+    async def check():
+        await asyncio.sleep(5)
+        return True
+
+    monitor = scheduler.add(Monitor('slow', check, improved.append, timeout=0.05))
+    asyncio.run(scheduler.run(until=lambda: improved, poll_interval=0.01))
+    assert monitor.healthy is False
+    assert scheduler.stats['timeouts'] == 1
+    assert scheduler.stats['failures'] == 1
+    assert improved == [['slow']]
+
+def test_unchanged_subtask_is_skipped_after_a_healthy_pass():
+    result = {'subtask': '1. Write a.py', 'code': 'a = 1', 'test_results': results.TestResult(passed=True, test_code='assert True')}
+    runner = Runner()
+    [monitor] = subtask_monitors(Context([result]), runner, interval=0.02)
+    scheduler = MonitorScheduler(jitter=0)
+    scheduler.add(monitor)
+    asyncio.run(scheduler.run(until=lambda: scheduler.stats['skipped'] >= 3, poll_interval=0.01))
+    assert runner.runs == 1
+    assert scheduler.stats['checks'] == 1
+
+    result['code'] = 'a = 2'
+    asyncio.run(scheduler.run(until=lambda: runner.runs == 2, poll_interval=0.01))
+    assert scheduler.stats['checks'] == 2
+
+def test_burst_of_failures_makes_one_improvement_call():
+    scheduler = MonitorScheduler(jitter=0, coalesce_window=0.2)
+    calls = []
+
+    async def improve(names):
+        calls.append(sorted(names))
+
+    names = [f"project-{i}" for i in range(5)]
+    for name in names:
+        scheduler.add(Monitor(name, lambda: False, improve))
+    asyncio.run(scheduler.run(until=lambda: calls, poll_interval=0.01))
+    assert calls == [names]
+    assert scheduler.stats['failures'] == 5
+    assert scheduler.stats['improvements'] == 1
+    assert scheduler.stats['coalesced'] == 4
@@ -0,0 +1,31 @@
+import os
+import orchestrator
+from events import EventLog
+from agents import results
+from memory_store import MemoryStore
+
+def test_context_uses_an_injected_empty_memory_store(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    memory = MemoryStore(str(tmp_path / 'memory.db'), legacy_json=None)
+    assert len(memory) == 0
+    context = orchestrator.Context("request", memory=memory, events=EventLog(console_level='off'))
+    assert context.memory is memory
+    assert not os.path.exists(orchestrator.MEMORY_DB)
+
+def test_results_review_shows_each_result_before_prompting(tmp_path, monkeypatch, capsys):
+    memory = MemoryStore(str(tmp_path / 'memory.db'), legacy_json=None)
+    context = orchestrator.Context("request", memory=memory, events=EventLog(console_level='off'))
+    context.record_result({'subtask': 'add parser', 'code': 'def parse(): pass',
+                           'test_results': results.TestResult(passed=True, details='1 passed'),
+                           'review': results.Review(overall_rating='good'), 'docs': 'Parses input.'})
+    prompted = []
+
+    def fake_input(prompt):
+        prompted.append(capsys.readouterr().out)
+        return 'approve'
+
+    monkeypatch.setattr('builtins.input', fake_input)
+    assert orchestrator.interactive_results_review(context)
+    shown = prompted[0]
+    for text in ('add parser', 'def parse(): pass', '1 passed', 'good', 'Parses input.'):
+        assert text in shown
@@ -0,0 +1,50 @@
+import pytest
+from patching import PatchError, apply_unified_diff, code_window, extract_diff, failing_lines, parse_hunks
+
+CODE = "def add(a, b):\n    return a - b\n\n\ndef mul(a, b):\n    return a * b\n"
+
+def test_applies_exact_hunk():
+    diff = "@@ -1,2 +1,2 @@\n def add(a, b):\n-    return a - b\n+    return a + b\n"
+    assert apply_unified_diff(CODE, diff) == CODE.replace("a - b", "a + b")
+
+def test_tolerates_line_drift():
+    # The hunk claims line 40; its context is found near there instead
+    diff = "@@ -40,2 +40,2 @@\n def mul(a, b):\n-    return a * b\n+    return a * b * 1\n"
+    assert apply_unified_diff(CODE, diff).endswith("    return a * b * 1\n")
+
+def test_tolerates_whitespace_differences():
+    diff = "@@ -1,2 +1,2 @@\n def add(a, b):  \n-  return a - b\n+    return a + b\n"
+    assert "    return a + b" in apply_unified_diff(CODE, diff)
+
+def test_picks_the_match_nearest_the_hunk_header():
+    code = "x = 1\nprint(x)\n" * 3
+    diff = "@@ -5,1 +5,1 @@\n-x = 1\n+x = 2\n"
+    assert apply_unified_diff(code, diff) == "x = 1\nprint(x)\nx = 1\nprint(x)\nx = 2\nprint(x)\n"
+
+def test_later_hunks_follow_earlier_offsets():
+    diff = ("@@ -1,1 +1,3 @@\n-def add(a, b):\n+import math\n+\n+def add(a, b):\n"
+            "@@ -5,2 +7,2 @@\n def mul(a, b):\n-    return a * b\n+    return math.prod((a, b))\n")
+    patched = apply_unified_diff(CODE, diff)
+    assert patched.startswith("import math\n\ndef add")
+    assert patched.endswith("    return math.prod((a, b))\n")
+
+def test_strips_copied_gutter_and_empty_context():
+    diff = "```diff\n@@ -2,3 +2,3 @@\n-  2|     return a - b\n+  2|     return a + b\n\n \n```"
+    assert apply_unified_diff(CODE, extract_diff(diff)) == CODE.replace("a - b", "a + b")
+
+def test_unmatched_hunk_raises():
+    with pytest.raises(PatchError):
+        apply_unified_diff(CODE, "@@ -1,1 +1,1 @@\n-def sub(a, b):\n+def sub(a, c):\n")
+
+def test_malformed_or_missing_hunks_raise():
+    with pytest.raises(PatchError):
+        parse_hunks("just some prose")
+    with pytest.raises(PatchError):
+        parse_hunks("@@ -1 +1 @@\n?? what\n")
+
+def test_failing_lines_and_window():
+    details = 'File "/tmp/run/solution.py", line 70, in add\nsolution.py:72: AssertionError'
+    assert failing_lines(details) == [70, 72]
+    code = "\n".join(f"line{i}" for i in range(1, 201))
+    window = code_window(code, [70], context=2)
+    assert window.splitlines() == ['...', ' 68| line68', ' 69| line69', ' 70| line70', ' 71| line71', ' 72| line72', '...']
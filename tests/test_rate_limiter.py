@@ -0,0 +1,50 @@
+import threading
+import time
+import pytest
+import deadline
+from gemini_api import GeminiAPI
+from rate_limiter import PRIORITY_HIGH, PRIORITY_LOW, RateLimiter
+
+def test_acquire_waits_for_the_bucket_to_refill():
+    limiter = RateLimiter(requests_per_minute=600)
+    limiter.requests.tokens = 0
+    waited = limiter.acquire()
+    assert 0.05 < waited < 0.5
+
+def test_acquire_fails_fast_when_the_wait_outlasts_the_timeout():
+    limiter = RateLimiter(requests_per_minute=1)
+    limiter.acquire()
+    started = time.monotonic()
+    with pytest.raises(deadline.DeadlineExceeded):
+        limiter.acquire(timeout=5)
+    # A minute's wait is known up front, so it does not sit out the 5 seconds first
+    assert time.monotonic() - started < 1
+    assert limiter.stats()['timed_out'] == 1
+    assert limiter.stats()['waiting'] == 0
+
+def test_queued_caller_times_out_behind_others():
+    limiter = RateLimiter(requests_per_minute=60)
+    limiter.requests.tokens = 0
+    first = threading.Thread(target=limiter.acquire, args=(PRIORITY_HIGH,))
+    first.start()
+    time.sleep(0.05)
+    with pytest.raises(deadline.DeadlineExceeded):
+        limiter.acquire(PRIORITY_LOW, timeout=0.2)
+    first.join()
+
+def test_gemini_reserve_is_bounded_by_the_deadline():
+    gemini = GeminiAPI(api_key='test', rate_limiter=RateLimiter(requests_per_minute=1))
+    gemini._reserve("prompt", 'coder')
+    with deadline.budget(2):
+        with pytest.raises(deadline.DeadlineExceeded):
+            gemini._reserve("prompt", 'coder')
+
+def test_hedge_latencies_are_kept_per_role():
+    class Response:
+        status_code = 200
+
+    gemini = GeminiAPI(api_key='test', hedge_percentile=50)
+    for _ in range(20):
+        gemini._observe('url', 'documenter', Response(), time.monotonic() - 2.0)
+    assert gemini._hedge_delay('url', 'documenter') >= 2.0
+    assert gemini._hedge_delay('url', 'planner') is None
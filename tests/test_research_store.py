@@ -0,0 +1,60 @@
+from agents.researcher import ResearchAgent
+from research_store import ResearchStore
+
+class FakeGemini:
+    def __init__(self, reply):
+        self.reply = reply
+        self.prompts = []
+
+    def call(self, prompt, modality='text', role=None):
+        self.prompts.append(prompt)
+        return self.reply
+
+def make_agent(store, reply, searches):
+    return ResearchAgent('Researcher', lambda query: searches.append(query) or "results", FakeGemini(reply), store)
+
+def test_near_duplicate_query_reuses_the_earlier_summary(tmp_path):
+    store = ResearchStore(str(tmp_path / 'research.db'))
+    searches = []
+    make_agent(store, "Use the json module.", searches).run("How to parse JSON config files in Python")
+    agent = make_agent(store, "unused", searches)
+    assert agent.run("parse JSON config files in Python 3") == "Use the json module."
+    assert searches == ["How to parse JSON config files in Python"]
+    assert agent.gemini.prompts == []
+    assert agent.stats['reused'] == 1
+    store.close()
+
+def test_stale_match_is_refreshed_and_replaced(tmp_path):
+    store = ResearchStore(str(tmp_path / 'research.db'), max_age=0)
+    searches = []
+    store.add("How to parse JSON config files in Python", "Use the json module.")
+    agent = make_agent(store, "Use tomllib for TOML, json for JSON.", searches)
+    assert agent.run("parse JSON config files in Python 3") == "Use tomllib for TOML, json for JSON."
+    assert searches == ["parse JSON config files in Python 3"]
+    [prompt] = agent.gemini.prompts
+    assert "Earlier research (for: How to parse JSON config files in Python)" in prompt
+    assert "Use the json module." in prompt
+    assert agent.stats['refreshed'] == 1
+    assert len(store) == 1
+    match = store.lookup("parse JSON config files in Python 3")
+    assert (match.query, match.summary) == ("parse JSON config files in Python 3", "Use tomllib for TOML, json for JSON.")
+    store.close()
+
+def test_document_frequencies_stay_correct_after_a_replace(tmp_path):
+    store = ResearchStore(str(tmp_path / 'research.db'))
+    old_id = store.add("parse json config", "json module")
+    store.add("read yaml config", "pyyaml safe_load")
+    store.add("parse json config", "orjson loads", replaces=old_id)
+
+    def df(term):
+        row = store._db.execute("SELECT df FROM terms WHERE term = ?", (term,)).fetchone()
+        return row[0] if row else None
+
+    assert df('config') == 2
+    assert df('json') == 1
+    assert df('parse') == 1
+    assert df('orjson') == 1
+    assert df('module') is None
+    postings = dict(store._db.execute("SELECT term, COUNT(*) FROM postings GROUP BY term").fetchall())
+    assert dict(store._db.execute("SELECT term, df FROM terms").fetchall()) == postings
+    store.close()
@@ -0,0 +1,39 @@
+import time
+import response_cache
+from response_cache import ResponseCache
+
+def disk_total(cache):
+    return cache._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+def test_disk_tier_stays_under_budget(tmp_path):
+    cache = ResponseCache(max_memory_bytes=0, db_path=str(tmp_path / 'cache.db'), max_disk_bytes=10_000)
+    for i in range(100):
+        cache.set(f"key{i}", 'x' * 500)
+    assert disk_total(cache) <= 10_000
+    assert cache.stats()['disk_bytes'] == disk_total(cache)
+    # The most recent entries survive, the oldest went first
+    assert cache.get('key99') == 'x' * 500
+    assert cache.get('key0') is None
+    assert cache.stats()['evictions'] > 0
+
+def test_running_total_follows_replacements(tmp_path):
+    cache = ResponseCache(db_path=str(tmp_path / 'cache.db'))
+    cache.set('a', 'x' * 100)
+    cache.set('a', 'x' * 40)
+    cache.set('b', 'y' * 10)
+    assert cache.stats()['disk_bytes'] == disk_total(cache) == 50
+
+def test_expired_rows_are_dropped_lazily(tmp_path, monkeypatch):
+    monkeypatch.setattr(response_cache, 'DISK_RESYNC_WRITES', 3)
+    cache = ResponseCache(max_memory_bytes=0, ttl=0.05, db_path=str(tmp_path / 'cache.db'))
+    cache.set('old', 'x' * 100)
+    time.sleep(0.1)
+    assert cache.get('old') is None
+    assert disk_total(cache) == cache.stats()['disk_bytes'] == 0
+    cache.set('stale', 'x' * 100)
+    time.sleep(0.1)
+    cache.set('new1', 'y')
+    cache.set('new2', 'z')
+    # The third write resyncs, which deletes the expired row in bulk
+    assert cache._db.execute("SELECT key FROM responses ORDER BY key").fetchall() == [('new1',), ('new2',)]
+    assert cache.stats()['disk_bytes'] == 2
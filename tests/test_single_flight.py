@@ -0,0 +1,141 @@
+import asyncio
+import threading
+import time
+import pytest
+import deadline
+from single_flight import AsyncSingleFlight, SingleFlight, saved_calls, record_saved
+
+def run_followers(flight, key, func, n):
+    # n callers join while the leader's func() is blocked; returns their outcomes
+    outcomes = []
+    lock = threading.Lock()
+
+    def call():
+        try:
+            result = flight.do(key, func)
+        except Exception as e:
+            result = e
+        with lock:
+            outcomes.append(result)
+
+    threads = [threading.Thread(target=call) for _ in range(n)]
+    for thread in threads:
+        thread.start()
+    return threads, outcomes
+
+def wait_for_followers(calls):
+    # The leader has started; give the others time to join its flight
+    while not calls:
+        time.sleep(0.01)
+    time.sleep(0.1)
+
+def test_concurrent_calls_share_one_result():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def func():
+        calls.append(1)
+        release.wait(5)
+        return "answer"
+
+    threads, outcomes = run_followers(flight, 'k', func, 5)
+    wait_for_followers(calls)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(calls) == 1
+    assert sorted(outcomes) == [("answer", False)] + [("answer", True)] * 4
+
+def test_errors_are_shared():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def func():
+        calls.append(1)
+        release.wait(5)
+        raise ValueError("bad request")
+
+    threads, outcomes = run_followers(flight, 'k', func, 4)
+    wait_for_followers(calls)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(calls) == 1
+    assert all(isinstance(e, ValueError) and str(e) == "bad request" for e in outcomes)
+
+def test_leaders_deadline_is_not_shared():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(5)
+            raise deadline.DeadlineExceeded("leader ran out of time")
+        time.sleep(0.1)
+        return "retried"
+
+    threads, outcomes = run_followers(flight, 'k', func, 3)
+    wait_for_followers(calls)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    errors = [o for o in outcomes if isinstance(o, Exception)]
+    assert len(errors) == 1 and isinstance(errors[0], deadline.DeadlineExceeded)
+    # One waiting caller ran the call again and the last one shared its answer
+    assert sorted(o for o in outcomes if not isinstance(o, Exception)) == [("retried", False), ("retried", True)]
+
+def test_streams_replay_to_late_joiners():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def func():
+        yield "a"
+        release.wait(5)
+        yield "b"
+
+    first, shared_first = flight.stream('k', func)
+    assert next(first) == "a"
+    second, shared_second = flight.stream('k', func)
+    release.set()
+    assert (shared_first, shared_second) == (False, True)
+    assert list(first) == ["b"]
+    assert list(second) == ["a", "b"]
+
+def test_async_errors_are_shared_and_deadlines_retried():
+    async def main():
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def failing():
+            calls.append('fail')
+            await asyncio.sleep(0.05)
+            raise ValueError("bad request")
+
+        results = await asyncio.gather(*(flight.do('k', failing) for _ in range(3)), return_exceptions=True)
+        assert calls == ['fail']
+        assert all(isinstance(r, ValueError) for r in results)
+
+        async def leader_times_out():
+            calls.append('deadline')
+            if calls.count('deadline') == 1:
+                await asyncio.sleep(0.05)
+                raise deadline.DeadlineExceeded("leader ran out of time")
+            await asyncio.sleep(0.05)
+            return "retried"
+
+        results = await asyncio.gather(*(flight.do('d', leader_times_out) for _ in range(3)), return_exceptions=True)
+        assert isinstance(results[0], deadline.DeadlineExceeded)
+        assert sorted(results[1:]) == [("retried", False), ("retried", True)]
+
+    asyncio.run(main())
+
+def test_saved_calls_are_counted_per_block():
+    with saved_calls() as counts:
+        record_saved('coalesced')
+        record_saved('fused', 2)
+    record_saved('coalesced')
+    assert counts == {'coalesced': 1, 'fused': 2}
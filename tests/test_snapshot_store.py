@@ -0,0 +1,57 @@
+import os
+from agents.deployment import DeploymentAgent
+from snapshot_store import SnapshotStore
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(text)
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+def objects(store):
+    return sorted(prefix + rest for prefix in os.listdir(store.objects_dir)
+                  for rest in os.listdir(os.path.join(store.objects_dir, prefix)))
+
+def test_snapshot_and_restore(tmp_path):
+    target = str(tmp_path / 'app')
+    write(os.path.join(target, 'main.py'), "v1")
+    write(os.path.join(target, 'lib', 'util.py'), "util")
+    store = SnapshotStore(str(tmp_path / 'store'))
+    first = store.snapshot(target)
+    write(os.path.join(target, 'main.py'), "v2")
+    write(os.path.join(target, 'new.py'), "new")
+    store.snapshot(target)
+    stats = store.restore(target, first)
+    assert read(os.path.join(target, 'main.py')) == "v1"
+    assert read(os.path.join(target, 'lib', 'util.py')) == "util"
+    assert not os.path.exists(os.path.join(target, 'new.py'))
+    assert stats['restored'] == 1 and stats['unchanged'] == 1 and stats['removed'] == 1
+
+def test_pruning_collects_unreferenced_content(tmp_path):
+    target = str(tmp_path / 'app')
+    store = SnapshotStore(str(tmp_path / 'store'), keep=2)
+    for version in range(5):
+        write(os.path.join(target, 'main.py'), f"v{version}")
+        write(os.path.join(target, 'static.txt'), "unchanged")
+        store.snapshot(target)
+    assert len(store.list(target)) == 2
+    # static.txt plus the two main.py versions still referenced
+    assert len(objects(store)) == 3
+    store.restore(target, store.list(target)[0])
+    assert read(os.path.join(target, 'main.py')) == "v3"
+
+def test_deployment_backups_do_not_grow_without_bound(tmp_path):
+    target = str(tmp_path / 'app')
+    backups = str(tmp_path / 'backups')
+    agent = DeploymentAgent("deployer", keep_snapshots=3)
+    for version in range(10):
+        write(os.path.join(target, 'main.py'), f"v{version}")
+        assert agent.backup(target, backups)
+    store = SnapshotStore(backups)
+    assert len(store.list(target)) == 3
+    assert len(objects(store)) == 3
+    assert agent.rollback(backups, target, store.list(target)[0])
+    assert read(os.path.join(target, 'main.py')) == "v7"
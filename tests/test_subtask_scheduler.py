@@ -0,0 +1,80 @@
+import threading
+import time
+from subtask_scheduler import build_dag, run_plan
+
+class Context:
+    def __init__(self):
+        self.status = "running"
+        self.failures = []
+
+    def fail(self, log_entry, message=None):
+        self.status = "failed"
+        self.failures.append(log_entry)
+
+class Gauge:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def __enter__(self):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+
+    def __exit__(self, *exc):
+        with self.lock:
+            self.active -= 1
+
+def test_build_dag_uses_explicit_dependencies():
+    nodes = build_dag(["1. Write a.py", "2. Write b.py", "3. Test both (depends on: 1, 2)"])
+    assert [node['deps'] for node in nodes] == [set(), set(), {0, 1}]
+
+def test_run_plan_stops_on_failure():
+    context = Context()
+    ran = []
+
+    def execute(subtask, context, agents, depth, path):
+        ran.append(subtask)
+        if subtask == "1. Write a.py":
+            raise RuntimeError("boom")
+
+    run_plan(["1. Write a.py", "2. Test a.py (depends on: 1)", "3. Deploy (depends on: 2)"], context, {}, execute)
+    assert ran == ["1. Write a.py"]
+    assert context.status == "failed"
+    assert context.failures == [{'subtask': "1. Write a.py", 'error': "boom"}]
+
+def test_independent_subtasks_run_concurrently_within_the_limit():
+    context = Context()
+    gauge = Gauge()
+
+    def execute(subtask, context, agents, depth, path):
+        with gauge:
+            time.sleep(0.05)
+
+    plan = [f"{i}. Write mod{i}.py (depends on: )" for i in range(1, 7)]
+    run_plan(plan, context, {}, execute, max_workers=3)
+    assert gauge.peak == 3
+
+def test_nested_plans_share_the_limit_without_holding_the_parent_slot():
+    context = Context()
+    gauge = Gauge()
+    paths = []
+
+    def execute(subtask, context, agents, depth, path):
+        paths.append(path)
+        if depth == 0:
+            # Every top-level step breaks down into children, as a MetaAgent replan does
+            run_plan([f"{i}. Part {i} (depends on: )" for i in range(1, 4)], context, agents, execute,
+                     depth=depth + 1, path=path)
+        else:
+            with gauge:
+                time.sleep(0.02)
+
+    finished = threading.Event()
+    threading.Thread(target=lambda: (run_plan(["1. A (depends on: )", "2. B (depends on: )"], context, {}, execute,
+                                              max_workers=2), finished.set()), daemon=True).start()
+    assert finished.wait(5), "nested plans deadlocked"
+    assert gauge.peak == 2
+    assert sorted(paths) == [(0,), (0, 0), (0, 1), (0, 2), (1,), (1, 0), (1, 1), (1, 2)]
+    assert context.status == "running"
@@ -0,0 +1,17 @@
+from agents import tester
+
+def traceback(*frames, error):
+    lines = ["Traceback (most recent call last):"]
+    lines += [f'  File "/tmp/run/{name}", line {n}, in f' for name, n in frames]
+    return "\n".join(lines + [error])
+
+def test_broken_test_file_is_at_fault():
+    assert tester.tests_at_fault(traceback(("test_solution.py", 3), error="NameError: name 'helper' is not defined"))
+    assert tester.tests_at_fault('  File "/tmp/run/test_solution.py", line 4\n    def test(:\nSyntaxError: invalid syntax')
+
+def test_failing_assertion_blames_the_code():
+    assert not tester.tests_at_fault(traceback(("test_solution.py", 8), error="AssertionError: 3 != 4"))
+
+def test_error_inside_the_code_blames_the_code():
+    assert not tester.tests_at_fault(traceback(("test_solution.py", 8), ("solution.py", 2), error="ZeroDivisionError: division by zero"))
+    assert not tester.tests_at_fault("")